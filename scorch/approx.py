@@ -0,0 +1,420 @@
+r"""
+Approximate scores with error bounds for very large documents.
+
+The exact CEAF alignment (cubic in the number of clusters) and BLANC link counting (quadratic in the
+number of mentions) in [`scores.py`](/scorch/scores.py) are impractical for documents with hundreds
+of thousands of mentions, such as books or cross-document clusterings. The functions here give
+estimates whose cost is controlled by a budget of `samples`, along with bounds:
+
+- B³ is the mean over mentions of a per-mention score, so it is estimated by sampling mentions.
+- BLANC is estimated by sampling coreference and non-coreference links of each clustering and
+  checking them in the other one.
+- CEAF uses a greedy alignment computed from the sparse contingency table, whose similarity is a
+  lower bound of the optimal one, while the sum of the best similarities of every cluster is an
+  upper bound, so the bounds are certain.
+- MUC and LEA only need the contingency table, so they are computed exactly in linear time.
+
+All of them accept an `implicit_singletons` option, with the same meaning as in
+[`scores.py`](/scorch/scores.py): the response mentions that are not in the key are counted as key
+singletons without building a cluster for every one of them.
+
+The sampled estimates come with Wilson score intervals at the requested `confidence`. Since every
+per-sample value lies in `$[0, 1]$`, their variance is at most `$p(1-p)$`, so these intervals are
+also valid (if conservative) for non-binary values. The intervals of composite scores (F₁, the
+BLANC averages) are derived from those of their components, which are monotonic, so they hold
+whenever all the component intervals do. When the population to sample is not larger than the
+budget, it is enumerated instead and the scores are exact.
+"""
+import itertools
+import math
+import random
+
+import typing as ty
+
+from statistics import NormalDist, harmonic_mean
+
+from scorch import scores
+
+
+Bounds = ty.Tuple[float, float]
+
+
+class Estimate(ty.NamedTuple):
+    """Estimated `$(R, P, F₁)$` scores with their lower and upper bounds."""
+
+    R: float
+    P: float
+    F: float
+    R_bounds: Bounds
+    P_bounds: Bounds
+    F_bounds: Bounds
+
+
+def _exact(R: float, P: float, F: float) -> Estimate:
+    return Estimate(R, P, F, (R, R), (P, P), (F, F))
+
+
+def _combine(R: float, P: float, R_bounds: Bounds, P_bounds: Bounds) -> Estimate:
+    return Estimate(
+        R,
+        P,
+        harmonic_mean((R, P)),
+        R_bounds,
+        P_bounds,
+        (harmonic_mean((R_bounds[0], P_bounds[0])), harmonic_mean((R_bounds[1], P_bounds[1]))),
+    )
+
+
+def _mean(
+    values: ty.Sequence[float], exact: bool, z: float
+) -> ty.Tuple[float, float, float]:
+    """Return the mean of `#values` in `$[0, 1]$` and its Wilson score interval."""
+    n = len(values)
+    m = math.fsum(values) / n
+    if exact:
+        return m, m, m
+    center = (m + z * z / (2 * n)) / (1 + z * z / n)
+    half_width = z / (1 + z * z / n) * math.sqrt(m * (1 - m) / n + z * z / (4 * n * n))
+    return m, max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+class _Clustering:
+    """
+    Indexable views of a clustering for sampling, whose `#singletons` are mentions that are
+    singleton clusters of their own, numbered after `#clusters` and never built.
+    """
+
+    def __init__(self, clusters: ty.Sequence[ty.Set], singletons: ty.Sequence[ty.Hashable] = ()):
+        self.clusters = clusters
+        self.singletons = list(singletons)
+        self.lists = [list(c) for c in clusters]
+        self.cluster_of = {m: i for i, c in enumerate(clusters) for m in c}
+        self.cluster_of.update((m, len(clusters) + t) for t, m in enumerate(self.singletons))
+        self.mentions = [m for c in self.lists for m in c]
+        self.mentions.extend(self.singletons)
+        self.coreference_links = sum(len(c) * (len(c) - 1) // 2 for c in clusters)
+        n = len(self.mentions)
+        self.non_coreference_links = n * (n - 1) // 2 - self.coreference_links
+        # Cumulated weights for drawing the clusters of links, only computed if needed
+        self._coreference_weights: ty.Optional[ty.List[int]] = None
+        self._non_coreference_weights: ty.Optional[ty.List[int]] = None
+
+    def coreference_link(self, rng: random.Random) -> ty.Tuple[ty.Hashable, ty.Hashable]:
+        """Draw a coreference link uniformly."""
+        if self._coreference_weights is None:
+            self._coreference_weights = list(
+                itertools.accumulate(len(c) * (len(c) - 1) for c in self.lists)
+            )
+        (i,) = rng.choices(range(len(self.lists)), cum_weights=self._coreference_weights)
+        m, n = rng.sample(self.lists[i], 2)
+        return m, n
+
+    def non_coreference_link(self, rng: random.Random) -> ty.Tuple[ty.Hashable, ty.Hashable]:
+        """Draw a non-coreference link uniformly."""
+        if self._non_coreference_weights is None:
+            total = len(self.mentions)
+            # The singletons all have the same weight, so they are drawn as a last group
+            self._non_coreference_weights = list(
+                itertools.accumulate(
+                    itertools.chain(
+                        (len(c) * (total - len(c)) for c in self.lists),
+                        (len(self.singletons) * (total - 1),),
+                    )
+                )
+            )
+        (i,) = rng.choices(range(len(self.lists) + 1), cum_weights=self._non_coreference_weights)
+        m = rng.choice(self.lists[i]) if i < len(self.lists) else rng.choice(self.singletons)
+        i = self.cluster_of[m]
+        while True:
+            n = rng.choice(self.mentions)
+            if self.cluster_of[n] != i:
+                return m, n
+
+    def all_coreference_links(self) -> ty.Iterable[ty.Tuple[ty.Hashable, ty.Hashable]]:
+        for c in self.lists:
+            yield from itertools.combinations(c, 2)
+
+    def all_non_coreference_links(self) -> ty.Iterable[ty.Tuple[ty.Hashable, ty.Hashable]]:
+        lists = [*self.lists, *([m] for m in self.singletons)]
+        for c, d in itertools.combinations(lists, 2):
+            yield from itertools.product(c, d)
+
+    def cluster(self, i: int) -> ty.Set:
+        """Return the `#i`-th cluster, building it if it is a singleton."""
+        if i < len(self.clusters):
+            return self.clusters[i]
+        return {self.singletons[i - len(self.clusters)]}
+
+    def corefer(self, m: ty.Hashable, n: ty.Hashable) -> bool:
+        i = self.cluster_of.get(m)
+        return i is not None and i == self.cluster_of.get(n)
+
+    def dont_corefer(self, m: ty.Hashable, n: ty.Hashable) -> bool:
+        i, j = self.cluster_of.get(m), self.cluster_of.get(n)
+        return i is not None and j is not None and i != j
+
+
+def _implicit_key_singletons(
+    key: ty.Sequence[ty.Set], response: ty.Sequence[ty.Set]
+) -> ty.List[ty.Hashable]:
+    """Return the response mentions that are not in `#key`."""
+    return [m for e in scores.implicit_key_singletons(key, response).values() for m in e]
+
+
+def b_cubed(
+    key: ty.Sequence[ty.Set],
+    response: ty.Sequence[ty.Set],
+    samples: int = 10000,
+    confidence: float = 0.95,
+    rng: ty.Optional[random.Random] = None,
+    implicit_singletons: bool = False,
+) -> Estimate:
+    r"""
+    Estimate B³ by sampling mentions, since `$R$` is the mean over key mentions `$m$` of
+    `$\frac{\#k(m)∩r(m)}{\#k(m)}$` (and symmetrically for `$P$`).
+    """
+    if rng is None:
+        rng = random.Random(0)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    singletons = _implicit_key_singletons(key, response) if implicit_singletons else []
+    K, R_ = _Clustering(key, singletons), _Clustering(response)
+
+    def estimate(a: _Clustering, b: _Clustering) -> ty.Tuple[float, float, float]:
+        if not a.mentions:
+            return 0.0, 0.0, 0.0
+        # Intersections are memoized, so the cost is bounded by the number of samples
+        intersections: ty.Dict[ty.Tuple[int, int], int] = dict()
+
+        def mention_score(m: ty.Hashable) -> float:
+            i, j = a.cluster_of[m], b.cluster_of.get(m)
+            if j is None:
+                return 0.0
+            n = intersections.get((i, j))
+            if n is None:
+                n = intersections[(i, j)] = len(a.cluster(i).intersection(b.cluster(j)))
+            return n / len(a.cluster(i))
+
+        exact = len(a.mentions) <= samples
+        population = a.mentions if exact else rng.choices(a.mentions, k=samples)
+        return _mean([mention_score(m) for m in population], exact, z)
+
+    R, R_low, R_high = estimate(K, R_)
+    P, P_low, P_high = estimate(R_, K)
+    return _combine(R, P, (R_low, R_high), (P_low, P_high))
+
+
+def blanc(
+    key: ty.Sequence[ty.Set],
+    response: ty.Sequence[ty.Set],
+    samples: int = 10000,
+    confidence: float = 0.95,
+    rng: ty.Optional[random.Random] = None,
+    implicit_singletons: bool = False,
+) -> Estimate:
+    r"""
+    Estimate BLANC by sampling the coreference and non-coreference links of each clustering and
+    checking whether they are links of the same kind in the other clustering. The edge cases are
+    the same as in `scores.blanc`.
+    """
+    singletons = _implicit_key_singletons(key, response) if implicit_singletons else []
+    if len(key) + len(singletons) == len(response) == 1:
+        k = key[0] if key else set(singletons)
+        if len(k) == len(response[0]) == 1:
+            return _exact(*scores.blanc([k], response))
+    if rng is None:
+        rng = random.Random(0)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    K, R_ = _Clustering(key, singletons), _Clustering(response)
+
+    def proportion(
+        population: int,
+        enumerate_links: ty.Callable[[], ty.Iterable[ty.Tuple[ty.Hashable, ty.Hashable]]],
+        draw_link: ty.Callable[[random.Random], ty.Tuple[ty.Hashable, ty.Hashable]],
+        check: ty.Callable[[ty.Hashable, ty.Hashable], bool],
+    ) -> ty.Tuple[float, float, float]:
+        exact = population <= samples
+        links = enumerate_links() if exact else (draw_link(rng) for _ in range(samples))
+        return _mean([float(check(m, n)) for m, n in links], exact, z)
+
+    def link_scores(
+        key_links: int,
+        response_links: int,
+        recall: ty.Callable[[], ty.Tuple[float, float, float]],
+        precision: ty.Callable[[], ty.Tuple[float, float, float]],
+    ) -> Estimate:
+        if not key_links and not response_links:
+            return _exact(1.0, 1.0, 1.0)
+        if not key_links or not response_links:
+            return _exact(0.0, 0.0, 0.0)
+        (R, R_low, R_high), (P, P_low, P_high) = recall(), precision()
+        return _combine(R, P, (R_low, R_high), (P_low, P_high))
+
+    C = link_scores(
+        K.coreference_links,
+        R_.coreference_links,
+        lambda: proportion(
+            K.coreference_links, K.all_coreference_links, K.coreference_link, R_.corefer
+        ),
+        lambda: proportion(
+            R_.coreference_links, R_.all_coreference_links, R_.coreference_link, K.corefer
+        ),
+    )
+    N = link_scores(
+        K.non_coreference_links,
+        R_.non_coreference_links,
+        lambda: proportion(
+            K.non_coreference_links,
+            K.all_non_coreference_links,
+            K.non_coreference_link,
+            R_.dont_corefer,
+        ),
+        lambda: proportion(
+            R_.non_coreference_links,
+            R_.all_non_coreference_links,
+            R_.non_coreference_link,
+            K.dont_corefer,
+        ),
+    )
+    if not K.coreference_links:
+        return N
+    if not K.non_coreference_links:
+        return C
+
+    def mid(c: Bounds, n: Bounds) -> Bounds:
+        return (c[0] + n[0]) / 2, (c[1] + n[1]) / 2
+
+    return Estimate(
+        (C.R + N.R) / 2,
+        (C.P + N.P) / 2,
+        (C.F + N.F) / 2,
+        mid(C.R_bounds, N.R_bounds),
+        mid(C.P_bounds, N.P_bounds),
+        mid(C.F_bounds, N.F_bounds),
+    )
+
+
+def ceaf(
+    key: ty.Sequence[ty.Set],
+    response: ty.Sequence[ty.Set],
+    similarity: ty.Callable[[int, int, int], float],
+    key_norm: float,
+    response_norm: float,
+    implicit_singletons: bool = False,
+) -> Estimate:
+    r"""
+    Bound CEAF using the `#similarity(overlap, key_size, response_size)` score function, where
+    `#key_norm` and `#response_norm` are the sums of the self-similarities of the key and response
+    clusters (the implicit singletons are added to `#key_norm` here).
+
+    The estimate is the greedy alignment that repeatedly aligns the most similar remaining pair of
+    clusters, a lower bound of the optimal alignment. The upper bound is the smallest of the sums
+    of the best similarities of key and of response clusters. Both only consider the non-zero
+    cells of the contingency table, so the cost is `$O(n \log n)$` in the number of mentions.
+
+    As in `scores.ceaf`, the implicit key singletons of a response cluster `$r$` are a single
+    cell `$-r-1$`, since at most one of them can be aligned, but all of them have `$r$` as their
+    best cluster.
+    """
+    if not response:
+        return _exact(0.0, 0.0, 0.0)
+    table = scores.contingency(key, response)
+    extra = scores.extra_mentions_counts(table) if implicit_singletons else [0] * len(response)
+    if not key and not any(extra):
+        return _exact(0.0, 0.0, 0.0)
+    key_norm += sum(extra) * similarity(1, 1, 1)
+    cells = sorted(
+        itertools.chain(
+            (
+                (similarity(n, table.key_sizes[i], table.response_sizes[j]), i, j)
+                for (i, j), n in table.overlaps.items()
+            ),
+            (
+                (similarity(1, 1, table.response_sizes[j]), -j - 1, j)
+                for j, e in enumerate(extra)
+                if e
+            ),
+        ),
+        reverse=True,
+    )
+    best_key = [0.0] * len(key)
+    best_response = [0.0] * len(response)
+    aligned_key, aligned_response = set(), set()
+    greedy = []
+    for s, i, j in cells:
+        if i >= 0:
+            best_key[i] = max(best_key[i], s)
+        else:
+            best_key.append(extra[j] * s)
+        best_response[j] = max(best_response[j], s)
+        if i not in aligned_key and j not in aligned_response:
+            aligned_key.add(i)
+            aligned_response.add(j)
+            greedy.append(s)
+    low = math.fsum(greedy)
+    high = min(math.fsum(best_key), math.fsum(best_response))
+    return _combine(
+        low / key_norm,
+        low / response_norm,
+        (low / key_norm, high / key_norm),
+        (low / response_norm, high / response_norm),
+    )
+
+
+def ceaf_m(
+    key: ty.Sequence[ty.Set], response: ty.Sequence[ty.Set], implicit_singletons: bool = False
+) -> Estimate:
+    """Bound CEAFₘ, see `ceaf`."""
+    return ceaf(
+        key,
+        response,
+        lambda n, k, r: n,
+        sum(len(k) for k in key),
+        sum(len(r) for r in response),
+        implicit_singletons=implicit_singletons,
+    )
+
+
+def ceaf_e(
+    key: ty.Sequence[ty.Set], response: ty.Sequence[ty.Set], implicit_singletons: bool = False
+) -> Estimate:
+    """Bound CEAFₑ, see `ceaf`."""
+    return ceaf(
+        key,
+        response,
+        lambda n, k, r: 2 * n / (k + r),
+        len(key),
+        len(response),
+        implicit_singletons=implicit_singletons,
+    )
+
+
+def muc(
+    key: ty.Sequence[ty.Set], response: ty.Sequence[ty.Set], implicit_singletons: bool = False
+) -> Estimate:
+    """Compute MUC exactly, since `scores.muc` only needs the contingency table."""
+    return _exact(*scores.muc(key, response, implicit_singletons=implicit_singletons))
+
+
+def approximate_scores(
+    key: ty.Sequence[ty.Set],
+    response: ty.Sequence[ty.Set],
+    samples: int = 10000,
+    confidence: float = 0.95,
+    seed: int = 0,
+    implicit_singletons: bool = False,
+) -> ty.Dict[str, Estimate]:
+    """
+    Return the estimates of all the metrics of `scorch.main.METRICS`, using at most `#samples`
+    samples for each sampled quantity.
+    """
+    rng = random.Random(seed)
+    options = {"implicit_singletons": implicit_singletons}
+    sampling = {"samples": samples, "confidence": confidence, "rng": rng, **options}
+    return {
+        "MUC": muc(key, response, **options),
+        "B³": b_cubed(key, response, **sampling),
+        "CEAF_m": ceaf_m(key, response, **options),
+        "CEAF_e": ceaf_e(key, response, **options),
+        "BLANC": blanc(key, response, **sampling),
+        "LEA": _exact(*scores.lea(key, response, **options)),
+    }
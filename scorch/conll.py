@@ -2,32 +2,64 @@
 r"""Convert CoNLL-2012 files to simple JSON.
 
 ## Usage:
-  conll <conll-file> [<out-dir>]
+  conll [options] <conll-file> [<out-dir>]
+  conll [options] --out-dir=<dir> <conll-file>...
+  conll [options] --bundle=<file> <conll-file>...
+  conll --index <conll-file>...
 
 ## Arguments:
   <conll-file>  input file (CoNLL-2012 format), `-` for standard input
   <out-dir>     directory for output [default: same as the input]
 
 ## Options:
-  -h, --help  Show this screen.
+  --out-dir=<dir>   Directory for the output of several input files
+  --bundle=<file>   Write all the documents in a single JSONL file (one document per line) instead
+                    of one JSON file per document, `-` for standard output
+  --ids=<style>     How to write mention identifiers: `string` for `"block.start-end"`,
+                    `list` for `[block, start, end]` and `packed` for `[block, start, end]` packed in
+                    a single 63 bits integer [default: string]
+  -j, --jobs=<n>    Number of processes for the conversion. Large files are split in byte ranges
+                    of whole documents using their index (see `--index`) [default: 1]
+  --index           Only build the document indexes of the input files (`<conll-file>.idx.json`),
+                    which allow accessing their documents at random
+  -h, --help        Show this screen.
 
 ## Example:
-  `conll input.conll out.json`
+  `conll input.conll out/`
+  `conll --jobs 4 --bundle corpus.jsonl *.conll`
+  `conll --index ontonotes.conll`
 """
 
 __version__ = "conll 0.0.0"
 
+import concurrent.futures
 import contextlib
 import json
+import mmap
+import os
 import pathlib
 import re
+import shutil
 import sys
+import tempfile
 
 import typing as ty
 
 from collections import defaultdict, OrderedDict
 
-from docopt import docopt
+from scorch import spans
+
+ID_STYLES = ("string", "list", "packed")
+
+DOCUMENT_BEGIN_RE = re.compile(r"#\s*begin document \((.*?)\);(\s*part (.*))?")
+DOCUMENT_END_RE = re.compile(r"#\s*end document")
+# The same on raw file contents, for indexing
+BOUNDARY_RE = re.compile(rb"^[ \t]*#\s*(begin|end) document.*$", re.MULTILINE)
+
+INDEX_SUFFIX = ".idx.json"
+INDEX_FORMAT_VERSION = 1
+
+DocumentIndex = ty.Dict[str, ty.Tuple[int, int]]
 
 
 def parse_block(
@@ -39,11 +71,23 @@ def parse_block(
     entity_id → [(mention_start, mention_end), …]
     ```
     """
+    return parse_block_columns(lines, (column,))[0]
+
+
+def parse_block_columns(
+    lines: ty.Iterable[str], columns: ty.Sequence[int]
+) -> ty.List[ty.Dict[str, ty.List[ty.Tuple[str, str]]]]:
+    """
+    Parse several coreference `#columns` of a block in a single pass over its rows, return the
+    entities of every column as in `parse_block`.
+    """
     # We have to keep track of the order in which the entites are created (i.e.) the begining of
     # their first mention, since it will be used to determine which entity gets the mention in case
     # of duplication
-    entities: ty.Dict[str, ty.List[ty.Tuple[str, str]]] = OrderedDict()
-    dangling: ty.Dict[str, ty.List[str]] = defaultdict(list)
+    all_entities: ty.List[ty.Dict[str, ty.List[ty.Tuple[str, str]]]] = [
+        OrderedDict() for _ in columns
+    ]
+    all_dangling: ty.List[ty.Dict[str, ty.List[str]]] = [defaultdict(list) for _ in columns]
     for i, l in enumerate(lines):
         row = l.split()
 
@@ -52,31 +96,34 @@ def parse_block(
         except IndexError:  # Try to guess line number (mainly for non-compliant testcases)
             row_n = str(i)
 
-        try:
-            coref = row[column]
-        except IndexError:
-            raise ValueError(f"Badly formatted line: {l!r}")
-        if coref == "-":
-            continue
-
-        for m in re.finditer(r"\((\d+)", coref):
-            e = m.group(1)
-            if e not in entities:
-                entities[e] = []
-            dangling[e].append(row_n)
-
-        for m in re.finditer(r"(\d+)\)", coref):
+        for column, entities, dangling in zip(columns, all_entities, all_dangling):
             try:
-                start = dangling[m.group(1)].pop()
+                coref = row[column]
             except IndexError:
-                raise ValueError(f"Unbalanced parentheses at line {i}: {l!r}")
-            entities[m.group(1)].append((start, row_n))
-    if any(dangling.values()):
-        raise ValueError(
-            f"Dangling mentions at line {i}: {[e for e, v in dangling.items() if e]}"
-        )
+                raise ValueError(f"Badly formatted line: {l!r}")
+            if coref == "-":
+                continue
 
-    return entities
+            for m in re.finditer(r"\((\d+)", coref):
+                e = m.group(1)
+                if e not in entities:
+                    entities[e] = []
+                dangling[e].append(row_n)
+
+            for m in re.finditer(r"(\d+)\)", coref):
+                try:
+                    start = dangling[m.group(1)].pop()
+                except IndexError:
+                    raise ValueError(f"Unbalanced parentheses at line {i}: {l!r}")
+                entities[m.group(1)].append((start, row_n))
+    for column, dangling in zip(columns, all_dangling):
+        if any(dangling.values()):
+            raise ValueError(
+                f"Dangling mentions in column {column} at line {i}:"
+                f" {[e for e, v in dangling.items() if v]}"
+            )
+
+    return all_entities
 
 
 def split_blocks(lines: ty.Iterable[str]) -> ty.Iterable[ty.List[str]]:
@@ -101,10 +148,22 @@ def parse_document(
     entity_id → [(block_number, mention_start, mention_end), …]
     ```
     """
-    entities: ty.Dict[str, ty.List[ty.Tuple[int, str, str]]] = OrderedDict()
+    return parse_document_columns(lines, (column,))[0]
+
+
+def parse_document_columns(
+    lines: ty.Iterable[str], columns: ty.Sequence[int]
+) -> ty.List[ty.Dict[str, ty.List[ty.Tuple[int, str, str]]]]:
+    """
+    Parse several coreference `#columns` of a document in a single pass over its rows, return the
+    entities of every column as in `parse_document`.
+    """
+    all_entities: ty.List[ty.Dict[str, ty.List[ty.Tuple[int, str, str]]]] = [
+        OrderedDict() for _ in columns
+    ]
     for i, block in enumerate(split_blocks(lines)):
         try:
-            block_entities = parse_block(block)
+            blocks_entities = parse_block_columns(block, columns)
         except ValueError as e:
             raise ValueError(
                 "Parse error in block {i}:\n{e}\n{block}".format(
@@ -112,21 +171,33 @@ def parse_document(
                 )
             )
         # Merge this block entities
-        for ent, mentions in block_entities.items():
-            entities.setdefault(ent, []).extend(
-                (i, start, end) for start, end in mentions
-            )
+        for entities, block_entities in zip(all_entities, blocks_entities):
+            for ent, mentions in block_entities.items():
+                entities.setdefault(ent, []).extend(
+                    (i, start, end) for start, end in mentions
+                )
 
     # Deduplicate mentions : if a mention is in several entities, leave only to the entity that
     # appeared first. If a mention appears several time in an entity, leave it only once
-    seen: ty.Set[ty.Tuple[int, str, str]] = set()
-    for ent, men in entities.items():
-        men = sorted((set(men) - seen))
-        if not men:
-            del entities[ent]
-        entities[ent] = men
-        seen.update(men)
-    return dict(entities)  # No need to keep an OrderedDict after deduplication
+    res = []
+    for entities in all_entities:
+        seen: ty.Set[ty.Tuple[int, str, str]] = set()
+        for ent, men in list(entities.items()):
+            men = sorted((set(men) - seen))
+            if not men:
+                del entities[ent]
+                continue
+            entities[ent] = men
+            seen.update(men)
+        res.append(dict(entities))  # No need to keep an OrderedDict after deduplication
+    return res
+
+
+def document_name(begin_match: ty.Match[str]) -> str:
+    """Return the name of a document from the match of its `#begin document` line."""
+    if begin_match.group(2):
+        return f"{begin_match.group(1)}-{begin_match.group(3)}"
+    return begin_match.group(1)
 
 
 def parse_file(
@@ -139,25 +210,169 @@ def parse_file(
     entity_id → [(block_number, mention_start, mention_end), …]
     ```
     """
+    for doc_name, (doc_entities,) in parse_file_columns(lines, (column,)):
+        yield doc_name, doc_entities
+
+
+def parse_file_columns(
+    lines: ty.Iterable[str], columns: ty.Sequence[int]
+) -> ty.Iterable[ty.Tuple[str, ty.List[ty.Dict[str, ty.List[ty.Tuple[int, str, str]]]]]]:
+    """
+    Parse several coreference `#columns` of a CoNLL file in a single pass, e.g. a gold column and
+    the predictions of several systems, return documents as tuples `(document_name,
+    entities_by_column)` with the entities of every column as in `parse_file`.
+    """
     buffer: ty.List[str] = []
     for l in lines:
         if l.startswith("#"):
-            m = re.match(r"#\s*begin document \((.*?)\);(\s*part (.*))?", l)
+            m = DOCUMENT_BEGIN_RE.match(l)
             if m:
-                if m.group(2):
-                    doc_name = f"{m.group(1)}-{m.group(3)}"
-                else:
-                    doc_name = m.group(1)
+                doc_name = document_name(m)
                 continue
-            m = re.match(r"#\s*end document", l)
+            m = DOCUMENT_END_RE.match(l)
             if m:
-                doc_entities = parse_document(buffer, column)
+                doc_entities = parse_document_columns(buffer, columns)
                 buffer = []
                 yield (doc_name, doc_entities)
         else:
             buffer.append(l)
 
 
+def build_index(conll_file: ty.Union[str, pathlib.Path]) -> DocumentIndex:
+    """
+    Scan a CoNLL file for its `#begin document`/`#end document` lines and return a mapping
+    ```
+    document_name → (start, end)
+    ```
+    where `start` and `end` are the byte offsets of the beginning of the `#begin document` line
+    and of the end of the `#end document` line, in the order of the file.
+
+    The file is memory-mapped and searched with a regular expression, which is much faster than
+    parsing it and doesn't load it in memory.
+    """
+    index: DocumentIndex = dict()
+    with open(conll_file, "rb") as in_stream:
+        # Empty files can't be mapped
+        if os.fstat(in_stream.fileno()).st_size == 0:
+            return index
+        with mmap.mmap(in_stream.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            start: ty.Optional[int] = None
+            for m in BOUNDARY_RE.finditer(mapped):
+                if m.group(1) == b"begin":
+                    begin_match = DOCUMENT_BEGIN_RE.match(m.group(0).decode("utf-8").strip())
+                    if begin_match is not None:
+                        name, start = document_name(begin_match), m.start()
+                elif start is not None:
+                    if name in index:
+                        raise ValueError(f"Duplicate document {name!r} in {conll_file}")
+                    index[name] = (start, m.end())
+                    start = None
+    return index
+
+
+def index_path(conll_file: ty.Union[str, pathlib.Path]) -> pathlib.Path:
+    return pathlib.Path(f"{conll_file}{INDEX_SUFFIX}")
+
+
+def load_index(conll_file: ty.Union[str, pathlib.Path], persist: bool = True) -> DocumentIndex:
+    """
+    Return the document index of a CoNLL file (see `build_index`), from its `<conll_file>.idx.json`
+    file if it is up to date, building it (and writing it if `#persist` is true and the directory
+    is writable) otherwise.
+
+    The index is considered up to date if the size and modification time of the CoNLL file didn't
+    change since it was built.
+    """
+    stat = os.stat(conll_file)
+    path = index_path(conll_file)
+    try:
+        with path.open() as in_stream:
+            obj = json.load(in_stream)
+        if (obj["version"], obj["size"], obj["mtime_ns"]) == (
+            INDEX_FORMAT_VERSION,
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            return {name: (start, end) for name, (start, end) in obj["documents"].items()}
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    index = build_index(conll_file)
+    if persist:
+        obj = {
+            "version": INDEX_FORMAT_VERSION,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "documents": index,
+        }
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            with tmp_path.open("w") as out_stream:
+                json.dump(obj, out_stream)
+            tmp_path.replace(path)
+        except OSError:
+            pass
+    return index
+
+
+def read_range(
+    conll_file: ty.Union[str, pathlib.Path], start: int, end: int
+) -> ty.Iterable[ty.Tuple[str, ty.Dict[str, ty.List[ty.Tuple[int, str, str]]]]]:
+    """
+    Parse the documents between the byte offsets `#start` and `#end` of a CoNLL file (usually
+    taken from its index), like `parse_file`.
+
+    The lines are read from a memory map as they are parsed, so several processes can parse
+    disjoint ranges of the same file in parallel without loading it.
+    """
+    with open(conll_file, "rb") as in_stream, mmap.mmap(
+        in_stream.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mapped:
+        mapped.seek(start)
+
+        def lines() -> ty.Iterable[str]:
+            while mapped.tell() < end:
+                yield mapped.readline().decode("utf-8").strip()
+
+        yield from parse_file(lines())
+
+
+def read_document(
+    conll_file: ty.Union[str, pathlib.Path], name: str, index: ty.Optional[DocumentIndex] = None,
+) -> ty.Dict[str, ty.List[ty.Tuple[int, str, str]]]:
+    """
+    Parse the document `#name` of a CoNLL file using its index (loaded with `load_index` if not
+    given), without reading the rest of the file.
+    """
+    if index is None:
+        index = load_index(conll_file)
+    try:
+        start, end = index[name]
+    except KeyError:
+        raise KeyError(f"No document {name!r} in {conll_file}")
+    for _, entities in read_range(conll_file, start, end):
+        return entities
+    raise ValueError(f"Stale index for {conll_file}")
+
+
+def split_index(index: DocumentIndex, parts: int) -> ty.List[ty.Tuple[int, int]]:
+    """
+    Split the documents of an index in at most `#parts` byte ranges of consecutive whole documents
+    with roughly the same size.
+    """
+    documents = sorted(index.values())
+    if not documents:
+        return []
+    target = (documents[-1][1] - documents[0][0]) / parts
+    ranges: ty.List[ty.Tuple[int, int]] = []
+    range_start = documents[0][0]
+    for i, (start, end) in enumerate(documents):
+        if end - range_start >= target or i == len(documents) - 1:
+            ranges.append((range_start, end))
+            if i < len(documents) - 1:
+                range_start = documents[i + 1][0]
+    return ranges
+
+
 # Thanks http://stackoverflow.com/a/17603000/760767
 @contextlib.contextmanager
 def smart_open(
@@ -186,36 +401,175 @@ def smart_open(
             pass
 
 
+def mention_id(block: int, start: str, end: str, ids: str = "string") -> ty.Any:
+    """Return the identifier of a mention in the `#ids` style, see `ID_STYLES`."""
+    if ids == "string":
+        return f"{block}.{start}-{end}"
+    elif ids == "list":
+        return [block, int(start), int(end)]
+    elif ids == "packed":
+        return spans.pack_span(block, int(start), int(end))
+    raise ValueError(f"Unsupported identifiers style: {ids!r}")
+
+
+def document_to_json(
+    name: str, entities: ty.Dict[str, ty.List[ty.Tuple[int, str, str]]], ids: str = "string",
+) -> ty.Dict[str, ty.Any]:
+    """
+    Return the scorch JSON representation of a parsed document. Documents with `packed` identifiers
+    say so with an `"ids": "packed"` member, since their identifiers are plain integers.
+    """
+    obj: ty.Dict[str, ty.Any] = {"name": name, "type": "clusters"}
+    if ids == "packed":
+        obj["ids"] = ids
+    obj["clusters"] = {
+        e: [mention_id(block, start, end, ids) for block, start, end in c]
+        for e, c in entities.items()
+    }
+    return obj
+
+
+def write_documents(
+    conll_file: ty.Union[str, pathlib.Path],
+    out_dir: ty.Optional[pathlib.Path] = None,
+    bundle_stream: ty.Optional[ty.TextIO] = None,
+    ids: str = "string",
+    byte_range: ty.Optional[ty.Tuple[int, int]] = None,
+) -> int:
+    """
+    Convert the documents of a CoNLL file (or only those in `#byte_range`, see `read_range`) as
+    they are parsed, either to one JSON file per document in `#out_dir` or as lines of
+    `#bundle_stream`. Return the number of documents.
+
+    Documents are written as soon as they are parsed, so the memory use doesn't depend on the size
+    of the input.
+    """
+    num_documents = 0
+    with contextlib.ExitStack() as stack:
+        if byte_range is not None:
+            documents = read_range(conll_file, *byte_range)
+        else:
+            in_stream = stack.enter_context(smart_open(conll_file))
+            documents = parse_file(l.strip() for l in in_stream)
+        for name, entities in documents:
+            obj = document_to_json(name, entities, ids=ids)
+            if bundle_stream is not None:
+                json.dump(obj, bundle_stream)
+                bundle_stream.write("\n")
+            else:
+                assert out_dir is not None  # nosec:B101
+                sanitized_name = name.replace("/", "_")
+                out_path = out_dir / f"{sanitized_name}.json"
+                with out_path.open("w") as out_stream:
+                    json.dump(obj, out_stream)
+            num_documents += 1
+    return num_documents
+
+
+def convert_file(
+    conll_file: ty.Union[str, pathlib.Path],
+    out_dir: ty.Optional[pathlib.Path] = None,
+    bundle_file: ty.Optional[ty.Union[str, pathlib.Path]] = None,
+    ids: str = "string",
+    byte_range: ty.Optional[ty.Tuple[int, int]] = None,
+) -> int:
+    """
+    Convert a CoNLL file (or only the documents in `#byte_range`) to one JSON file per document in
+    `#out_dir` or to a `#bundle_file` JSONL bundle if it is given. Return the number of documents.
+    """
+    if bundle_file is None:
+        return write_documents(conll_file, out_dir=out_dir, ids=ids, byte_range=byte_range)
+    with smart_open(bundle_file, "w") as bundle_stream:
+        return write_documents(
+            conll_file, bundle_stream=bundle_stream, ids=ids, byte_range=byte_range
+        )
+
+
+def convert_files(
+    conll_files: ty.Sequence[ty.Union[str, pathlib.Path]],
+    out_dir: ty.Optional[pathlib.Path] = None,
+    bundle_file: ty.Optional[ty.Union[str, pathlib.Path]] = None,
+    jobs: int = 1,
+    ids: str = "string",
+) -> int:
+    """
+    Convert several CoNLL files with `convert_file`, using `#jobs` processes in parallel. Return
+    the total number of documents.
+
+    If there are fewer files than processes, the files are split in byte ranges of whole documents
+    using their indexes (see `load_index`) and the ranges are converted in parallel.
+
+    All the documents go to the same bundle if `#bundle_file` is given. When converting in
+    parallel, every process writes to a temporary bundle and these are concatenated in the order of
+    the inputs, so the output doesn't depend on `#jobs`.
+    """
+    if jobs <= 1 or "-" in conll_files:
+        if bundle_file is None:
+            return sum(write_documents(f, out_dir=out_dir, ids=ids) for f in conll_files)
+        with smart_open(bundle_file, "w") as bundle_stream:
+            return sum(
+                write_documents(f, bundle_stream=bundle_stream, ids=ids) for f in conll_files
+            )
+
+    tasks: ty.List[ty.Tuple[ty.Union[str, pathlib.Path], ty.Optional[ty.Tuple[int, int]]]]
+    if len(conll_files) >= jobs:
+        tasks = [(f, None) for f in conll_files]
+    else:
+        parts = -(-jobs // len(conll_files))
+        tasks = [(f, r) for f in conll_files for r in split_index(load_index(f), parts)]
+    files, ranges = [f for f, _ in tasks], [r for _, r in tasks]
+    n = len(tasks)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        if bundle_file is None:
+            return sum(
+                executor.map(convert_file, files, [out_dir] * n, [None] * n, [ids] * n, ranges)
+            )
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            part_files = [pathlib.Path(tmp_dir) / f"part-{i}.jsonl" for i in range(n)]
+            num_documents = sum(
+                executor.map(convert_file, files, [None] * n, part_files, [ids] * n, ranges)
+            )
+            with smart_open(bundle_file, "w") as bundle_stream:
+                for part in part_files:
+                    with part.open() as part_stream:
+                        shutil.copyfileobj(part_stream, bundle_stream)
+    return num_documents
+
+
 def main_entry_point(argv=None):
+    # Imported here so that importing this module (e.g. from `scorch.main`) stays cheap
+    from docopt import docopt
+
     arguments = docopt(__doc__, version=__version__, argv=argv)
+    if arguments["--index"]:
+        for f in arguments["<conll-file>"]:
+            print(f"{f}: {len(load_index(f))} documents", file=sys.stderr)
+        return 0
+    if arguments["--ids"] not in ID_STYLES:
+        print(
+            f"Unsupported identifiers style {arguments['--ids']!r}, use one of {', '.join(ID_STYLES)}",
+            file=sys.stderr,
+        )
+        return 1
+    conll_files = arguments["<conll-file>"]
     # Since there are no support for default positional arguments in
     # docopt yet. Might be useful for complex default values, too
-    if arguments["<out-dir>"] is None:
-        if arguments["<conll-file>"] == "-":
-            arguments["<out-dir>"] = pathlib.Path.cwd()
-        else:
-            arguments["<out-dir>"] = pathlib.Path(arguments["<conll-file>"]).parent
+    if arguments["--out-dir"] is not None:
+        out_dir = pathlib.Path(arguments["--out-dir"])
+    elif arguments["<out-dir>"] is not None:
+        out_dir = pathlib.Path(arguments["<out-dir>"])
+    elif conll_files[0] == "-":
+        out_dir = pathlib.Path.cwd()
     else:
-        arguments["<out-dir>"] = pathlib.Path(arguments["<out-dir>"])
-
-    with smart_open(arguments["<conll-file>"]) as in_stream:
-        documents = list(parse_file((l.strip() for l in in_stream)))
-
-    for name, entities in documents:
-        sanitized_name = name.replace("/", "_")
-        out_path = arguments["<out-dir>"] / f"{sanitized_name}.json"
-        with out_path.open("w") as out_stream:
-            json.dump(
-                {
-                    "name": name,
-                    "type": "clusters",
-                    "clusters": {
-                        e: [f"{block}.{start}-{end}" for block, start, end in c]
-                        for e, c in entities.items()
-                    },
-                },
-                out_stream,
-            )
+        out_dir = pathlib.Path(conll_files[0]).parent
+
+    convert_files(
+        conll_files,
+        out_dir=out_dir,
+        bundle_file=arguments["--bundle"],
+        jobs=int(arguments["--jobs"]),
+        ids=arguments["--ids"],
+    )
 
 
 if __name__ == "__main__":
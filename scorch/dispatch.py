@@ -0,0 +1,246 @@
+r"""
+Size-aware choice of the metric implementations.
+
+Some metrics have several exact implementations in [`scores.py`](/scorch/scores.py) with different
+trade-offs:
+
+- BLANC can count links with dense `$n×n$` adjacency matrices (`scores.fast_detailed_blanc`),
+  which is fast for small documents thanks to NumPy but quadratic in memory, or from the sparse
+  contingency table (`scores.sparse_detailed_blanc`), which is linear.
+- CEAF can solve a single assignment problem on a dense `$\#K×\#R$` similarity matrix, or one
+  for every connected component of the graph of overlapping clusters (`scores.ceaf` with
+  `sparse=True`), which only needs matrices the size of the largest component.
+
+`metric_options` estimates the memory footprint of the dense implementations from the number of
+mentions and clusters of a document and picks them only if they fit in the memory budget and the
+document is smaller than a crossover threshold. The sparse implementations are used otherwise,
+since their footprint is always the smallest. The budget thus only bounds the dense
+implementations: the sparse ones are used whatever their footprint, since there is nothing leaner
+to fall back to.
+
+The default thresholds are conservative, `autotune` measures the actual crossovers on the current
+machine and saves them in `CONFIG_PATH`, where they are read from afterwards.
+"""
+import json
+import math
+import os
+import pathlib
+import random
+import time
+
+import typing as ty
+
+
+# Crossover thresholds below which the dense implementations are used: the number of mentions for
+# BLANC and the number of cells of the similarity matrix for CEAF
+DEFAULT_THRESHOLDS = {"BLANC": 64, "CEAF": 1024}
+CONFIG_FORMAT_VERSION = 1
+CONFIG_PATH = (
+    pathlib.Path(os.environ.get("XDG_CONFIG_HOME", pathlib.Path.home() / ".config"))
+    / "scorch"
+    / "autotune.json"
+)
+
+# Bytes per unit of the dense implementations: two boolean adjacency matrices and their
+# temporaries for BLANC, the float64 similarity matrix and the copy made by the solver for CEAF.
+BLANC_BYTES_PER_LINK = 4
+CEAF_BYTES_PER_CELL = 16
+
+SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+_thresholds: ty.Optional[ty.Dict[str, int]] = None
+
+
+def parse_size(spec: str) -> int:
+    """Parse a number of bytes with an optional binary unit suffix, e.g. `512M` or `2GiB`."""
+    s = spec.strip().upper()
+    for suffix in ("IB", "B"):
+        if s.endswith(suffix):
+            s = s[: -len(suffix)]
+            break
+    unit = s[-1:] if s[-1:] in SIZE_UNITS else ""
+    try:
+        size = float(s[: len(s) - len(unit)]) * SIZE_UNITS[unit]
+        if not math.isfinite(size):
+            raise ValueError(size)
+    except ValueError:
+        raise ValueError(f"Invalid size {spec!r}, expected e.g. `512M` or `2G`")
+    if size < 0:
+        raise ValueError(f"Invalid size {spec!r}, expected a non-negative size")
+    return int(size)
+
+
+def load_thresholds(
+    config_path: ty.Optional[ty.Union[str, pathlib.Path]] = None
+) -> ty.Dict[str, int]:
+    """
+    Return the crossover thresholds saved by `autotune` in `#config_path` (`CONFIG_PATH` by
+    default), or `DEFAULT_THRESHOLDS` for the metrics that have not been calibrated.
+    """
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    try:
+        with open(config_path or CONFIG_PATH) as in_stream:
+            obj = json.load(in_stream)
+    except (OSError, ValueError):
+        return thresholds
+    if isinstance(obj, dict) and obj.get("version") == CONFIG_FORMAT_VERSION:
+        thresholds.update(
+            (name, int(value))
+            for name, value in obj.get("thresholds", {}).items()
+            if name in thresholds
+        )
+    return thresholds
+
+
+def current_thresholds() -> ty.Dict[str, int]:
+    """Return the thresholds of the current machine, read once from `CONFIG_PATH`."""
+    global _thresholds
+    if _thresholds is None:
+        _thresholds = load_thresholds()
+    return _thresholds
+
+
+def blanc_footprint(num_mentions: int) -> int:
+    """Return the estimated peak memory of the dense BLANC implementation, in bytes."""
+    return BLANC_BYTES_PER_LINK * num_mentions * num_mentions
+
+
+def ceaf_footprint(num_key: int, num_response: int) -> int:
+    """Return the estimated peak memory of the dense CEAF implementation, in bytes."""
+    return CEAF_BYTES_PER_CELL * num_key * num_response
+
+
+def metric_options(
+    key: ty.Sequence[ty.Set],
+    response: ty.Sequence[ty.Set],
+    max_memory: ty.Optional[int] = None,
+    thresholds: ty.Optional[ty.Dict[str, int]] = None,
+    implicit_singletons: bool = False,
+) -> ty.Dict[str, ty.Dict[str, ty.Any]]:
+    """
+    Return the keyword arguments that select the implementation of the metrics that have several,
+    by metric name, for a document.
+
+    The dense implementations are chosen if the document is under the crossover `#thresholds`
+    (`current_thresholds()` by default) and their estimated footprint is at most `#max_memory`
+    bytes, if given. `#max_memory` doesn't apply to the sparse implementations, which are the
+    fallback.
+
+    If the metrics are computed with `#implicit_singletons` (see
+    `scores.implicit_key_singletons`), the rows that the dense CEAF adds for them, one per response
+    cluster that has mentions outside of `#key`, are counted too. BLANC already counts all the
+    mentions of both clusterings.
+    """
+    if thresholds is None:
+        thresholds = current_thresholds()
+    key_mentions: ty.Set[ty.Hashable] = set().union(*key)
+    num_mentions = len(key_mentions.union(*response))
+    num_key = len(key)
+    if implicit_singletons:
+        num_key += sum(1 for r in response if not r <= key_mentions)
+    blanc_dense = num_mentions <= thresholds["BLANC"] and (
+        max_memory is None or blanc_footprint(num_mentions) <= max_memory
+    )
+    ceaf_dense = num_key * len(response) <= thresholds["CEAF"] and (
+        max_memory is None or ceaf_footprint(num_key, len(response)) <= max_memory
+    )
+    return {
+        "CEAF_m": {"sparse": not ceaf_dense},
+        "CEAF_e": {"sparse": not ceaf_dense},
+        "BLANC": {"sparse": not blanc_dense},
+    }
+
+
+def _benchmark_clusterings(
+    num_mentions: int, rng: random.Random
+) -> ty.Tuple[ty.List[ty.Set], ty.List[ty.Set]]:
+    """
+    Return a random key clustering of `#num_mentions` mentions and a response where some mentions
+    are moved to other clusters, which gives realistic overlap graphs with many small components.
+    """
+    mentions = list(range(num_mentions))
+    rng.shuffle(mentions)
+    key: ty.List[ty.Set] = []
+    i = 0
+    while i < num_mentions:
+        size = min(int(rng.paretovariate(1.5)), 64)
+        key.append(set(mentions[i : i + size]))
+        i += size
+    response = [set(k) for k in key]
+    for m in rng.sample(mentions, num_mentions // 20):
+        for r in response:
+            if m in r:
+                r.discard(m)
+                break
+        rng.choice(response).add(m)
+    return key, [r for r in response if r]
+
+
+def _time(fun: ty.Callable[[], ty.Any], repeats: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fun()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def autotune(
+    max_mentions: int = 8192, seed: int = 0, log: ty.Optional[ty.TextIO] = None,
+) -> ty.Dict[str, int]:
+    """
+    Time the dense and sparse implementations of BLANC and CEAF on random documents of increasing
+    sizes up to `#max_mentions` and return the crossover thresholds, i.e. the largest sizes for
+    which the dense implementations are faster.
+    """
+    from scorch import scores
+
+    rng = random.Random(seed)
+    found = {"BLANC": 0, "CEAF": 0}
+    # Number of consecutive sizes for which the dense implementation was slower
+    losses = {"BLANC": 0, "CEAF": 0}
+    num_mentions = 32
+    while num_mentions <= max_mentions and min(losses.values()) < 2:
+        key, response = _benchmark_clusterings(num_mentions, rng)
+        sizes = {"BLANC": num_mentions, "CEAF": len(key) * len(response)}
+        timings = {
+            "BLANC": (
+                _time(lambda: scores.blanc(key, response)),
+                _time(lambda: scores.blanc(key, response, sparse=True)),
+            ),
+            "CEAF": (
+                _time(lambda: scores.ceaf_e(key, response)),
+                _time(lambda: scores.ceaf_e(key, response, sparse=True)),
+            ),
+        }
+        for name, (dense, sparse) in timings.items():
+            # The dense implementations only get worse with size, two losses in a row are taken
+            # as the crossover rather than noise
+            if losses[name] >= 2:
+                continue
+            if dense <= sparse:
+                found[name] = max(found[name], sizes[name])
+                losses[name] = 0
+            else:
+                losses[name] += 1
+            if log is not None:
+                print(
+                    f"{name}\t{sizes[name]}\tdense={dense:.6f}s\tsparse={sparse:.6f}s", file=log,
+                )
+        num_mentions *= 2
+    return found
+
+
+def save_thresholds(
+    found: ty.Dict[str, int], config_path: ty.Optional[ty.Union[str, pathlib.Path]] = None
+) -> pathlib.Path:
+    """Save thresholds found by `autotune` to `#config_path` (`CONFIG_PATH` by default)."""
+    global _thresholds
+    path = pathlib.Path(config_path or CONFIG_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as out_stream:
+        json.dump({"version": CONFIG_FORMAT_VERSION, "thresholds": found}, out_stream)
+        out_stream.write("\n")
+    if config_path is None:
+        _thresholds = None
+    return path
@@ -0,0 +1,744 @@
+r"""
+Incremental scoring of a response clustering under merge and split edits and mention additions.
+
+Decoders that explore the space of clusterings (greedy, beam search…) typically score many
+candidates that differ from the current clustering by a single merge or split. Rescoring every
+candidate from scratch with [`scores.py`](/scorch/scores.py) costs time proportional to the size
+of the whole document, whereas an edit only changes the contributions of the clusters it touches.
+
+`IncrementalScorer` keeps the sparse contingency table of the key and response clusterings (see
+`scores.contingency`) along with the numerators and denominators of the metrics and updates them
+when response clusters are merged or split, in time proportional to the number of key clusters
+that overlap the affected response clusters, or when a mention is added to both clusterings, in
+constant time (except for CEAF). The scores are the same as those of the
+corresponding functions of [`scores.py`](/scorch/scores.py), up to floating point errors.
+
+- MUC: both numerators are `$N-\#\{(k, r)|k∩r≠∅\}$`, where `$N$` is the number of mentions that
+  are in both clusterings, so it is enough to count the non-zero cells of the table.
+- B³: the contributions `$∑_k\#k∩r²$` of response clusters and `$∑_r\#k∩r²$` of key clusters are
+  updated for the affected clusters only.
+- CEAF: the optimal alignment is the union of the optimal alignments of the connected components
+  of the bipartite overlap graph between key and response clusters, so only the components that
+  contain the edited clusters are realigned, and only when the scores are requested, so a series of
+  edits realigns every affected component once.
+- BLANC: the numbers of links are those of `scores.sparse_detailed_blanc`, whose only terms that
+  depend on the response are `$∑_{i,j}l(n_{ij})$`, `$∑_jl(\#r_j)$` and `$∑_jl(b_j)$`.
+- LEA: the contribution of a non-singleton cluster `$x$` is `$\frac{2}{\#x-1}$` times its
+  number of common links, so the numerators are kept as exact totals of common links by cluster
+  size, updated for the affected clusters only, along with the number of resolved singletons.
+
+`threshold_sweep` uses it to score the clusterings of a weighted link graph at every threshold by
+adding the links in decreasing order of score, for roughly the cost of a single scoring pass, and
+`prefix_curve` to score every prefix of a document by adding its mentions block by block, as an
+online system would see them.
+
+## Example
+
+```python
+scorer = IncrementalScorer(key, response)
+scorer.merge(0, 1)  # The scores with response clusters 0 and 1 merged
+scorer.split(0, {"a", "b"})  # Then with "a" and "b" moved to a new cluster
+scorer.add_mention("c", 0, 1)  # Then with "c" added to the first key and second response clusters
+```
+"""
+import itertools
+import math
+
+import typing as ty
+
+from collections import Counter
+from statistics import harmonic_mean, mean
+
+from scorch import scores
+from scorch import spans
+
+
+Scores = ty.Dict[str, ty.Tuple[float, float, float]]
+
+METRICS = ("MUC", "B³", "CEAF_m", "CEAF_e", "BLANC", "LEA")
+
+
+class IncrementalScorer:
+    """
+    Scores of a response clustering that can be edited by merging and splitting its clusters.
+
+    The response clusters are identified by integers: their indices in the initial `#response` and
+    then the ids returned by `split` and given to `add_mention` for the new clusters. The mentions
+    of the key and the response only change with `add_mention`.
+
+    If `#implicit_singletons` is true, the response mentions that are not in the key are scored as
+    key singletons without being added to `key` (see `scorch.scores.implicit_key_singletons`):
+    only their number in every response cluster is kept, so they cost nothing but their mentions.
+    """
+
+    def __init__(
+        self,
+        key: ty.Sequence[ty.Set],
+        response: ty.Sequence[ty.Set],
+        implicit_singletons: bool = False,
+    ):
+        table = scores.contingency(key, response)
+        self.key = [set(k) for k in key]
+        self.key_sizes = table.key_sizes
+        self.clusters: ty.Dict[int, ty.Set] = {j: set(r) for j, r in enumerate(response)}
+        self._next_id = len(response)
+        self._key_of = {m: i for i, k in enumerate(self.key) for m in k}
+
+        # The number of implicit key singletons of every response cluster, each of them being a
+        # cell of `$1$` of the contingency table
+        self.implicit_singletons = implicit_singletons
+        self._extra: ty.Dict[int, int] = dict(
+            enumerate(
+                scores.extra_mentions_counts(table)
+                if implicit_singletons
+                else [0] * len(response)
+            )
+        )
+        self._num_extra = sum(self._extra.values())
+
+        # Both sides of the sparse contingency table
+        self._overlaps: ty.Dict[int, ty.Counter[int]] = {j: Counter() for j in self.clusters}
+        self._key_overlaps: ty.List[ty.Counter[int]] = [Counter() for _ in self.key]
+        for (i, j), n in table.overlaps.items():
+            self._overlaps[j][i] = n
+            self._key_overlaps[i][j] = n
+
+        self._common_mentions = sum(table.overlaps.values()) + self._num_extra
+        self._cells = len(table.overlaps) + self._num_extra
+        self._response_mentions = sum(table.response_sizes)
+        self._common_links = sum(link(n) for n in table.overlaps.values())
+
+        # The contributions of the key clusters, see `_add_key`, the key singletons and their
+        # response clusters being accounted for in `_add_response` for LEA
+        self._key_stats: ty.List[ty.List[int]] = [
+            self._overlap_stats(c) for c in self._key_overlaps
+        ]
+        self._key_mentions = 0
+        self._muc_key_denominator = 0
+        self._linked_keys = 0
+        self._b_cubed_key_numerator = 0.0
+        self._key_links = 0
+        self._key_common_links = 0
+        self._lea_key_links: ty.Counter[int] = Counter()
+        for i in range(len(self.key)):
+            self._add_key(i)
+        # Every implicit key singleton is a key mention whose B³ recall is `$1$`
+        self._key_mentions += self._num_extra
+        self._b_cubed_key_numerator += self._num_extra
+
+        # The contributions of the response clusters, see `_add_response`
+        self._stats: ty.Dict[int, ty.List[int]] = {
+            j: self._overlap_stats(self._overlaps[j], self._extra[j]) for j in self.clusters
+        }
+        self._b_cubed_response_numerator = 0.0
+        self._linked_clusters = 0
+        self._response_links = 0
+        self._response_common_links = 0
+        self._lea_response_links: ty.Counter[int] = Counter()
+        self._lea_singletons = 0
+        for j in self.clusters:
+            self._add_response(j)
+
+        # CEAF
+        self._component_of_key: ty.Dict[int, int] = dict()
+        self._component_of_response: ty.Dict[int, int] = dict()
+        self._components: ty.Dict[int, ty.Tuple[ty.Set[int], ty.Set[int]]] = dict()
+        self._component_similarities: ty.Dict[int, ty.Tuple[float, float]] = dict()
+        # Components whose alignment has not been computed yet
+        self._unaligned: ty.Set[int] = set()
+        self._component_ids = itertools.count()
+        self._ceaf_m_similarity = 0.0
+        self._ceaf_e_similarity = 0.0
+        seen: ty.Set[int] = set()
+        for j in self.clusters:
+            if j not in seen:
+                keys, responses = self._component_from(responses={j})
+                seen.update(responses)
+                self._add_component(keys, responses)
+        for i in range(len(self.key)):
+            if i not in self._component_of_key:
+                self._add_component({i}, set())
+
+    def _component_from(
+        self, keys: ty.Iterable[int] = (), responses: ty.Iterable[int] = ()
+    ) -> ty.Tuple[ty.Set[int], ty.Set[int]]:
+        """Return the `(keys, responses)` of the connected component of the given clusters."""
+        component_keys, component_responses = set(keys), set(responses)
+        key_queue, response_queue = list(component_keys), list(component_responses)
+        while key_queue or response_queue:
+            while key_queue:
+                for j in self._key_overlaps[key_queue.pop()]:
+                    if j not in component_responses:
+                        component_responses.add(j)
+                        response_queue.append(j)
+            while response_queue:
+                for i in self._overlaps[response_queue.pop()]:
+                    if i not in component_keys:
+                        component_keys.add(i)
+                        key_queue.append(i)
+        return component_keys, component_responses
+
+    def _add_component(self, keys: ty.Set[int], responses: ty.Set[int]):
+        c = next(self._component_ids)
+        self._components[c] = (keys, responses)
+        for i in keys:
+            self._component_of_key[i] = c
+        for j in responses:
+            self._component_of_response[j] = c
+        self._unaligned.add(c)
+
+    def _join_components(self, c_a: int, c_b: int) -> int:
+        """
+        Merge two components by moving the members of the smallest one to the other one, return
+        the id of the merged component.
+        """
+        self._invalidate_component(c_a)
+        if c_b == c_a:
+            return c_a
+        self._invalidate_component(c_b)
+        if sum(map(len, self._components[c_a])) < sum(map(len, self._components[c_b])):
+            c_a, c_b = c_b, c_a
+        keys, responses = self._components[c_a]
+        b_keys, b_responses = self._components.pop(c_b)
+        self._unaligned.remove(c_b)
+        keys.update(b_keys)
+        responses.update(b_responses)
+        for i in b_keys:
+            self._component_of_key[i] = c_a
+        for j in b_responses:
+            self._component_of_response[j] = c_a
+        return c_a
+
+    def _remove_component(self, c: int):
+        del self._components[c]
+        self._invalidate_component(c)
+        self._unaligned.remove(c)
+
+    def _invalidate_component(self, c: int):
+        """Remove the similarities of a component that has changed until it is realigned."""
+        if c not in self._unaligned:
+            m, e = self._component_similarities.pop(c)
+            self._ceaf_m_similarity -= m
+            self._ceaf_e_similarity -= e
+            self._unaligned.add(c)
+
+    def _align_components(self):
+        """Compute the alignments of the components that have changed since the last call."""
+        for c in self._unaligned:
+            similarities = self._align(*self._components[c])
+            self._component_similarities[c] = similarities
+            self._ceaf_m_similarity += similarities[0]
+            self._ceaf_e_similarity += similarities[1]
+        self._unaligned.clear()
+
+    def _align(self, keys: ty.Set[int], responses: ty.Set[int]) -> ty.Tuple[float, float]:
+        """
+        Return the optimal CEAFₘ and CEAFₑ similarities for a connected component.
+
+        As in `scorch.scores.ceaf`, the implicit key singletons of a response cluster are a single
+        row of the assignment problem, since at most one of them can be aligned.
+        """
+        extra_rows = sorted(j for j in responses if self._extra[j])
+        if not responses or not keys and not extra_rows:
+            return 0.0, 0.0
+        if len(keys) + len(extra_rows) == 1 and len(responses) == 1:
+            (j,) = responses
+            if not keys:
+                return 1.0, 2 / (1 + len(self.clusters[j]))
+            (i,) = keys
+            n = self._overlaps[j][i]
+            return float(n), 2 * n / (self.key_sizes[i] + len(self.clusters[j]))
+
+        import numpy as np
+        from scipy.optimize import linear_sum_assignment
+
+        key_list, response_list = sorted(keys), sorted(responses)
+        row_of = {i: row for row, i in enumerate(key_list)}
+        col_of = {j: col for col, j in enumerate(response_list)}
+        # Fill the matrix from the sparse table, the overlaps of the clusters of a component are
+        # in the component
+        overlaps = np.zeros((len(key_list) + len(extra_rows), len(response_list)))
+        for col, j in enumerate(response_list):
+            for i, n in self._overlaps[j].items():
+                overlaps[row_of[i], col] = n
+        for row, j in enumerate(extra_rows, start=len(key_list)):
+            overlaps[row, col_of[j]] = 1
+        sizes_sums = np.add.outer(
+            np.array(
+                [*(self.key_sizes[i] for i in key_list), *(1 for _ in extra_rows)], dtype=float
+            ),
+            np.array([len(self.clusters[j]) for j in response_list], dtype=float),
+        )
+        similarities = []
+        for matrix in (overlaps, 2 * overlaps / sizes_sums):
+            row_ind, col_ind = linear_sum_assignment(-matrix)
+            similarities.append(matrix[row_ind, col_ind].sum().item())
+        return similarities[0], similarities[1]
+
+    @staticmethod
+    def _overlap_stats(overlaps: ty.Counter[int], extra: int = 0) -> ty.List[int]:
+        """
+        Return `$[∑_jn_{ij}², ∑_jl(n_{ij}), ∑_jn_{ij}]$` for the `#overlaps` of a cluster and its
+        `#extra` implicit key singletons, which are kept up to date by the edits in `_key_stats`
+        and `_stats`.
+        """
+        counts = overlaps.values()
+        return [
+            sum(n * n for n in counts) + extra,
+            sum(link(n) for n in counts),
+            sum(counts) + extra,
+        ]
+
+    def _update_key(self, i: int, sign: int):
+        """
+        Add (`#sign` being `1`) or remove (`-1`) the contributions of a key cluster that depend on
+        its contents.
+        """
+        size = self.key_sizes[i]
+        squares, common_links, common_mentions = self._key_stats[i]
+        self._key_mentions += sign * size
+        if squares:
+            self._b_cubed_key_numerator += sign * squares / size
+        self._key_links += sign * link(size)
+        self._key_common_links += sign * link(common_mentions)
+        if size > 1:
+            self._muc_key_denominator += sign * (size - 1)
+            self._linked_keys += sign
+            self._lea_key_links[size] += sign * common_links
+
+    def _remove_key(self, i: int):
+        """Remove the contributions of a key cluster that depend on its contents."""
+        self._update_key(i, -1)
+
+    def _add_key(self, i: int):
+        self._update_key(i, 1)
+
+    def _update_response(self, j: int, sign: int):
+        """
+        Add (`#sign` being `1`) or remove (`-1`) the contributions of a response cluster that
+        depend on its contents.
+        """
+        size = len(self.clusters[j])
+        squares, common_links, common_mentions = self._stats[j]
+        if squares:
+            self._b_cubed_response_numerator += sign * squares / size
+        self._response_links += sign * link(size)
+        self._response_common_links += sign * link(common_mentions)
+        if size > 1:
+            self._linked_clusters += sign
+            self._lea_response_links[size] += sign * common_links
+        else:
+            # A singleton's self-link is resolved iff its mention is also a key singleton
+            self._lea_singletons += sign * (
+                sum(1 for i in self._overlaps[j] if self.key_sizes[i] == 1) + self._extra[j]
+            )
+
+    def _remove_response(self, j: int):
+        """Remove the contributions of a response cluster that depend on its contents."""
+        self._update_response(j, -1)
+
+    def _add_response(self, j: int):
+        self._update_response(j, 1)
+
+    def merge(self, a: int, b: int) -> Scores:
+        """Merge the response cluster `#b` in `#a` and return the new scores."""
+        self._merge(a, b)
+        return self.scores()
+
+    def _merge(self, a: int, b: int):
+        if a == b:
+            raise ValueError("Can't merge a cluster with itself")
+        self._remove_response(a)
+        self._remove_response(b)
+        overlaps_a = self._overlaps[a]
+        # `$∑_imn$` over the key clusters shared by `a` and `b`
+        cross = 0
+        for i, n in self._overlaps.pop(b).items():
+            m = overlaps_a.get(i, 0)
+            if m:
+                cross += m * n
+                # The (i, b) cell disappears into the (i, a) one
+                self._cells -= 1
+                self._b_cubed_key_numerator += 2 * m * n / self.key_sizes[i]
+                # `$l(m+n)-l(m)-l(n)=mn$` new common links
+                self._common_links += m * n
+                self._lea_key_links[self.key_sizes[i]] += m * n
+                key_stats = self._key_stats[i]
+                key_stats[0] += 2 * m * n
+                key_stats[1] += m * n
+            overlaps_a[i] = m + n
+            key_overlaps = self._key_overlaps[i]
+            del key_overlaps[b]
+            key_overlaps[a] = m + n
+        self.clusters[a].update(self.clusters.pop(b))
+        a_stats, b_stats = self._stats[a], self._stats.pop(b)
+        # `$(m+n)²=m²+n²+2mn$` and `$l(m+n)=l(m)+l(n)+mn$`
+        a_stats[0] += b_stats[0] + 2 * cross
+        a_stats[1] += b_stats[1] + cross
+        a_stats[2] += b_stats[2]
+        self._extra[a] += self._extra.pop(b)
+        self._add_response(a)
+
+        # Only the component of the merged cluster changes, and it is the union of the initial
+        # components
+        c_a = self._join_components(
+            self._component_of_response[a], self._component_of_response[b]
+        )
+        self._components[c_a][1].remove(b)
+        del self._component_of_response[b]
+
+    def split(self, a: int, part: ty.Iterable) -> ty.Tuple[int, Scores]:
+        """
+        Move the mentions of `#part` from the response cluster `#a` to a new cluster, return the id
+        of the new cluster and the new scores.
+
+        `split(a, b_mentions)` undoes a `merge(a, b)`, albeit with a new id for the second cluster.
+        """
+        part = set(part)
+        cluster = self.clusters[a]
+        if not part or not part < cluster:
+            raise ValueError("The split part must be a non-empty proper subset of the cluster")
+        b = self._next_id
+        self._next_id += 1
+        self._remove_response(a)
+        cluster.difference_update(part)
+        self.clusters[b] = part
+        overlaps_a = self._overlaps[a]
+        overlaps_b: ty.Counter[int] = Counter(
+            self._key_of[m] for m in part if m in self._key_of
+        )
+        extra_b = (
+            sum(1 for m in part if m not in self._key_of) if self.implicit_singletons else 0
+        )
+        self._overlaps[b] = overlaps_b
+        self._stats[b] = self._overlap_stats(overlaps_b, extra_b)
+        self._extra[b] = extra_b
+        self._extra[a] -= extra_b
+        a_stats = self._stats[a]
+        a_stats[0] -= extra_b
+        a_stats[2] -= extra_b
+        for i, n in overlaps_b.items():
+            m = overlaps_a[i] - n
+            a_stats[0] -= 2 * m * n + n * n
+            a_stats[1] -= m * n + link(n)
+            a_stats[2] -= n
+            key_overlaps = self._key_overlaps[i]
+            key_overlaps[b] = n
+            if m:
+                self._cells += 1
+                self._b_cubed_key_numerator -= 2 * m * n / self.key_sizes[i]
+                self._common_links -= m * n
+                self._lea_key_links[self.key_sizes[i]] -= m * n
+                key_stats = self._key_stats[i]
+                key_stats[0] -= 2 * m * n
+                key_stats[1] -= m * n
+                overlaps_a[i] = key_overlaps[a] = m
+            else:
+                del overlaps_a[i]
+                del key_overlaps[a]
+        self._add_response(a)
+        self._add_response(b)
+
+        # The component of `a` may be split in several components
+        c = self._component_of_response[a]
+        keys, responses = self._components[c]
+        self._remove_component(c)
+        responses.add(b)
+        while responses or keys:
+            if responses:
+                component = self._component_from(responses={next(iter(responses))})
+            else:
+                component = self._component_from(keys={next(iter(keys))})
+            keys -= component[0]
+            responses -= component[1]
+            self._add_component(*component)
+        return b, self.scores()
+
+    def add_mention(
+        self,
+        mention: ty.Hashable,
+        key_cluster: ty.Optional[int] = None,
+        response_cluster: ty.Optional[int] = None,
+    ) -> Scores:
+        """
+        Add a new `#mention` to the key cluster `#key_cluster` and to the response cluster
+        `#response_cluster` (or only to one of them if the other one is `None`) and return the new
+        scores.
+
+        `#key_cluster` can be `len(self.key)` to add a new key cluster and `#response_cluster` any
+        id that is not in `self.clusters` to add a new response cluster. The mention must not
+        already be in either clustering. With implicit singletons, a mention that is only added to
+        the response is an implicit key singleton.
+        """
+        self._add_mention(mention, key_cluster, response_cluster)
+        return self.scores()
+
+    def _add_mention(
+        self,
+        mention: ty.Hashable,
+        key_cluster: ty.Optional[int] = None,
+        response_cluster: ty.Optional[int] = None,
+    ):
+        i, j = key_cluster, response_cluster
+        if i is None and j is None:
+            raise ValueError("A mention must be added to the key or to the response")
+        # The response clusters whose contributions change
+        affected: ty.Set[int] = set()
+        if i is not None:
+            if mention in self._key_of:
+                raise ValueError(f"{mention!r} is already in the key")
+            if i == len(self.key):
+                self.key.append(set())
+                self.key_sizes.append(0)
+                self._key_overlaps.append(Counter())
+                self._key_stats.append([0, 0, 0])
+                self._add_component({i}, set())
+            elif not 0 <= i < len(self.key):
+                raise ValueError(f"Invalid key cluster {i}")
+            elif self.key_sizes[i] == 1:
+                # The key singleton stops being one, which changes the LEA contribution of the
+                # response singleton it is in, if any
+                affected.update(self._key_overlaps[i])
+            self._remove_key(i)
+        if j is not None:
+            if j not in self.clusters:
+                self.clusters[j] = set()
+                self._overlaps[j] = Counter()
+                self._stats[j] = [0, 0, 0]
+                self._extra[j] = 0
+                self._next_id = max(self._next_id, j + 1)
+                self._add_component(set(), {j})
+            affected.add(j)
+        for r in affected:
+            self._remove_response(r)
+
+        if i is not None:
+            self.key[i].add(mention)
+            self.key_sizes[i] += 1
+            self._key_of[mention] = i
+            self._invalidate_component(self._component_of_key[i])
+        if j is not None:
+            self.clusters[j].add(mention)
+            self._response_mentions += 1
+            self._invalidate_component(self._component_of_response[j])
+            if i is None and self.implicit_singletons:
+                self._extra[j] += 1
+                self._num_extra += 1
+                self._common_mentions += 1
+                self._cells += 1
+                self._key_mentions += 1
+                self._b_cubed_key_numerator += 1
+                stats = self._stats[j]
+                stats[0] += 1
+                stats[2] += 1
+        if i is not None and j is not None:
+            n = self._overlaps[j][i]
+            if not n:
+                self._cells += 1
+            self._common_mentions += 1
+            # `$l(n+1)-l(n)=n$` new common links
+            self._common_links += n
+            self._overlaps[j][i] = self._key_overlaps[i][j] = n + 1
+            for stats in (self._key_stats[i], self._stats[j]):
+                stats[0] += 2 * n + 1
+                stats[1] += n
+                stats[2] += 1
+            self._join_components(self._component_of_key[i], self._component_of_response[j])
+
+        if i is not None:
+            self._add_key(i)
+        for r in affected:
+            self._add_response(r)
+
+    def scores(self) -> Scores:
+        """Return the current `metric → (R, P, F)` scores."""
+        self._align_components()
+        res: Scores = dict()
+
+        if not self._linked_keys or not self._linked_clusters:
+            res["MUC"] = (0.0, 0.0, 0.0)
+        else:
+            numerator = self._common_mentions - self._cells
+            R = numerator / self._muc_key_denominator
+            P = numerator / (self._response_mentions - len(self.clusters))
+            res["MUC"] = (R, P, harmonic_mean((R, P)))
+
+        R = self._b_cubed_key_numerator / self._key_mentions if self._key_mentions else 0.0
+        P = (
+            self._b_cubed_response_numerator / self._response_mentions
+            if self._response_mentions
+            else 0.0
+        )
+        res["B³"] = (R, P, harmonic_mean((R, P)))
+
+        num_keys = len(self.key) + self._num_extra
+        if not num_keys or not self.clusters:
+            res["CEAF_m"] = res["CEAF_e"] = (0.0, 0.0, 0.0)
+        else:
+            R = self._ceaf_m_similarity / self._key_mentions
+            P = self._ceaf_m_similarity / self._response_mentions
+            res["CEAF_m"] = (R, P, harmonic_mean((R, P)))
+            R = self._ceaf_e_similarity / num_keys
+            P = self._ceaf_e_similarity / len(self.clusters)
+            res["CEAF_e"] = (R, P, harmonic_mean((R, P)))
+
+        res["BLANC"] = self._blanc()
+
+        R, P = (
+            math.fsum(
+                [*(2 * n / (s - 1) for s, n in links_by_size.items()), float(self._lea_singletons)]
+            )
+            / mentions
+            if mentions
+            else 0.0
+            for links_by_size, mentions in (
+                (self._lea_key_links, self._key_mentions),
+                (self._lea_response_links, self._response_mentions),
+            )
+        )
+        res["LEA"] = (R, P, harmonic_mean((R, P)))
+        return res
+
+    def _blanc(self) -> ty.Tuple[float, float, float]:
+        """Return the BLANC scores, with the edge cases of `scores.blanc`."""
+        if len(self.key) + self._num_extra == len(self.clusters) == 1:
+            (r,) = self.clusters.values()
+            # Without explicit key cluster, the key is the implicit singleton of a mention of `r`
+            k = self.key[0] if self.key else r
+            if len(k) == len(r) == 1:
+                return (1.0, 1.0, 1.0) if k == r else (0.0, 0.0, 0.0)
+        tp_c, c_k, c_r = self._common_links, self._key_links, self._response_links
+        tp_n = (
+            link(self._common_mentions)
+            - self._key_common_links
+            - self._response_common_links
+            + self._common_links
+        )
+        n_k = link(self._key_mentions) - c_k
+        n_r = link(self._response_mentions) - c_r
+        C_score = _link_scores(tp_c, c_k, c_r)
+        N_score = _link_scores(tp_n, n_k, n_r)
+        if not c_k:
+            return N_score
+        if not n_k:
+            return C_score
+        return ty.cast(
+            ty.Tuple[float, float, float], tuple(mean(s) for s in zip(C_score, N_score))
+        )
+
+
+def link(n: int) -> int:
+    """Return the number of links between `#n` mentions."""
+    return n * (n - 1) // 2
+
+
+def _link_scores(tp: int, key: int, response: int) -> ty.Tuple[float, float, float]:
+    if not key and not response:
+        return (1.0, 1.0, 1.0)
+    elif not key or not response:
+        return (0.0, 0.0, 0.0)
+    return tp / key, tp / response, 2 * tp / (key + response)
+
+
+def prefix_curve(
+    key: ty.Sequence[ty.Set],
+    response: ty.Sequence[ty.Set],
+    every: int = 1,
+    packed: bool = False,
+    implicit_singletons: bool = False,
+) -> ty.Iterable[ty.Tuple[int, Scores]]:
+    """
+    Score the restrictions of `#key` and `#response` to the mentions of the first blocks of a
+    document, whose mention identifiers must be spans (see `scorch.spans.parse_span`, which gets
+    `#packed`), yielding `(block, scores)` pairs for the prefixes that end at every `#every`-th
+    block and for the whole document, in increasing order of block.
+
+    The mentions are sorted by block and added to an `IncrementalScorer` as they are revealed with
+    `IncrementalScorer.add_mention`, so the whole curve costs about as much as scoring the whole
+    document. The prefixes that contain no mention are skipped. See `IncrementalScorer` for
+    `#implicit_singletons`.
+    """
+    if every < 1:
+        raise ValueError(f"Invalid prefix step {every}")
+    key_of = {m: i for i, k in enumerate(key) for m in k}
+    response_of = {m: j for j, r in enumerate(response) for m in r}
+    blocks: ty.Dict[int, ty.List[ty.Hashable]] = dict()
+    for m in itertools.chain(key_of, (m for m in response_of if m not in key_of)):
+        span = spans.parse_span(m, packed)
+        if span is None:
+            raise ValueError(f"Prefix curves need span mention identifiers, got {m!r}")
+        blocks.setdefault(span.block, []).append(m)
+    if not blocks:
+        return
+    sorted_blocks = sorted(blocks)
+    # The key clusters are numbered in the order they are revealed
+    key_index: ty.Dict[int, int] = dict()
+    scorer = IncrementalScorer([], [], implicit_singletons=implicit_singletons)
+    checkpoint = every - 1 + (sorted_blocks[0] // every) * every
+    for block in sorted_blocks:
+        while checkpoint < block:
+            yield checkpoint, scorer.scores()
+            checkpoint += every
+        for m in blocks[block]:
+            i = key_of.get(m)
+            if i is not None:
+                i = key_index.setdefault(i, len(key_index))
+            scorer._add_mention(m, i, response_of.get(m))
+        if block == checkpoint:
+            checkpoint += every
+            yield block, scorer.scores()
+        elif block == sorted_blocks[-1]:
+            yield block, scorer.scores()
+
+
+def threshold_sweep(
+    key: ty.Sequence[ty.Set],
+    mentions: ty.Iterable[ty.Hashable],
+    links: ty.Iterable[ty.Tuple[ty.Hashable, ty.Hashable, float]],
+    thresholds: ty.Optional[ty.Iterable[float]] = None,
+    implicit_singletons: bool = False,
+) -> ty.Iterable[ty.Tuple[float, Scores]]:
+    """
+    Score the clusterings of the response `#mentions` induced by the weighted `#links` (as
+    `(source, target, score)` triples) whose score is at least a threshold, for every threshold of
+    `#thresholds` (every distinct link score by default), yielding `(threshold, scores)` pairs in
+    decreasing order of threshold.
+
+    The links are sorted once and added in decreasing order of score, every link that joins two
+    clusters being a `IncrementalScorer.merge` tracked by a union-find, so the whole curve costs
+    about as much as scoring the clustering of the lowest threshold. Link endpoints missing from
+    `#mentions` are response mentions too. See `IncrementalScorer` for `#implicit_singletons`.
+    """
+    sorted_links = sorted(links, key=lambda l: l[2], reverse=True)
+    response_mentions = list(
+        dict.fromkeys(itertools.chain(mentions, *((s, t) for s, t, _ in sorted_links)))
+    )
+    if thresholds is None:
+        sorted_thresholds = list(dict.fromkeys(score for *_, score in sorted_links))
+    else:
+        sorted_thresholds = sorted(set(thresholds), reverse=True)
+    scorer = IncrementalScorer(
+        key, [{m} for m in response_mentions], implicit_singletons=implicit_singletons
+    )
+    cluster_of = {m: j for j, m in enumerate(response_mentions)}
+    parent = list(range(len(response_mentions)))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    i = 0
+    for threshold in sorted_thresholds:
+        while i < len(sorted_links) and sorted_links[i][2] >= threshold:
+            source, target, _ = sorted_links[i]
+            a, b = find(cluster_of[source]), find(cluster_of[target])
+            if a != b:
+                # Merging the smaller cluster in the larger one moves fewer mentions
+                if len(scorer.clusters[a]) < len(scorer.clusters[b]):
+                    a, b = b, a
+                scorer._merge(a, b)
+                parent[b] = a
+            i += 1
+        yield threshold, scorer.scores()
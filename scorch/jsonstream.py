@@ -0,0 +1,162 @@
+r"""
+Incremental reading of large JSON documents.
+
+`json.load` materializes a whole document before returning it, which for a `graph` document with
+tens of millions of links means tens of millions of Python lists, even though clustering them only
+needs to keep track of the mentions. `iter_members` reads the members of a top-level JSON object
+from a text stream in fixed-size chunks with `json.JSONDecoder.raw_decode`, and yields the
+elements of some arrays one at a time instead of building them, so they can be consumed as they
+are read. Decoding large values that way is about twice as slow as `json.load` though, so once a
+member shows that nothing else needs to be streamed, the rest of the object can be decoded at once.
+
+## Example
+
+```python
+with open("huge-graph.json") as in_stream:
+    for key, value in iter_members(in_stream, arrays=("links",)):
+        if key == "links":
+            source, target = value
+```
+"""
+import json
+
+import typing as ty
+
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789+-.eE"
+
+
+class _Reader:
+    """A buffered cursor over a text stream that decodes one JSON value at a time."""
+
+    def __init__(self, fp: ty.TextIO, chunk_size: int = CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int = 0) -> bool:
+        """
+        Read a chunk of at least `#size` characters, dropping the consumed part of the buffer,
+        return false at the end of the stream.
+        """
+        if self.eof:
+            return False
+        chunk = self.fp.read(max(size, self.chunk_size))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it, `""` at the end."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos : self.pos + 1]
+
+    def rest(self) -> str:
+        """Consume and return the rest of the stream."""
+        rest = self.buffer[self.pos :] + self.fp.read()
+        self.buffer, self.pos, self.eof = "", 0, True
+        return rest
+
+    def next_char(self, expected: str) -> str:
+        """Consume the next non-whitespace character, which must be one of `#expected`."""
+        c = self.peek()
+        if not c or c not in expected:
+            raise ValueError(
+                f"Invalid JSON: expected one of {expected!r}, got {c or 'the end of the input'!r}"
+            )
+        self.pos += 1
+        return c
+
+    def value(self) -> ty.Any:
+        """Decode the next JSON value."""
+        self.peek()
+        while True:
+            # Values that don't fit in the buffer are decoded again after every read, so the reads
+            # grow with the buffer to keep this linear
+            try:
+                obj, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if not self._fill(len(self.buffer) - self.pos):
+                    raise ValueError(f"Invalid JSON: {e}")
+                continue
+            # A number cut by the end of the buffer might still decode (e.g. `1.` as `1`), so the
+            # value must be followed by something that can't be part of a number
+            tail = end
+            while tail < len(self.buffer) and self.buffer[tail] in _NUMBER_CHARS:
+                tail += 1
+            if tail < len(self.buffer) or not self._fill(len(self.buffer) - self.pos):
+                self.pos = end
+                return obj
+
+
+def iter_members(
+    fp: ty.TextIO,
+    arrays: ty.Container[str] = (),
+    chunk_size: int = CHUNK_SIZE,
+    load_rest: ty.Optional[ty.Callable[[str, ty.Any], bool]] = None,
+) -> ty.Iterable[ty.Tuple[str, ty.Any]]:
+    """
+    Read a JSON object from `#fp` and yield its `(key, value)` members in the order of the input.
+
+    For the keys in `#arrays` whose value is an array, a `(key, element)` pair is yielded for
+    every element of the array instead, so the array is never built. Only one element is in memory
+    at a time, along with a buffer of about `#chunk_size` characters.
+
+    If `#load_rest` is given, it is called with the members that are not streamed and if it returns
+    `True`, the rest of the object is decoded at once with `json.loads` and its members are yielded
+    whole, whatever `#arrays` says.
+    """
+    reader = _Reader(fp, chunk_size=chunk_size)
+    reader.next_char("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+    else:
+        yield from _members(reader, arrays, load_rest)
+    if reader.peek():
+        raise ValueError("Invalid JSON: extra data after the end of the object")
+
+
+def _members(
+    reader: _Reader,
+    arrays: ty.Container[str],
+    load_rest: ty.Optional[ty.Callable[[str, ty.Any], bool]],
+) -> ty.Iterable[ty.Tuple[str, ty.Any]]:
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise ValueError(f"Invalid JSON: expected an object key, got {key!r}")
+        reader.next_char(":")
+        if key in arrays and reader.peek() == "[":
+            reader.pos += 1
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield key, reader.value()
+                    if reader.next_char(",]") == "]":
+                        break
+        else:
+            value = reader.value()
+            yield key, value
+            if load_rest is not None and load_rest(key, value):
+                if reader.next_char(",}") == ",":
+                    try:
+                        rest = json.loads("{" + reader.rest())
+                    except json.JSONDecodeError as e:
+                        raise ValueError(f"Invalid JSON: {e}")
+                    yield from rest.items()
+                break
+        if reader.next_char(",}") == "}":
+            break
@@ -4,49 +4,199 @@ r"""Compute CoNLL scores for coreference clustering as recommended by
 Implementation* (Pradhan et al., 2014)
 
 ## Usage:
-  scorch <gold> <sys> [<out-file>]
+  scorch serve [options] <gold>
+  scorch merge [options] <partial>...
+  scorch autotune [options]
+  scorch columns [options] <conll-file> [<out-file>]
+  scorch sweep [options] <gold> <sys> [<out-file>]
+  scorch prefix [options] <gold> <sys> [<out-file>]
+  scorch [options] <gold> <sys> [<out-file>]
 
 ## Arguments:
-  <gold>      gold input file (json) or directory, `-` for standard input
-  <sys>       system input file (json) or directory, `-` for standard input
+  <gold>      gold input file (json), directory or bundle (jsonl), `-` for standard input. For a
+              directory or bundle of system documents, this can also be a CoNLL-2012 file, whose
+              documents are accessed through an index (see `conll --index`)
+  <sys>       system input file (json), directory or bundle (jsonl), `-` for standard input
   <out-file>  output file (text), `-` for standard output [default: -]
+  <partial>   partial statistics file written by `--shard`, `-` for standard input
+  <conll-file>  CoNLL-2012 file with a gold coreference column and system columns, `-` for
+              standard input
 
 ## Options:
-  -h, --help       Show this screen.
+  --format=<format>  Output format: `text`, `json`, `jsonl` or `csv` [default: text]
+  --per-document     Also output the scores of every document as soon as it has been scored
+                     (only for directories and bundles)
+  --cross-document   Score directories and bundles as a single corpus-wide clustering: mentions and
+                     entities are namespaced by document
+  --global-entities  (`--cross-document`) Clusters with the same name in different documents are
+                     the same entity
+  --match=<mode>     How to match system mentions to gold mentions: `exact` compares their
+                     identifiers, `overlap` and `containment` align mentions whose `block.start-end`
+                     spans overlap or contain each other [default: exact]
+  --approximate      Estimate the scores with confidence intervals (B³, BLANC) or bounds (CEAF)
+                     instead of computing them exactly, for very large documents (only for single
+                     files)
+  --samples=<n>      (`--approximate`) Number of samples for each estimated quantity
+                     [default: 10000]
+  --singletons=<mode>  Whether to score singleton entities: `include` them, `exclude` them from both
+                     the gold and system clusters (as in CoNLL-2012) or `both`, reported side by
+                     side and computed from a single load of the documents (only for single files
+                     and `--cross-document`) [default: include]
+  -j, --jobs=<n>     Number of worker processes to compute the metrics of a single document
+                     concurrently (only for single files and `--cross-document`) [default: 1]
+  --max-memory=<size>  Memory budget for the metrics that have dense and sparse implementations
+                     (BLANC, CEAF), e.g. `512M` or `2G`: the dense ones are only used for
+                     documents where they fit (see `scorch autotune`), the sparse ones are used
+                     otherwise whatever their footprint
+  --cache=<dir>      Cache the scores of every document in this directory, keyed by the
+                     contents of the gold and system files, to avoid rescoring unchanged documents
+                     (only for directories and bundles)
+  --group-by=<spec>  Also output the micro-averaged scores of groups of documents, defined either
+                     by a regular expression on the document names (the group being its first
+                     capturing group or the whole match) or by a mapping file (JSON object or
+                     `name<TAB>group` lines) (only for directories and bundles)
+  --shard=<i/N>      Only score the i-th of N disjoint subsets of the documents (1 ≤ i ≤ N) and
+                     write partial statistics to be combined with `scorch merge` instead of a
+                     report (only for directories and bundles)
+  --watch            Keep monitoring the system directory and output an updated report when
+                     documents appear or change (only for directories)
+  --interval=<s>     (`--watch`) Seconds between two scans of the system directory [default: 1]
+  --columns=<cols>   (`columns`) Comma-separated indices of the system coreference columns to score,
+                     negative indices counting from the end of the rows
+  --gold-column=<n>  (`columns`) Index of the gold coreference column [default: -1]
+  --output=<out-file>  (`merge`) Output file, `-` for standard output [default: -]
+  --thresholds=<ts>  (`sweep`) Comma-separated link score thresholds at which to score the system
+                     graph, defaults to every distinct link score
+  --every=<k>        (`prefix`) Score the prefixes of the document that end at every k-th block
+                     [default: 1]
+  --port=<port>      (`serve`) Localhost TCP port to listen on [default: 8000]
+  --socket=<path>    (`serve`) Listen on this Unix socket instead of a TCP port
+  --workers=<n>      (`serve`) Number of worker processes, defaults to the number of CPUs
+  --max-body=<size>  (`serve`) Largest request body accepted, e.g. `512K` or `64M` [default: 64M]
+  -h, --help         Show this screen.
 
 ## Example:
   `scorch gold.json sys.json out.txt`
   `scorch gold/ sys/ out.txt`
+  `scorch --format jsonl --per-document gold/ sys/ -`
+  `scorch --group-by '^[a-z]+/' gold.jsonl sys.jsonl`
+  `scorch --cross-document --jobs 4 gold/ sys/`
+  `scorch --singletons both gold.json sys.json`
+  `scorch --approximate --samples 100000 book-gold.json book-sys.json`
+  `scorch --watch --cache .scorch-cache gold/ checkpoints/last/`
+  `scorch --shard 1/2 gold/ sys/ part-1.json` then `scorch merge --output out.txt part-*.json`
+  `scorch serve --socket /tmp/scorch.sock gold/`
+  `scorch --max-memory 1G book-gold.json book-sys.json`
+  `scorch --jobs 4 book-gold.json book-sys.json`
+  `scorch autotune`
+  `scorch columns --gold-column 11 --columns 12,13,14 predictions.conll`
+  `scorch sweep --format csv gold.json weighted-sys.json curve.csv`
+  `scorch prefix --every 10 --format csv gold.json sys.json curve.csv`
 """
 
+import concurrent.futures
 import contextlib
+import csv
+import hashlib
+import io
 import json
+import math
+import multiprocessing
 import pathlib
+import re
 import sys
+import time
+import zlib
 
 import typing as ty
 
 from statistics import mean
 
-import tqdm
-
-import numpy as np
-
-from docopt import docopt
-
-
+from scorch import dispatch
+from scorch import jsonstream
 from scorch import scores
+from scorch import spans
 from scorch import __version__
 
 
+# Note: the heavy dependencies (numpy, scipy, tqdm, docopt) and the scorch modules that only some
+# modes need (`approx`, `conll`, `incremental`, `serve`) are imported lazily where they are used to
+# keep the startup time low, since scorch is often called once per document in shell pipelines.
+# `tests/test_main.py::test_lazy_imports` guards against regressions.
 METRICS = {
     "MUC": scores.muc,
     "B³": scores.b_cubed,
     "CEAF_m": scores.ceaf_m,
     "CEAF_e": scores.ceaf_e,
     "BLANC": scores.blanc,
+    "LEA": scores.lea,
 }
 
+OUTPUT_FORMATS = ("text", "json", "jsonl", "csv")
+# Labels of the variants of the scores with and without singleton entities, see `--singletons`
+SINGLETON_VARIANTS = {"include": "with singletons", "exclude": "without singletons"}
+SINGLETON_MODES = (*SINGLETON_VARIANTS, "both")
+CSV_HEADER = ("document", "metric", "R", "P", "F")
+ESTIMATES_CSV_HEADER = (*CSV_HEADER, "R_low", "R_high", "P_low", "P_high", "F_low", "F_high")
+SWEEP_CSV_HEADER = ("threshold", *CSV_HEADER[1:])
+PREFIX_CSV_HEADER = ("block", *CSV_HEADER[1:])
+# Scoring options that `scorch sweep` and `scorch prefix` don't support, since they score a single
+# document incrementally with the default implementations of the metrics
+CURVE_UNSUPPORTED_OPTIONS = (
+    "--singletons",
+    "--jobs",
+    "--max-memory",
+    "--approximate",
+    "--samples",
+    "--cache",
+    "--shard",
+    "--watch",
+    "--per-document",
+    "--cross-document",
+    "--group-by",
+)
+PARTIAL_FORMAT_VERSION = 1
+
+
+class MetricScores(ty.NamedTuple):
+    """The `$(R, P, F₁)$` scores of a metric."""
+
+    R: float
+    P: float
+    F: float
+
+
+# Scores for every metric in `METRICS`
+Results = ty.Dict[str, MetricScores]
+
+
+class DocumentResults(ty.NamedTuple):
+    """
+    The results of a document, or of a set of documents for averages, along with the number of
+    gold and system mentions they were computed on. `name` is `None` for single-file or averaged
+    results.
+    """
+
+    name: ty.Optional[str]
+    results: Results
+    gold_size: int
+    sys_size: int
+
+    @property
+    def conll2012(self) -> float:
+        return conll_average(self.results)
+
+
+class CorpusResults(ty.NamedTuple):
+    """
+    The results of a corpus: the micro-average of its documents (see `average`), the results of
+    every document and the micro-averages of groups of documents (see `parse_group_by`).
+    """
+
+    corpus: DocumentResults
+    documents: ty.List[DocumentResults]
+    groups: ty.Dict[str, DocumentResults]
+
 
 # Thanks http://stackoverflow.com/a/17603000/760767
 @contextlib.contextmanager
@@ -109,12 +259,16 @@ def greedy_clustering(
         if target_head is None:
             heads[target] = source_head
             source_cluster.append(target)
-        elif (
-            target_head is not source_head
-        ):  # Merge `target`'s cluster into `source`'s'
-            for e in clusters[target_head]:
+        elif target_head is not source_head:
+            # Merge the smaller cluster into the larger, so that every element is relabelled at
+            # most $\log_2(n)$ times and long chains of links don't take a quadratic time
+            target_cluster = clusters[target_head]
+            if len(target_cluster) > len(source_cluster):
+                source_head, target_head = target_head, source_head
+                source_cluster, target_cluster = target_cluster, source_cluster
+            for e in target_cluster:
                 heads[e] = source_head
-            source_cluster.extend(clusters[target_head])
+            source_cluster.extend(target_cluster)
             del clusters[target_head]
 
     return [set(c) for c in clusters.values()]
@@ -134,48 +288,1201 @@ def clusters_from_graph(
     return clusters
 
 
-def clusters_from_json(fp) -> ty.List[ty.Set]:
-    obj = json.load(fp)
+def mention_id(mention: ty.Any, packed: bool = False) -> ty.Hashable:
+    """
+    Return a hashable identifier for a mention from a JSON input: `[block, start, end]` spans are
+    packed in a single integer (see `scorch.spans.pack_span`), as are integers if `#packed` is true,
+    other identifiers are left as is.
+    """
+    if isinstance(mention, list):
+        try:
+            return spans.pack_span(*mention)
+        except TypeError:
+            raise ValueError(f"Invalid mention identifier: {mention!r}")
+    if packed and isinstance(mention, int) and not isinstance(mention, bool):
+        return spans.PackedSpan(mention)
+    return mention
+
+
+def has_packed_ids(obj: ty.Dict[str, ty.Any]) -> bool:
+    """
+    Return `True` if the integer mention identifiers of a JSON document are packed spans, which
+    documents declare with `"ids": "packed"` (as written by `conll.py --ids packed`).
+    """
+    return obj.get("ids") == "packed"
+
+
+def clusters_from_json(fp: ty.TextIO) -> ty.List[ty.Set]:
+    """
+    Return the clusters of a JSON document read from `#fp`.
+
+    The `mentions` and `links` of `graph` documents are streamed (see `scorch.jsonstream`): links
+    are clustered as they are read and never stored, so the memory needed is proportional to the
+    number of mentions. Other documents are deserialized whole as soon as their `type` is read,
+    which is as fast as `json.load` when it comes first, as in the documents written by `conll.py`.
+    """
+    mentions: ty.List[ty.Hashable] = []
+    others: ty.Dict[str, ty.Any] = dict()
+
+    def links() -> ty.Iterable[ty.Tuple[ty.Hashable, ty.Hashable]]:
+        for key, value in jsonstream.iter_members(
+            fp,
+            arrays=("mentions", "links"),
+            load_rest=lambda key, value: key == "type" and value != "graph",
+        ):
+            if others.get("type", "graph") != "graph":
+                # The rest of a non-graph document, that is not streamed
+                others[key] = value
+            elif key == "links":
+                s, t, *_ = value
+                yield mention_id(s), mention_id(t)
+            elif key == "mentions":
+                mentions.append(mention_id(value))
+            else:
+                others[key] = value
+
+    # `clusters_from_graph` consumes all the links before looking at the nodes, so `mentions` is
+    # complete by then, whatever the order of the members in the document
+    clusters = clusters_from_graph(mentions, links())
+    if others.get("type") != "graph":
+        return clusters_from_obj(others)
+    if has_packed_ids(others):
+        return [set(mention_id(m, packed=True) for m in c) for c in clusters]
+    return clusters
+
+
+def clusters_from_obj(obj: ty.Dict[str, ty.Any]) -> ty.List[ty.Set]:
+    """Return the clusters of an already deserialized JSON document."""
+    packed = has_packed_ids(obj)
     if obj["type"] == "graph":
-        return clusters_from_graph(obj["mentions"], obj["links"])
+        return clusters_from_graph(
+            (mention_id(m, packed) for m in obj["mentions"]),
+            ((mention_id(s, packed), mention_id(t, packed)) for s, t, *_ in obj["links"]),
+        )
     elif obj["type"] == "clusters":
-        return [set(c) for n, c in obj["clusters"].items()]
+        return [set(mention_id(m, packed) for m in c) for n, c in obj["clusters"].items()]
     raise ValueError("Unsupported input format")
 
 
+def weighted_graph_from_obj(
+    obj: ty.Dict[str, ty.Any]
+) -> ty.Tuple[ty.List[ty.Hashable], ty.List[ty.Tuple[ty.Hashable, ty.Hashable, float]]]:
+    """
+    Return the mentions and the `(source, target, score)` links of an already deserialized
+    weighted `graph` document, whose links are `[source, target, score]` triples.
+    """
+    if obj["type"] != "graph":
+        raise ValueError("Threshold sweeps need a graph input")
+    packed = has_packed_ids(obj)
+    links = []
+    for link in obj["links"]:
+        if len(link) != 3:
+            raise ValueError(f"Expected a [source, target, score] link, got {link!r}")
+        source, target, score = link
+        links.append((mention_id(source, packed), mention_id(target, packed), float(score)))
+    return [mention_id(m, packed) for m in obj["mentions"]], links
+
+
+def namespaced_clusters(
+    document: str,
+    obj: ty.Dict[str, ty.Any],
+    rename: ty.Optional[ty.Dict[ty.Hashable, ty.Hashable]] = None,
+    global_entities: bool = False,
+) -> ty.Dict[ty.Hashable, ty.Set]:
+    """
+    Return the clusters of a JSON document as parts of a corpus-wide clustering: mentions are
+    namespaced as `(document, mention)` pairs, after renaming them with `#rename` if given, and the
+    clusters are indexed by entity names.
+
+    The entity names are `(document, name)` pairs, where the names of the clusters of `clusters`
+    documents are their keys and those of `graph` documents, which have no names, are their
+    indices, so every cluster is an entity of its own document. If `#global_entities` is true, the
+    entity names of `clusters` documents are their bare keys instead, so clusters with the same
+    name in different documents are the same entity.
+    """
+    if rename is None:
+        rename = dict()
+    if obj["type"] == "clusters":
+        packed = has_packed_ids(obj)
+        named: ty.Iterable[ty.Tuple[ty.Hashable, ty.Iterable]] = (
+            (e if global_entities else (document, e), (mention_id(m, packed) for m in c))
+            for e, c in obj["clusters"].items()
+        )
+    else:
+        named = (((document, i), c) for i, c in enumerate(clusters_from_obj(obj)))
+    return {e: set((document, rename.get(m, m)) for m in c) for e, c in named}
+
+
+def add_extra_mentions(
+    gold_clusters: ty.List[ty.Set], sys_clusters: ty.Sequence[ty.Set]
+) -> ty.List[ty.Set]:
+    """Add the system mentions that are missing from the gold clusters as gold singletons."""
+    gold_mentions: ty.Set[ty.Hashable] = set(m for c in gold_clusters for m in c)
+    sys_mentions: ty.Set[ty.Hashable] = set(m for c in sys_clusters for m in c)
+    extra_mentions = sys_mentions - gold_mentions
+    gold_clusters.extend(set([m]) for m in extra_mentions)
+    return gold_clusters
+
+
+def prepare_clusters(
+    gold_clusters: ty.List[ty.Set],
+    sys_clusters: ty.List[ty.Set],
+    add_sys_mentions: bool = True,
+    match: str = "exact",
+) -> ty.Tuple[ty.List[ty.Set], ty.List[ty.Set]]:
+    """
+    Align the system mentions to the gold mentions according to the `#match` mode (see
+    `scorch.spans`) and add the extra system mentions to the gold clusters if `#add_sys_mentions`
+    is true.
+    """
+    if match != "exact":
+        sys_clusters = spans.align_clusters(gold_clusters, sys_clusters, mode=match)
+    if add_sys_mentions:
+        add_extra_mentions(gold_clusters, sys_clusters)
+    return gold_clusters, sys_clusters
+
+
+def score_clusters(
+    gold_clusters: ty.Sequence[ty.Set],
+    sys_clusters: ty.Sequence[ty.Set],
+    max_memory: ty.Optional[int] = None,
+    jobs: int = 1,
+    implicit_singletons: bool = False,
+    table: ty.Optional[scores.Contingency] = None,
+) -> Results:
+    """
+    Return the scores of `#sys_clusters` wrt `#gold_clusters` for every metric in `METRICS`.
+
+    The implementations of the metrics are chosen according to the size of the document and the
+    `#max_memory` budget in bytes, see `scorch.dispatch`. If `#jobs` is more than 1, the metrics
+    are computed concurrently, see `score_clusters_parallel`.
+
+    If `#implicit_singletons` is true, the system mentions that are not in `#gold_clusters` are
+    scored as gold singletons without being added to them (see
+    `scorch.scores.implicit_key_singletons`).
+
+    `#table` is the contingency table of the clusterings, shared by the metrics that use it, and
+    computed by each of them if not given.
+    """
+    options = dispatch.metric_options(
+        gold_clusters,
+        sys_clusters,
+        max_memory=max_memory,
+        implicit_singletons=implicit_singletons,
+    )
+    if implicit_singletons:
+        options = {
+            name: {**options.get(name, {}), "implicit_singletons": True} for name in METRICS
+        }
+    if table is not None:
+        options = {name: {**options.get(name, {}), "table": table} for name in METRICS}
+    if jobs > 1:
+        return score_clusters_parallel(gold_clusters, sys_clusters, options, jobs)
+    return {
+        name: MetricScores(*metric(gold_clusters, sys_clusters, **options.get(name, {})))
+        for name, metric in METRICS.items()
+    }
+
+
+def score_clusters_parallel(
+    gold_clusters: ty.Sequence[ty.Set],
+    sys_clusters: ty.Sequence[ty.Set],
+    options: ty.Dict[str, ty.Dict[str, ty.Any]],
+    jobs: int,
+) -> Results:
+    """
+    Compute the metrics of a single document concurrently, with `#options` the implementation
+    choices of `scorch.dispatch.metric_options`.
+
+    The metrics that spend most of their time in NumPy and SciPy routines, which release the GIL
+    (dense BLANC, the assignment problems of CEAF), run in threads. CEAF only builds its
+    similarity matrices there: when it is computed by connected components, their assignment
+    problems are distributed across `#jobs` worker processes, which also compute the pure Python
+    metrics.
+    """
+    # The workers are spawned rather than forked since this process has running threads
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs, mp_context=multiprocessing.get_context("spawn")
+    ) as processes, concurrent.futures.ThreadPoolExecutor() as threads:
+        futures = dict()
+        for name, metric in METRICS.items():
+            kwargs = options.get(name, {})
+            if name in ("CEAF_m", "CEAF_e"):
+                if kwargs.get("sparse"):
+                    kwargs = {**kwargs, "executor": processes}
+                futures[name] = threads.submit(metric, gold_clusters, sys_clusters, **kwargs)
+            elif name == "BLANC" and not kwargs.get("sparse"):
+                futures[name] = threads.submit(metric, gold_clusters, sys_clusters, **kwargs)
+            else:
+                futures[name] = processes.submit(metric, gold_clusters, sys_clusters, **kwargs)
+        return {name: MetricScores(*future.result()) for name, future in futures.items()}
+
+
+def conll_average(results: Results) -> float:
+    """Return the CoNLL-2012 average score, i.e. the mean of the MUC, B³ and CEAFₑ F₁."""
+    return mean(results[s][2] for s in ("MUC", "B³", "CEAF_e"))
+
+
+def micro_average(
+    individual_results: ty.Sequence[DocumentResults]
+) -> Results:
+    """
+    Micro-average `(name, results, gold_size, sys_size)` document results: recall is weighted by
+    the number of gold mentions, precision by the number of system mentions and F₁ by their sum.
+    """
+    import numpy as np
+
+    gold_sizes = np.fromiter(
+        (g_size for *_, g_size, _ in individual_results), dtype=int
+    )
+    sys_sizes = np.fromiter((s_size for *_, _, s_size in individual_results), dtype=int)
+
+    results = {}
+    for name in METRICS:
+        all_R, all_P, all_F = (
+            np.fromiter(s, float)
+            for s in zip(*(r[name] for _, r, *_ in individual_results))
+        )
+        R = np.average(all_R, weights=gold_sizes)
+        P = np.average(all_P, weights=sys_sizes)
+        F = np.average(all_F, weights=gold_sizes + sys_sizes)
+        results[name] = MetricScores(float(R), float(P), float(F))
+    return results
+
+
+def average(
+    individual_results: ty.Sequence[DocumentResults], name: ty.Optional[str] = None
+) -> DocumentResults:
+    """Return the micro-average of `#individual_results` with their total sizes."""
+    return DocumentResults(
+        name,
+        micro_average(individual_results),
+        sum(r.gold_size for r in individual_results),
+        sum(r.sys_size for r in individual_results),
+    )
+
+
+def results_record(
+    results: Results, document: ty.Optional[str] = None, group: ty.Optional[str] = None,
+) -> ty.Dict[str, ty.Any]:
+    """Return a JSON-serializable record for a set of results."""
+    record: ty.Dict[str, ty.Any] = {"document": document}
+    if group is not None:
+        record["group"] = group
+    record["scores"] = {name: {"R": R, "P": P, "F": F} for name, (R, P, F) in results.items()}
+    record["conll2012"] = conll_average(results)
+    return record
+
+
+def format_results(
+    results: Results,
+    output_format: str = "text",
+    document: ty.Optional[str] = None,
+    group: ty.Optional[str] = None,
+) -> ty.Iterable[str]:
+    """
+    Format `#results` as lines of `#output_format` output.
+
+    `#document` is the name of the scored document and `#group` the name of a group of documents
+    (see `parse_group_by`), both are `None` for single-file or corpus-level scores. In the `text`
+    and `csv` formats, groups are labelled `[group]` in place of the document name. For a single
+    set of results, `json` and `jsonl` are the same. The `csv` header is not included.
+    """
+    if group is not None and output_format in ("text", "csv"):
+        document = f"[{group}]"
+    if output_format == "text":
+        prefix = "" if document is None else f"{document}\t"
+        for name, (R, P, F) in results.items():
+            yield f"{prefix}{name}:\tR={R}\tP={P}\tF₁={F}\n"
+        yield f"{prefix}CoNLL-2012 average score: {conll_average(results)}\n"
+    elif output_format in ("json", "jsonl"):
+        yield f"{json.dumps(results_record(results, document, group), ensure_ascii=False)}\n"
+    elif output_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        doc = "" if document is None else document
+        for name, (R, P, F) in results.items():
+            writer.writerow((doc, name, R, P, F))
+        writer.writerow((doc, "CoNLL-2012", "", "", conll_average(results)))
+        yield buffer.getvalue()
+    else:
+        raise ValueError(f"Unsupported output format: {output_format!r}")
+
+
+Grouper = ty.Callable[[str], ty.Optional[str]]
+
+
+def parse_group_by(spec: str) -> Grouper:
+    """
+    Return a function that gives the group of a document from its name, or `None` if it is in no
+    group.
+
+    If `#spec` is the path of an existing file, it is read as a `name → group` mapping, either a
+    JSON object (if its extension is `.json`) or lines of tab-separated `name` and `group`.
+    Otherwise, it is a regular expression searched in the document names: the group is the first
+    capturing group if there is one and the whole match otherwise, e.g. `^[a-z]+/` groups
+    OntoNotes documents by genre.
+    """
+    path = pathlib.Path(spec)
+    if path.is_file():
+        with path.open() as in_stream:
+            if path.suffix == ".json":
+                mapping = {str(k): str(v) for k, v in json.load(in_stream).items()}
+            else:
+                mapping = dict()
+                for i, line in enumerate(in_stream):
+                    if not line.strip():
+                        continue
+                    try:
+                        name, group = line.rstrip("\r\n").split("\t")
+                    except ValueError:
+                        raise ValueError(f"Invalid mapping at line {i} of {spec}")
+                    mapping[name] = group
+        return mapping.get
+
+    try:
+        pattern = re.compile(spec)
+    except re.error as e:
+        raise ValueError(f"Invalid group regular expression {spec!r}: {e}")
+
+    def group_of(name: str) -> ty.Optional[str]:
+        m = pattern.search(name)
+        if m is None:
+            return None
+        return m.group(1) if pattern.groups else m.group(0)
+
+    return group_of
+
+
+def group_results(
+    individual_results: ty.Iterable[DocumentResults], group_of: Grouper
+) -> ty.Dict[str, ty.List[DocumentResults]]:
+    """Return the results of the documents that are in a group, by group, sorted by group name."""
+    groups: ty.Dict[str, ty.List[DocumentResults]] = dict()
+    for doc_results in individual_results:
+        group = group_of(doc_results[0])
+        if group is not None:
+            groups.setdefault(group, []).append(doc_results)
+    return dict(sorted(groups.items()))
+
+
+def format_corpus(
+    documents_results: ty.Iterable[DocumentResults],
+    output_format: str = "text",
+    per_document: bool = False,
+    group_of: ty.Optional[Grouper] = None,
+) -> ty.Iterable[str]:
+    """
+    Format the results of a corpus given as an iterable of `(name, results, gold_size, sys_size)`
+    tuples, followed by their micro-average (see `format_average` for `#group_of`).
+
+    If `#per_document` is true, the results of every document are output as soon as they are
+    available, except for the `json` format, where the whole corpus is output as a single object at
+    the end.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format!r}")
+    if output_format == "csv":
+        yield f"{','.join(CSV_HEADER)}\n"
+    individual_results = []
+    for doc_results in documents_results:
+        individual_results.append(doc_results)
+        if per_document and output_format != "json":
+            name, r, *_ = doc_results
+            yield from format_results(r, output_format, document=name)
+
+    yield from format_average(
+        individual_results, output_format, per_document=per_document, group_of=group_of
+    )
+
+
+def format_average(
+    individual_results: ty.Sequence[DocumentResults],
+    output_format: str = "text",
+    per_document: bool = False,
+    group_of: ty.Optional[Grouper] = None,
+) -> ty.Iterable[str]:
+    """
+    Format the micro-average of `#individual_results`. For the `json` format, the results of the
+    individual documents are included if `#per_document` is true.
+
+    If `#group_of` is given, the micro-averages of the groups of documents it defines (see
+    `parse_group_by`) are output before the corpus average, or in a `"groups"` mapping for `json`.
+    """
+    results = micro_average(individual_results)
+    groups = dict() if group_of is None else group_results(individual_results, group_of)
+    if output_format == "json":
+        obj: ty.Dict[str, ty.Any] = {"corpus": results_record(results)}
+        if group_of is not None:
+            obj["groups"] = {
+                group: results_record(micro_average(members), group=group)
+                for group, members in groups.items()
+            }
+        if per_document:
+            obj["documents"] = [
+                results_record(r, document=name) for name, r, *_ in individual_results
+            ]
+        yield f"{json.dumps(obj, ensure_ascii=False)}\n"
+    else:
+        for group, members in groups.items():
+            yield from format_results(micro_average(members), output_format, group=group)
+        yield from format_results(results, output_format)
+
+
+def score_singleton_variants(
+    name: ty.Optional[str],
+    gold_clusters: ty.List[ty.Set],
+    sys_clusters: ty.List[ty.Set],
+    variants: ty.Iterable[str] = tuple(SINGLETON_VARIANTS),
+    add_sys_mentions: bool = True,
+    match: str = "exact",
+    max_memory: ty.Optional[int] = None,
+    jobs: int = 1,
+) -> ty.Dict[str, DocumentResults]:
+    """
+    Score the clusters of a document, with (`include`) and/or without (`exclude`) the singleton
+    entities of both sides according to `#variants`, and return the results of every variant.
+
+    The system mentions are first aligned to the gold mentions according to the `#match` mode
+    (see `scorch.spans`). The variants share the clusters and their contingency table (see
+    `scorch.scores.without_singletons`), so scoring both costs a single load of the document. The
+    extra system mentions are not added to `#gold_clusters`, which is left untouched, but scored as
+    implicit gold singletons if `#add_sys_mentions` is true, and counted in the gold size.
+    """
+    if match != "exact":
+        sys_clusters = spans.align_clusters(gold_clusters, sys_clusters, mode=match)
+    table = scores.contingency(gold_clusters, sys_clusters)
+    res = dict()
+    for variant in variants:
+        if variant == "include":
+            key, response, variant_table = gold_clusters, sys_clusters, table
+        elif variant == "exclude":
+            key, response, variant_table = scores.without_singletons(
+                gold_clusters, sys_clusters, table
+            )
+        else:
+            raise ValueError(f"Unknown singletons variant: {variant!r}")
+        gold_size = sum(variant_table.key_sizes)
+        if add_sys_mentions:
+            gold_size += sum(scores.extra_mentions_counts(variant_table))
+        results = score_clusters(
+            key,
+            response,
+            max_memory=max_memory,
+            jobs=jobs,
+            implicit_singletons=add_sys_mentions,
+            table=variant_table,
+        )
+        res[variant] = DocumentResults(name, results, gold_size, sum(variant_table.response_sizes))
+    return res
+
+
+def score_document_clusters(
+    name: ty.Optional[str],
+    gold_clusters: ty.List[ty.Set],
+    sys_clusters: ty.List[ty.Set],
+    add_sys_mentions: bool = True,
+    match: str = "exact",
+    max_memory: ty.Optional[int] = None,
+    jobs: int = 1,
+    singletons: str = "include",
+) -> DocumentResults:
+    """
+    Score the clusters of a document with or without singletons (`#singletons` being `include` or
+    `exclude`), see `score_singleton_variants`.
+    """
+    return score_singleton_variants(
+        name,
+        gold_clusters,
+        sys_clusters,
+        variants=(singletons,),
+        add_sys_mentions=add_sys_mentions,
+        match=match,
+        max_memory=max_memory,
+        jobs=jobs,
+    )[singletons]
+
+
+def score_files(
+    gold_fp: ty.TextIO,
+    sys_fp: ty.TextIO,
+    add_sys_mentions: bool = True,
+    match: str = "exact",
+    max_memory: ty.Optional[int] = None,
+    jobs: int = 1,
+    singletons: str = "include",
+) -> DocumentResults:
+    """
+    Score a pair of gold and system JSON files, see `score_clusters` for `#jobs` and
+    `score_document_clusters` for `#singletons`.
+    """
+    return score_document_clusters(
+        None,
+        clusters_from_json(gold_fp),
+        clusters_from_json(sys_fp),
+        add_sys_mentions=add_sys_mentions,
+        match=match,
+        max_memory=max_memory,
+        jobs=jobs,
+        singletons=singletons,
+    )
+
+
+def format_estimates(
+    estimates: ty.Dict[str, ty.Any], output_format: str = "text"
+) -> ty.Iterable[str]:
+    """
+    Format the estimates of `scorch.approx.approximate_scores` as lines of `#output_format`
+    output, including the `csv` header (see `ESTIMATES_CSV_HEADER`).
+    """
+    results = {name: MetricScores(*e[:3]) for name, e in estimates.items()}
+    conll_bounds = tuple(
+        mean(estimates[s].F_bounds[i] for s in ("MUC", "B³", "CEAF_e")) for i in (0, 1)
+    )
+    if output_format == "text":
+        for name, e in estimates.items():
+            yield (
+                f"{name}:\tR={e.R} [{e.R_bounds[0]}, {e.R_bounds[1]}]"
+                f"\tP={e.P} [{e.P_bounds[0]}, {e.P_bounds[1]}]"
+                f"\tF₁={e.F} [{e.F_bounds[0]}, {e.F_bounds[1]}]\n"
+            )
+        yield (
+            f"CoNLL-2012 average score: {conll_average(results)}"
+            f" [{conll_bounds[0]}, {conll_bounds[1]}]\n"
+        )
+    elif output_format in ("json", "jsonl"):
+        record = results_record(results)
+        record["bounds"] = {
+            name: {"R": e.R_bounds, "P": e.P_bounds, "F": e.F_bounds}
+            for name, e in estimates.items()
+        }
+        record["conll2012_bounds"] = conll_bounds
+        yield f"{json.dumps(record, ensure_ascii=False)}\n"
+    elif output_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(ESTIMATES_CSV_HEADER)
+        for name, e in estimates.items():
+            writer.writerow(("", name, *e[:3], *e.R_bounds, *e.P_bounds, *e.F_bounds))
+        writer.writerow(
+            ("", "CoNLL-2012", "", "", conll_average(results), "", "", "", "", *conll_bounds)
+        )
+        yield buffer.getvalue()
+    else:
+        raise ValueError(f"Unsupported output format: {output_format!r}")
+
+
+def cross_document_clusters(
+    gold_dir, sys_dir, match: str = "exact", global_entities: bool = False
+) -> ty.Tuple[ty.List[ty.Set], ty.List[ty.Set]]:
+    """
+    Merge the documents of `#gold_dir` and `#sys_dir` (see `document_pairs`) in two corpus-wide
+    clusterings (see `namespaced_clusters` for `#global_entities`).
+
+    Mentions are matched within their document according to `#match` before being namespaced.
+    """
+    gold_entities: ty.Dict[ty.Hashable, ty.Set] = dict()
+    sys_entities: ty.Dict[ty.Hashable, ty.Set] = dict()
+    for name, gold_content, sys_content in document_pairs(gold_dir, sys_dir):
+        gold_obj, sys_obj = json.loads(gold_content()), json.loads(sys_content())
+        rename = None
+        if match != "exact":
+            rename = spans.align_mentions(
+                (m for c in clusters_from_obj(gold_obj) for m in c),
+                (m for c in clusters_from_obj(sys_obj) for m in c),
+                mode=match,
+            )
+        for entities, clusters in (
+            (gold_entities, namespaced_clusters(name, gold_obj, global_entities=global_entities)),
+            (
+                sys_entities,
+                namespaced_clusters(
+                    name, sys_obj, rename=rename, global_entities=global_entities
+                ),
+            ),
+        ):
+            for e, c in clusters.items():
+                entities.setdefault(e, set()).update(c)
+    return list(gold_entities.values()), list(sys_entities.values())
+
+
+def score_cross_document(
+    gold_dir,
+    sys_dir,
+    add_sys_mentions: bool = True,
+    match: str = "exact",
+    max_memory: ty.Optional[int] = None,
+    jobs: int = 1,
+    singletons: str = "include",
+    global_entities: bool = False,
+) -> DocumentResults:
+    """
+    Score the corpus-wide clusterings of `#gold_dir` and `#sys_dir` (see
+    `cross_document_clusters`) as a single document.
+    """
+    gold_clusters, sys_clusters = cross_document_clusters(
+        gold_dir, sys_dir, match=match, global_entities=global_entities
+    )
+    return score_document_clusters(
+        None,
+        gold_clusters,
+        sys_clusters,
+        add_sys_mentions=add_sys_mentions,
+        max_memory=max_memory,
+        jobs=jobs,
+        singletons=singletons,
+    )
+
+
 def process_files(
-    gold_fp: ty.TextIO, sys_fp: ty.TextIO, add_sys_mentions=True
+    gold_fp: ty.TextIO,
+    sys_fp: ty.TextIO,
+    add_sys_mentions=True,
+    output_format="text",
+    match="exact",
+    approximate: bool = False,
+    samples: int = 10000,
+    max_memory: ty.Optional[int] = None,
+    jobs: int = 1,
+    singletons: str = "include",
+) -> ty.Iterable[str]:
+    if singletons == "both":
+        yield from format_variants(
+            score_singleton_variants(
+                None,
+                clusters_from_json(gold_fp),
+                clusters_from_json(sys_fp),
+                add_sys_mentions=add_sys_mentions,
+                match=match,
+                max_memory=max_memory,
+                jobs=jobs,
+            ),
+            output_format,
+        )
+        return
+    if approximate:
+        from scorch import approx
+
+        gold_clusters, sys_clusters = prepare_clusters(
+            clusters_from_json(gold_fp),
+            clusters_from_json(sys_fp),
+            add_sys_mentions=False,
+            match=match,
+        )
+        estimates = approx.approximate_scores(
+            gold_clusters, sys_clusters, samples=samples, implicit_singletons=add_sys_mentions
+        )
+        yield from format_estimates(estimates, output_format)
+        return
+    results = score_files(
+        gold_fp,
+        sys_fp,
+        add_sys_mentions=add_sys_mentions,
+        match=match,
+        max_memory=max_memory,
+        jobs=jobs,
+        singletons=singletons,
+    )
+    if output_format == "csv":
+        yield f"{','.join(CSV_HEADER)}\n"
+    yield from format_results(results.results, output_format)
+
+
+def format_variants(
+    variants: ty.Dict[str, DocumentResults], output_format: str = "text"
 ) -> ty.Iterable[str]:
+    """
+    Format the scores of the singletons variants of a document (see `score_singleton_variants`)
+    side by side, including the `csv` header.
+
+    In the `text` format, every line has the scores of all the variants, in the `csv` and `jsonl`
+    formats, they are labelled as groups named after the variants (see `SINGLETON_VARIANTS`), and
+    for `json` they are output in a single `{"singletons": {<variant>: <record>}}` object.
+    """
+    labels = {variant: SINGLETON_VARIANTS[variant] for variant in variants}
+    if output_format == "text":
+        header = "\t\t\t".join(label.capitalize() for label in labels.values())
+        yield f"\t{header}\n"
+        for name in METRICS:
+            line = "".join(
+                f"\tR={R}\tP={P}\tF₁={F}"
+                for R, P, F in (v.results[name] for v in variants.values())
+            )
+            yield f"{name}:{line}\n"
+        averages = "\t".join(str(v.conll2012) for v in variants.values())
+        yield f"CoNLL-2012 average score:\t{averages}\n"
+    elif output_format == "json":
+        obj = {
+            "singletons": {
+                variant: results_record(r.results, group=labels[variant])
+                for variant, r in variants.items()
+            }
+        }
+        yield f"{json.dumps(obj, ensure_ascii=False)}\n"
+    elif output_format in ("jsonl", "csv"):
+        if output_format == "csv":
+            yield f"{','.join(CSV_HEADER)}\n"
+        for variant, r in variants.items():
+            yield from format_results(r.results, output_format, group=labels[variant])
+    else:
+        raise ValueError(f"Unsupported output format: {output_format!r}")
+
+
+def score_sweep(
+    gold_fp: ty.TextIO,
+    sys_fp: ty.TextIO,
+    thresholds: ty.Optional[ty.Iterable[float]] = None,
+    add_sys_mentions: bool = True,
+    match: str = "exact",
+) -> ty.Iterable[ty.Tuple[float, Results]]:
+    """
+    Score the clusterings of a weighted system graph (see `weighted_graph_from_obj`) for every
+    link score threshold, see `scorch.incremental.threshold_sweep`, and yield `(threshold,
+    results)` pairs in decreasing order of threshold.
+    """
+    from scorch import incremental
+
     gold_clusters = clusters_from_json(gold_fp)
-    sys_clusters = clusters_from_json(sys_fp)
-    if add_sys_mentions:
-        gold_mentions: ty.Set[ty.Hashable] = set(m for c in gold_clusters for m in c)
-        sys_mentions: ty.Set[ty.Hashable] = set(m for c in sys_clusters for m in c)
-        extra_mentions = sys_mentions - gold_mentions
-        gold_clusters.extend(set([m]) for m in extra_mentions)
-    for name, metric in METRICS.items():
-        R, P, F = metric(gold_clusters, sys_clusters)
-        yield f"{name}:\tR={R}\tP={P}\tF₁={F}\n"
-    conll_score = scores.conll2012(gold_clusters, sys_clusters)
-    yield f"CoNLL-2012 average score: {conll_score}\n"
-
-
-def process_dirs(gold_dir, sys_dir, add_sys_mentions=True) -> ty.Iterable[str]:
+    mentions, links = weighted_graph_from_obj(json.load(sys_fp))
+    sys_mentions = list(dict.fromkeys((*mentions, *(m for s, t, _ in links for m in (s, t)))))
+    if match != "exact":
+        rename = spans.align_mentions(
+            (m for c in gold_clusters for m in c), sys_mentions, mode=match
+        )
+        sys_mentions = [rename.get(m, m) for m in sys_mentions]
+        links = [(rename.get(s, s), rename.get(t, t), score) for s, t, score in links]
+    for threshold, results in incremental.threshold_sweep(
+        gold_clusters,
+        sys_mentions,
+        links,
+        thresholds=thresholds,
+        implicit_singletons=add_sys_mentions,
+    ):
+        yield threshold, {name: MetricScores(*results[name]) for name in METRICS}
+
+
+def process_sweep(
+    gold_fp: ty.TextIO,
+    sys_fp: ty.TextIO,
+    thresholds: ty.Optional[ty.Iterable[float]] = None,
+    add_sys_mentions: bool = True,
+    output_format: str = "text",
+    match: str = "exact",
+) -> ty.Iterable[str]:
+    """Format the metric-vs-threshold curve of `score_sweep`, see `format_curve`."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format!r}")
+    yield from format_curve(
+        score_sweep(
+            gold_fp, sys_fp, thresholds=thresholds, add_sys_mentions=add_sys_mentions, match=match
+        ),
+        SWEEP_CSV_HEADER,
+        output_format,
+    )
+
+
+def format_curve(
+    curve: ty.Iterable[ty.Tuple[ty.Any, Results]],
+    header: ty.Sequence[str],
+    output_format: str = "text",
+) -> ty.Iterable[str]:
+    """
+    Format a curve of `(point, results)` pairs, the name of the points being `header[0]`, e.g.
+    `"threshold"` for `score_sweep`. In the `text` and `csv` formats, the scores of every point
+    are labelled by the point in place of a document name, in `jsonl` every point is a record with
+    a `"threshold"` (for instance) key and `json` outputs them in a single
+    `{"thresholds": [<record>, …]}` object.
+    """
+    label = header[0]
+    if output_format in ("json", "jsonl"):
+        records = (
+            {
+                label: point,
+                **{k: v for k, v in results_record(results).items() if k != "document"},
+            }
+            for point, results in curve
+        )
+        if output_format == "json":
+            yield f"{json.dumps({f'{label}s': list(records)}, ensure_ascii=False)}\n"
+        else:
+            for record in records:
+                yield f"{json.dumps(record, ensure_ascii=False)}\n"
+        return
+    if output_format == "csv":
+        yield f"{','.join(header)}\n"
+    for point, results in curve:
+        yield from format_results(results, output_format, document=str(point))
+
+
+def score_prefix_curve(
+    gold_fp: ty.TextIO,
+    sys_fp: ty.TextIO,
+    every: int = 1,
+    add_sys_mentions: bool = True,
+    match: str = "exact",
+) -> ty.Iterable[ty.Tuple[int, Results]]:
+    """
+    Score the prefixes of a document that end at every `#every`-th block, see
+    `scorch.incremental.prefix_curve`, and yield `(block, results)` pairs in increasing order of
+    block.
+    """
+    from scorch import incremental
+
+    gold_clusters, sys_clusters = prepare_clusters(
+        clusters_from_json(gold_fp), clusters_from_json(sys_fp), add_sys_mentions=False, match=match
+    )
+    for block, results in incremental.prefix_curve(
+        gold_clusters, sys_clusters, every=every, implicit_singletons=add_sys_mentions
+    ):
+        yield block, {name: MetricScores(*results[name]) for name in METRICS}
+
+
+def process_prefix_curve(
+    gold_fp: ty.TextIO,
+    sys_fp: ty.TextIO,
+    every: int = 1,
+    add_sys_mentions: bool = True,
+    output_format: str = "text",
+    match: str = "exact",
+) -> ty.Iterable[str]:
+    """Format the metric-vs-prefix curve of `score_prefix_curve`, see `format_curve`."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format!r}")
+    yield from format_curve(
+        score_prefix_curve(
+            gold_fp, sys_fp, every=every, add_sys_mentions=add_sys_mentions, match=match
+        ),
+        PREFIX_CSV_HEADER,
+        output_format,
+    )
+
+
+def score_columns(
+    conll_file: ty.Union[str, pathlib.Path],
+    sys_columns: ty.Sequence[int],
+    gold_column: int = -1,
+    add_sys_mentions: bool = True,
+    match: str = "exact",
+    max_memory: ty.Optional[int] = None,
+) -> ty.Dict[int, CorpusResults]:
+    """
+    Score several system coreference columns of a CoNLL file against its gold column, return the
+    results of the documents of every system column and their micro-average, by column.
+
+    All the columns are parsed in a single pass over the file (see
+    `scorch.conll.parse_file_columns`), so scoring several systems costs a single read.
+    """
+    from scorch import conll
+
+    documents: ty.Dict[int, ty.List[DocumentResults]] = {c: [] for c in sys_columns}
+    with smart_open(conll_file) as in_stream:
+        parsed = conll.parse_file_columns(
+            (l.strip() for l in in_stream), (gold_column, *sys_columns)
+        )
+        for name, (gold_entities, *sys_entities) in parsed:
+            gold_clusters = clusters_from_obj(conll.document_to_json(name, gold_entities))
+            for column, entities in zip(sys_columns, sys_entities):
+                documents[column].append(
+                    score_document_clusters(
+                        name,
+                        gold_clusters,
+                        clusters_from_obj(conll.document_to_json(name, entities)),
+                        add_sys_mentions=add_sys_mentions,
+                        match=match,
+                        max_memory=max_memory,
+                    )
+                )
+    return {
+        column: CorpusResults(average(column_documents), column_documents, dict())
+        for column, column_documents in documents.items()
+        if column_documents
+    }
+
+
+def parse_columns(spec: str) -> ty.List[int]:
+    """Parse a comma-separated list of column indices."""
+    try:
+        return [int(c) for c in spec.split(",")]
+    except ValueError:
+        raise ValueError(f"Invalid columns specification {spec!r}, expected e.g. `12,13`")
+
+
+def process_columns(
+    conll_file: ty.Union[str, pathlib.Path],
+    sys_columns: ty.Sequence[int],
+    gold_column: int = -1,
+    add_sys_mentions: bool = True,
+    output_format: str = "text",
+    match: str = "exact",
+    max_memory: ty.Optional[int] = None,
+) -> ty.Iterable[str]:
+    """
+    Format the corpus scores of every system column of a CoNLL file (see `score_columns`). In the
+    `text`, `csv` and `jsonl` formats, they are labelled as `column <i>` groups, and for `json`
+    they are output in a single `{"columns": {<i>: <record>}}` object.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format!r}")
+    results = score_columns(
+        conll_file,
+        sys_columns,
+        gold_column=gold_column,
+        add_sys_mentions=add_sys_mentions,
+        match=match,
+        max_memory=max_memory,
+    )
+    if output_format == "json":
+        obj = {
+            "columns": {
+                str(column): results_record(r.corpus.results, group=f"column {column}")
+                for column, r in results.items()
+            }
+        }
+        yield f"{json.dumps(obj, ensure_ascii=False)}\n"
+        return
+    if output_format == "csv":
+        yield f"{','.join(CSV_HEADER)}\n"
+    for column, r in results.items():
+        yield from format_results(r.corpus.results, output_format, group=f"column {column}")
+
+
+class ResultCache:
+    """
+    A cache for the results of individual documents, keyed by the hashes of the contents of their
+    gold and system files.
+
+    Results are kept in memory and, if `#cache_dir` is given, also stored there as one small JSON
+    file per document, so they can be reused across runs. The keys also depend on the scorch
+    version and the scoring options, so a cache can't return stale results.
+    """
+
+    def __init__(self, cache_dir: ty.Optional[ty.Union[str, pathlib.Path]] = None):
+        self.cache_dir = None if cache_dir is None else pathlib.Path(cache_dir)
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._memory: ty.Dict[str, ty.Tuple[Results, int, int]] = dict()
+
+    @staticmethod
+    def key(
+        gold_content: bytes,
+        sys_content: bytes,
+        add_sys_mentions: bool = True,
+        match: str = "exact",
+    ) -> str:
+        h = hashlib.sha256()
+        h.update(
+            f"{__version__}\0{','.join(METRICS)}\0{add_sys_mentions}\0{match}\0".encode("utf-8")
+        )
+        h.update(hashlib.sha256(gold_content).digest())
+        h.update(hashlib.sha256(sys_content).digest())
+        return h.hexdigest()
+
+    def get(self, key: str) -> ty.Optional[ty.Tuple[Results, int, int]]:
+        res = self._memory.get(key)
+        if res is None and self.cache_dir is not None:
+            try:
+                with (self.cache_dir / f"{key}.json").open() as in_stream:
+                    obj = json.load(in_stream)
+            except (OSError, ValueError):
+                return None
+            results = {name: MetricScores(*rpf) for name, rpf in obj["results"].items()}
+            res = (results, obj["gold_size"], obj["sys_size"])
+            self._memory[key] = res
+        return res
+
+    def put(self, key: str, results: Results, gold_size: int, sys_size: int):
+        self._memory[key] = (results, gold_size, sys_size)
+        if self.cache_dir is not None:
+            obj = {"results": results, "gold_size": gold_size, "sys_size": sys_size}
+            # Write then rename to avoid leaving a truncated file if interrupted
+            tmp_path = self.cache_dir / f"{key}.json.tmp"
+            with tmp_path.open("w") as out_stream:
+                json.dump(obj, out_stream, ensure_ascii=False)
+            tmp_path.replace(self.cache_dir / f"{key}.json")
+
+
+def match_dirs(
+    gold_dir, sys_dir, strict: bool = True
+) -> ty.Dict[str, ty.Tuple[pathlib.Path, pathlib.Path]]:
+    """
+    Return a `name → (gold_file, sys_file)` mapping, sorted by names, for the files in `#sys_dir`.
+
+    If `#strict` is false, system files without a gold counterpart are skipped instead of raising a
+    `ValueError`.
+    """
     gold_path = pathlib.Path(gold_dir)
     sys_path = pathlib.Path(sys_dir)
-    pairs = dict()  # ty.Dict[str, ty.Tuple[pathlib.Path, pathlib.Path]]
-    for sys_file in sys_path.iterdir():
+    pairs = dict()
+    for sys_file in sorted(sys_path.iterdir()):
         try:
             gold_file = next(gold_path.glob(f"{sys_file.stem}*"))
         except StopIteration:
-            raise ValueError(f"No matching gold file for {sys_file}")
+            if strict:
+                raise ValueError(f"No matching gold file for {sys_file}")
+            continue
         pairs[sys_file.stem] = (gold_file, sys_file)
+    return pairs
+
+
+def read_bundle(bundle_file: ty.Union[str, pathlib.Path]) -> ty.Iterable[ty.Tuple[str, bytes]]:
+    """
+    Yield `(name, content)` pairs for the documents of a JSONL bundle, i.e. a file with one JSON
+    document (with a `"name"` key) per line, such as those written by `conll --bundle`.
+    """
+    with open(bundle_file, "rb") as in_stream:
+        for i, line in enumerate(in_stream):
+            if not line.strip():
+                continue
+            try:
+                name = json.loads(line)["name"]
+            except (ValueError, KeyError):
+                raise ValueError(f"Invalid document at line {i} of {bundle_file}")
+            yield name, line
+
+
+def is_bundle(path: pathlib.Path) -> bool:
+    return path.suffix == ".jsonl" and path.is_file()
+
+
+def is_conll(path: pathlib.Path) -> bool:
+    return path.suffix not in (".json", ".jsonl") and path.is_file()
+
+
+def is_corpus(gold_path: pathlib.Path, sys_path: pathlib.Path) -> bool:
+    """Return `True` if a pair of inputs should be scored as several documents."""
+    return (
+        (gold_path.is_dir() and sys_path.is_dir())
+        or (is_bundle(gold_path) and is_bundle(sys_path))
+        or (is_conll(gold_path) and (sys_path.is_dir() or is_bundle(sys_path)))
+    )
+
+
+def conll_documents(
+    conll_file: pathlib.Path,
+) -> ty.Callable[[str], ty.Optional[ty.Callable[[], bytes]]]:
+    """
+    Return a function that gives, for a document name, a function returning the content of this
+    document of a CoNLL file, converted to JSON, or `None` if there is no such document.
+
+    The documents are accessed at random through the file index (see `scorch.conll.load_index`),
+    so only the documents that are needed are parsed. Names can also be given in the sanitized
+    form used for file names by `conll.py`.
+    """
+    from scorch import conll
+
+    index = conll.load_index(conll_file)
+    names = {n.replace("/", "_"): n for n in index}
+    names.update((n, n) for n in index)
 
-    individual_results = (
-        []
-    )  # ty.List[str, ty.Dict[str, ty.Tuple[float, float, float]] int, int]
+    def content(name: str) -> bytes:
+        document = conll.document_to_json(name, conll.read_document(conll_file, name, index))
+        return json.dumps(document).encode("utf-8")
+
+    def lookup(name: str) -> ty.Optional[ty.Callable[[], bytes]]:
+        if name not in names:
+            return None
+        return lambda: content(names[name])
+
+    return lookup
+
+
+def document_pairs(
+    gold, sys
+) -> ty.Iterable[ty.Tuple[str, ty.Callable[[], bytes], ty.Callable[[], bytes]]]:
+    """
+    Yield `(name, gold_content, sys_content)` for the documents of a pair of directories or JSONL
+    bundles, where the contents are functions that return the contents of the documents, so they
+    are only read when needed.
+
+    Documents are matched by file names for directories (see `match_dirs`) and by their `"name"`
+    for bundles. For bundles, the gold documents are kept in memory and the system documents are
+    streamed in order. `#gold` can also be a CoNLL file, see `conll_documents`.
+    """
+    gold_path, sys_path = pathlib.Path(gold), pathlib.Path(sys)
+    if is_conll(gold_path):
+        gold_document = conll_documents(gold_path)
+        sys_documents: ty.Iterable[ty.Tuple[str, ty.Callable[[], bytes]]]
+        if is_bundle(sys_path):
+            sys_documents = (
+                (name, (lambda c=sys_content: c)) for name, sys_content in read_bundle(sys_path)
+            )
+        else:
+            sys_documents = ((f.stem, f.read_bytes) for f in sorted(sys_path.iterdir()))
+        for name, sys_content_fn in sys_documents:
+            gold_content_fn = gold_document(name)
+            if gold_content_fn is None:
+                raise ValueError(f"No matching gold document for {name!r}")
+            yield name, gold_content_fn, sys_content_fn
+    elif is_bundle(gold_path) and is_bundle(sys_path):
+        gold_documents: ty.Dict[str, bytes] = dict()
+        for name, gold_content in read_bundle(gold_path):
+            if name in gold_documents:
+                raise ValueError(f"Duplicate gold document {name!r} in {gold_path}")
+            gold_documents[name] = gold_content
+        for name, sys_content in read_bundle(sys_path):
+            try:
+                gold_content = gold_documents[name]
+            except KeyError:
+                raise ValueError(f"No matching gold document for {name!r}")
+            yield name, (lambda c=gold_content: c), (lambda c=sys_content: c)
+    else:
+        for name, (gold_file, sys_file) in match_dirs(gold_path, sys_path).items():
+            yield name, gold_file.read_bytes, sys_file.read_bytes
+
+
+def score_document(
+    name: str,
+    gold_content: bytes,
+    sys_content: bytes,
+    add_sys_mentions: bool = True,
+    cache: ty.Optional[ResultCache] = None,
+    match: str = "exact",
+    max_memory: ty.Optional[int] = None,
+) -> DocumentResults:
+    """Score a pair of serialized gold and system documents, using `#cache` if provided."""
+    if cache is not None:
+        key = cache.key(gold_content, sys_content, add_sys_mentions, match)
+        cached = cache.get(key)
+        if cached is not None:
+            return DocumentResults(name, *cached)
+    results = score_document_clusters(
+        name,
+        clusters_from_obj(json.loads(gold_content)),
+        clusters_from_obj(json.loads(sys_content)),
+        add_sys_mentions=add_sys_mentions,
+        match=match,
+        max_memory=max_memory,
+    )
+    if cache is not None:
+        cache.put(key, results.results, results.gold_size, results.sys_size)
+    return results
+
+
+def score_dirs(
+    gold_dir,
+    sys_dir,
+    add_sys_mentions=True,
+    cache: ty.Optional[ResultCache] = None,
+    match: str = "exact",
+    shard: ty.Optional[ty.Tuple[int, int]] = None,
+    max_memory: ty.Optional[int] = None,
+) -> ty.Iterable[DocumentResults]:
+    """
+    Score the documents of `#sys_dir` against their counterparts in `#gold_dir`, yield
+    `(name, results, gold_size, sys_size)` tuples as soon as every document has been scored.
+    `#gold_dir` and `#sys_dir` can also be JSONL bundles, see `document_pairs`.
+
+    If `#shard` is an `(i, N)` tuple, only score the documents of the `i`-th shard, see
+    `in_shard`.
+    """
+    # Only needed in directory mode, so imported here to keep the startup fast
+    import tqdm
+
+    pairs = document_pairs(gold_dir, sys_dir)
+    if shard is not None:
+        pairs = ((name, *p) for name, *p in pairs if in_shard(name, *shard))
     pbar = tqdm.tqdm(
-        pairs.items(),
+        pairs,
         unit="document",
         desc="Scoring",
         unit_scale=True,
@@ -183,68 +1490,585 @@ def process_dirs(gold_dir, sys_dir, add_sys_mentions=True) -> ty.Iterable[str]:
         dynamic_ncols=True,
         leave=False,
     )
-    for name, (gold_file, sys_file) in pbar:
+    for name, gold_content, sys_content in pbar:
         pbar.desc = f"Scoring {name}"
-        with gold_file.open() as gold_stream, sys_file.open() as sys_stream:
-            gold_clusters = clusters_from_json(gold_stream)
-            sys_clusters = clusters_from_json(sys_stream)
-            if add_sys_mentions:
-                gold_mentions: ty.Set[ty.Hashable] = set(
-                    m for c in gold_clusters for m in c
-                )
-                sys_mentions: ty.Set[ty.Hashable] = set(
-                    m for c in sys_clusters for m in c
-                )
-                extra_mentions = sys_mentions - gold_mentions
-                gold_clusters.extend(set([m]) for m in extra_mentions)
-        r = {
-            name: metric(gold_clusters, sys_clusters)
-            for name, metric in METRICS.items()
-        }
-        individual_results.append(
-            (name, r, sum(map(len, gold_clusters)), sum(map(len, sys_clusters)))
+        yield score_document(
+            name,
+            gold_content(),
+            sys_content(),
+            add_sys_mentions=add_sys_mentions,
+            cache=cache,
+            match=match,
+            max_memory=max_memory,
         )
 
-    gold_sizes = np.fromiter(
-        (g_size for *_, g_size, _ in individual_results), dtype=int
-    )
-    sys_sizes = np.fromiter((s_size for *_, _, s_size in individual_results), dtype=int)
 
-    results = {}
-    for name in METRICS:
-        all_R, all_P, all_F = (
-            np.fromiter(s, float)
-            for s in zip(*(r[name] for _, r, *_ in individual_results))
+def in_shard(name: str, index: int, num_shards: int) -> bool:
+    """
+    Return true if the document `#name` belongs to the `#index`-th of `#num_shards` shards
+    (`1 ≤ index ≤ num_shards`).
+
+    This only depends on the name of the document, so the shards of a corpus are the same on every
+    machine, whatever the order in which the files are listed.
+    """
+    return zlib.crc32(name.encode("utf-8")) % num_shards == index - 1
+
+
+def parse_shard(spec: str) -> ty.Tuple[int, int]:
+    """Parse an `i/N` shard specification."""
+    try:
+        index, num_shards = (int(n) for n in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard specification {spec!r}, expected `i/N`")
+    if not 1 <= index <= num_shards:
+        raise ValueError(f"Invalid shard specification {spec!r}, expected 1 ≤ i ≤ N")
+    return index, num_shards
+
+
+def parse_number(
+    spec: str,
+    option: str,
+    number_type: ty.Callable[[str], ty.Union[int, float]] = int,
+    positive: bool = True,
+) -> ty.Union[int, float]:
+    """Parse the value of a numeric `#option`, which must be finite and positive or non-negative."""
+    try:
+        value = number_type(spec)
+    except ValueError:
+        raise ValueError(f"Invalid {option} value {spec!r}, expected a number")
+    if not ((value > 0 if positive else value >= 0) and value < math.inf):
+        kind = "positive" if positive else "non-negative"
+        raise ValueError(f"Invalid {option} value {spec!r}, expected a {kind} number")
+    return value
+
+
+def given_option(arguments: ty.Dict[str, ty.Any], options: ty.Iterable[str]) -> ty.Optional[str]:
+    """
+    Return the first of `#options` whose value in the docopt `#arguments` isn't its default, if
+    any, to reject the options that a mode doesn't support.
+    """
+    from docopt import docopt
+
+    defaults = docopt(__doc__, argv=["-", "-"])
+    return next((o for o in options if arguments[o] != defaults[o]), None)
+
+
+def write_partial(
+    individual_results: ty.Iterable[DocumentResults],
+    out_stream: ty.TextIO,
+    shard: ty.Optional[ty.Tuple[int, int]] = None,
+):
+    """
+    Write the results of individual documents as partial statistics that can be combined by
+    `merge_partials`.
+    """
+    obj = {
+        "scorch_partial": PARTIAL_FORMAT_VERSION,
+        "version": __version__,
+        "metrics": list(METRICS),
+        "shard": shard,
+        "documents": [
+            {"document": name, "results": r, "gold_size": gold_size, "sys_size": sys_size}
+            for name, r, gold_size, sys_size in individual_results
+        ],
+    }
+    json.dump(obj, out_stream, ensure_ascii=False)
+    out_stream.write("\n")
+
+
+def read_partial(in_stream: ty.TextIO) -> ty.List[DocumentResults]:
+    """Read partial statistics written by `write_partial`."""
+    obj = json.load(in_stream)
+    if obj.get("scorch_partial") != PARTIAL_FORMAT_VERSION:
+        raise ValueError("Not a scorch partial statistics file")
+    if obj["metrics"] != list(METRICS):
+        raise ValueError(
+            f"Partial statistics computed for metrics {obj['metrics']} instead of {list(METRICS)}"
         )
-        R = np.average(all_R, weights=gold_sizes)
-        P = np.average(all_P, weights=sys_sizes)
-        F = np.average(all_F, weights=gold_sizes + sys_sizes)
-        results[name] = (R, P, F)
-        yield f"{name}:\tR={R}\tP={P}\tF₁={F}\n"
-    conll_score = mean(results[s][2] for s in ("MUC", "B³", "CEAF_e"))
-    yield f"CoNLL-2012 average score: {conll_score}\n"
+    return [
+        DocumentResults(
+            d["document"],
+            {name: MetricScores(*rpf) for name, rpf in d["results"].items()},
+            d["gold_size"],
+            d["sys_size"],
+        )
+        for d in obj["documents"]
+    ]
+
+
+def merge_partials(partials: ty.Iterable[ty.Sequence[DocumentResults]]) -> ty.List[DocumentResults]:
+    """
+    Combine the results of several partial statistics, sorted by document names as in a
+    single-process run, so that their micro-average is exactly the same.
+    """
+    documents: ty.Dict[str, DocumentResults] = dict()
+    for partial in partials:
+        for doc_results in partial:
+            name = doc_results[0]
+            if name in documents:
+                raise ValueError(f"Document {name!r} is present in several partial statistics")
+            documents[name] = doc_results
+    return [documents[name] for name in sorted(documents)]
+
+
+def score_corpus(
+    gold_dir,
+    sys_dir,
+    add_sys_mentions: bool = True,
+    cache: ty.Optional[ResultCache] = None,
+    match: str = "exact",
+    group_of: ty.Optional[Grouper] = None,
+    max_memory: ty.Optional[int] = None,
+) -> CorpusResults:
+    """
+    Score the documents of `#sys_dir` against their counterparts in `#gold_dir` (see `score_dirs`)
+    and return their results along with their micro-average and those of the groups defined by
+    `#group_of`, if given.
+    """
+    documents = list(
+        score_dirs(
+            gold_dir,
+            sys_dir,
+            add_sys_mentions=add_sys_mentions,
+            cache=cache,
+            match=match,
+            max_memory=max_memory,
+        )
+    )
+    groups = dict() if group_of is None else group_results(documents, group_of)
+    return CorpusResults(
+        average(documents),
+        documents,
+        {group: average(members, name=group) for group, members in groups.items()},
+    )
+
+
+def process_dirs(
+    gold_dir,
+    sys_dir,
+    add_sys_mentions=True,
+    output_format="text",
+    per_document=False,
+    cache: ty.Optional[ResultCache] = None,
+    match: str = "exact",
+    group_of: ty.Optional[Grouper] = None,
+    max_memory: ty.Optional[int] = None,
+) -> ty.Iterable[str]:
+    yield from format_corpus(
+        score_dirs(
+            gold_dir,
+            sys_dir,
+            add_sys_mentions=add_sys_mentions,
+            cache=cache,
+            match=match,
+            max_memory=max_memory,
+        ),
+        output_format=output_format,
+        per_document=per_document,
+        group_of=group_of,
+    )
+
+
+def watch_dirs(
+    gold_dir,
+    sys_dir,
+    add_sys_mentions=True,
+    output_format="text",
+    per_document=False,
+    cache: ty.Optional[ResultCache] = None,
+    interval: float = 1.0,
+    max_updates: ty.Optional[int] = None,
+    match: str = "exact",
+    group_of: ty.Optional[Grouper] = None,
+    max_memory: ty.Optional[int] = None,
+) -> ty.Iterable[str]:
+    """
+    Monitor `#sys_dir` and output an updated corpus report every time documents appear, change or
+    disappear. Only the new and modified documents are rescored.
+
+    Changes are detected by polling the size and modification time of the files every `#interval`
+    seconds. Files that can't be parsed (e.g. because they are still being written) are retried at
+    the next scan. This stops after `#max_updates` reports if it is not `None`.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format!r}")
+    if cache is None:
+        cache = ResultCache()
+    if output_format == "csv":
+        yield f"{','.join(CSV_HEADER)}\n"
+    signatures: ty.Dict[str, ty.Tuple[int, int, int, int]] = dict()
+    documents: ty.Dict[str, DocumentResults] = dict()
+    num_updates = 0
+    while max_updates is None or num_updates < max_updates:
+        pairs = match_dirs(gold_dir, sys_dir, strict=False)
+        updated = []
+        for name, (gold_file, sys_file) in pairs.items():
+            try:
+                gold_stat, sys_stat = gold_file.stat(), sys_file.stat()
+            except OSError:
+                continue
+            signature = (
+                gold_stat.st_mtime_ns,
+                gold_stat.st_size,
+                sys_stat.st_mtime_ns,
+                sys_stat.st_size,
+            )
+            if signatures.get(name) == signature:
+                continue
+            try:
+                documents[name] = score_document(
+                    name,
+                    gold_file.read_bytes(),
+                    sys_file.read_bytes(),
+                    add_sys_mentions=add_sys_mentions,
+                    cache=cache,
+                    match=match,
+                    max_memory=max_memory,
+                )
+            except (OSError, ValueError, KeyError):
+                continue
+            signatures[name] = signature
+            updated.append(name)
+        removed = [name for name in documents if name not in pairs]
+        for name in removed:
+            del documents[name]
+            del signatures[name]
+
+        if updated or removed:
+            if per_document and output_format != "json":
+                for name in updated:
+                    _, r, *_ = documents[name]
+                    yield from format_results(r, output_format, document=name)
+            if documents:
+                yield from format_average(
+                    list(documents.values()),
+                    output_format,
+                    per_document=per_document,
+                    group_of=group_of,
+                )
+            num_updates += 1
+            if max_updates is not None and num_updates >= max_updates:
+                break
+        time.sleep(interval)
 
 
 def main_entry_point(argv=None):
+    from docopt import docopt
+
     arguments = docopt(__doc__, version=__version__, argv=argv)
+    match = arguments["--match"]
+    if match not in spans.MATCHING_MODES:
+        print(
+            f"Unsupported matching mode {match!r}, use one of {', '.join(spans.MATCHING_MODES)}",
+            file=sys.stderr,
+        )
+        return 1
+
+    try:
+        jobs = parse_number(arguments["--jobs"], "--jobs")
+        samples = parse_number(arguments["--samples"], "--samples")
+        interval = parse_number(arguments["--interval"], "--interval", float)
+        every = parse_number(arguments["--every"], "--every")
+        port = parse_number(arguments["--port"], "--port", positive=False)
+        workers = arguments["--workers"]
+        if workers is not None:
+            workers = parse_number(workers, "--workers")
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    if arguments["serve"]:
+        from scorch import serve
+
+        try:
+            max_body_size = dispatch.parse_size(arguments["--max-body"])
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        serve.serve(
+            arguments["<gold>"],
+            port=port,
+            socket_path=arguments["--socket"],
+            workers=workers,
+            match=match,
+            max_body_size=max_body_size,
+        )
+        return None
+
+    output_format = arguments["--format"]
+    if output_format not in OUTPUT_FORMATS:
+        print(
+            f"Unsupported output format {output_format!r}, use one of {', '.join(OUTPUT_FORMATS)}",
+            file=sys.stderr,
+        )
+        return 1
+
+    group_of = None
+    if arguments["--group-by"] is not None:
+        try:
+            group_of = parse_group_by(arguments["--group-by"])
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+
+    shard = None
+    if arguments["--shard"] is not None:
+        try:
+            shard = parse_shard(arguments["--shard"])
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+
+    if arguments["autotune"]:
+        found = dispatch.autotune(log=sys.stderr)
+        path = dispatch.save_thresholds(found)
+        print(f"Saved the thresholds {found} to {path}", file=sys.stderr)
+        return None
+
+    max_memory = None
+    if arguments["--max-memory"] is not None:
+        try:
+            max_memory = dispatch.parse_size(arguments["--max-memory"])
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+
+    if arguments["columns"]:
+        if arguments["--columns"] is None:
+            print("The system columns to score must be given with `--columns`", file=sys.stderr)
+            return 1
+        try:
+            sys_columns = parse_columns(arguments["--columns"])
+            gold_column = int(arguments["--gold-column"])
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        with smart_open(arguments["<out-file>"] or "-", "w") as out_stream:
+            out_stream.writelines(
+                process_columns(
+                    arguments["<conll-file>"],
+                    sys_columns,
+                    gold_column=gold_column,
+                    output_format=output_format,
+                    match=arguments["--match"],
+                    max_memory=max_memory,
+                )
+            )
+        return None
+
+    if arguments["merge"]:
+        partials = []
+        for partial_file in arguments["<partial>"]:
+            with smart_open(partial_file) as in_stream:
+                partials.append(read_partial(in_stream))
+        with smart_open(arguments["--output"], "w") as out_stream:
+            out_stream.writelines(
+                format_corpus(
+                    merge_partials(partials),
+                    output_format=output_format,
+                    per_document=arguments["--per-document"],
+                    group_of=group_of,
+                )
+            )
+        return None
+
     # Since there are no support for default positional arguments in
     # docopt yet. Might be useful for complex default values, too
     if arguments["<out-file>"] is None:
         arguments["<out-file>"] = "-"
 
+    singletons = arguments["--singletons"]
+    if singletons not in SINGLETON_MODES:
+        print(
+            f"Unsupported singletons mode {singletons!r}, use one of {', '.join(SINGLETON_MODES)}",
+            file=sys.stderr,
+        )
+        return 1
+    if singletons != "include" and arguments["--approximate"]:
+        print("--singletons is not supported with --approximate", file=sys.stderr)
+        return 1
+
+    if arguments["sweep"]:
+        unsupported = given_option(arguments, CURVE_UNSUPPORTED_OPTIONS)
+        if unsupported is not None:
+            print(f"{unsupported} is not supported by scorch sweep", file=sys.stderr)
+            return 1
+        thresholds = None
+        if arguments["--thresholds"] is not None:
+            try:
+                thresholds = [float(t) for t in arguments["--thresholds"].split(",")]
+            except ValueError:
+                print(f"Invalid thresholds {arguments['--thresholds']!r}", file=sys.stderr)
+                return 1
+        with contextlib.ExitStack() as stack:
+            gold_stream = stack.enter_context(smart_open(arguments["<gold>"]))
+            sys_stream = stack.enter_context(smart_open(arguments["<sys>"]))
+            out_stream = stack.enter_context(smart_open(arguments["<out-file>"], "w"))
+            try:
+                out_stream.writelines(
+                    process_sweep(
+                        gold_stream,
+                        sys_stream,
+                        thresholds=thresholds,
+                        output_format=output_format,
+                        match=match,
+                    )
+                )
+            except ValueError as e:
+                print(e, file=sys.stderr)
+                return 1
+        return None
+
+    if arguments["prefix"]:
+        unsupported = given_option(arguments, CURVE_UNSUPPORTED_OPTIONS)
+        if unsupported is not None:
+            print(f"{unsupported} is not supported by scorch prefix", file=sys.stderr)
+            return 1
+        with contextlib.ExitStack() as stack:
+            gold_stream = stack.enter_context(smart_open(arguments["<gold>"]))
+            sys_stream = stack.enter_context(smart_open(arguments["<sys>"]))
+            out_stream = stack.enter_context(smart_open(arguments["<out-file>"], "w"))
+            try:
+                out_stream.writelines(
+                    process_prefix_curve(
+                        gold_stream,
+                        sys_stream,
+                        every=every,
+                        output_format=output_format,
+                        match=match,
+                    )
+                )
+            except ValueError as e:
+                print(e, file=sys.stderr)
+                return 1
+        return None
+
     if arguments["<gold>"] != "-" and arguments["<sys>"] != "-":
         gold_path = pathlib.Path(arguments["<gold>"])
         sys_path = pathlib.Path(arguments["<sys>"])
-        if gold_path.is_dir() and sys_path.is_dir():
+        if is_corpus(gold_path, sys_path):
+            if arguments["--approximate"]:
+                print("--approximate is only supported for single files", file=sys.stderr)
+                return 1
+            if arguments["--cross-document"]:
+                unsupported = given_option(
+                    arguments, ("--group-by", "--cache", "--shard", "--watch", "--per-document")
+                )
+                if unsupported is not None:
+                    print(f"{unsupported} is not supported with --cross-document", file=sys.stderr)
+                    return 1
+                gold_clusters, sys_clusters = cross_document_clusters(
+                    gold_path,
+                    sys_path,
+                    match=match,
+                    global_entities=arguments["--global-entities"],
+                )
+                variants = score_singleton_variants(
+                    None,
+                    gold_clusters,
+                    sys_clusters,
+                    variants=tuple(SINGLETON_VARIANTS) if singletons == "both" else (singletons,),
+                    max_memory=max_memory,
+                    jobs=jobs,
+                )
+                with smart_open(arguments["<out-file>"], "w") as out_stream:
+                    if singletons == "both":
+                        out_stream.writelines(format_variants(variants, output_format))
+                    else:
+                        if output_format == "csv":
+                            out_stream.write(f"{','.join(CSV_HEADER)}\n")
+                        out_stream.writelines(
+                            format_results(variants[singletons].results, output_format)
+                        )
+                return None
+            if jobs > 1:
+                print(
+                    "--jobs is only supported for single files and --cross-document",
+                    file=sys.stderr,
+                )
+                return 1
+            if singletons != "include":
+                print(
+                    "--singletons is only supported for single files and --cross-document",
+                    file=sys.stderr,
+                )
+                return 1
+            cache = None if arguments["--cache"] is None else ResultCache(arguments["--cache"])
+            if shard is not None:
+                with smart_open(arguments["<out-file>"], "w") as out_stream:
+                    write_partial(
+                        score_dirs(
+                            gold_path,
+                            sys_path,
+                            cache=cache,
+                            match=match,
+                            shard=shard,
+                            max_memory=max_memory,
+                        ),
+                        out_stream,
+                        shard=shard,
+                    )
+                return None
+            if arguments["--watch"]:
+                if not (gold_path.is_dir() and sys_path.is_dir()):
+                    print("--watch is only supported for directories", file=sys.stderr)
+                    return 1
+                lines = watch_dirs(
+                    gold_path,
+                    sys_path,
+                    output_format=output_format,
+                    per_document=arguments["--per-document"],
+                    cache=cache,
+                    interval=interval,
+                    match=match,
+                    group_of=group_of,
+                    max_memory=max_memory,
+                )
+            else:
+                lines = process_dirs(
+                    gold_path,
+                    sys_path,
+                    output_format=output_format,
+                    per_document=arguments["--per-document"],
+                    cache=cache,
+                    match=match,
+                    group_of=group_of,
+                    max_memory=max_memory,
+                )
             with smart_open(arguments["<out-file>"], "w") as out_stream:
-                out_stream.writelines(process_dirs(gold_path, sys_path))
+                try:
+                    for line in lines:
+                        out_stream.write(line)
+                        # Make streamed results available downstream right away
+                        out_stream.flush()
+                except KeyboardInterrupt:  # The normal way to stop watching
+                    pass
             return None
 
+    unsupported = given_option(
+        arguments,
+        ("--shard", "--cache", "--watch", "--per-document", "--group-by", "--cross-document"),
+    )
+    if unsupported is not None:
+        print(f"{unsupported} is only supported for directories and bundles", file=sys.stderr)
+        return 1
     with contextlib.ExitStack() as stack:
         gold_stream = stack.enter_context(smart_open(arguments["<gold>"]))
         sys_stream = stack.enter_context(smart_open(arguments["<sys>"]))
         out_stream = stack.enter_context(smart_open(arguments["<out-file>"], "w"))
-        out_stream.writelines(process_files(gold_stream, sys_stream))
+        out_stream.writelines(
+            process_files(
+                gold_stream,
+                sys_stream,
+                output_format=output_format,
+                match=match,
+                approximate=arguments["--approximate"],
+                samples=samples,
+                max_memory=max_memory,
+                jobs=jobs,
+                singletons=singletons,
+            )
+        )
 
 
 if __name__ == "__main__":
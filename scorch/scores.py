@@ -11,19 +11,27 @@ June 2014. ([pdf](http://aclweb.org/anthology/P/P14/P14-2006.pdf))
 - **BLANC: Implementing the Rand Index for Coreference Evaluation.** Marta Recasens and Eduard
 Hovy In: *Natural Language Engineering* 17 (4). Cambridge University Press, 2011.
 ([pdf](http://citeseerx.ist.psu.edu/viewdoc/download?doi=10.1.1.300.9229&rep=rep1&type=pdf))
+- **Which Coreference Evaluation Metric Do You Trust? A Proposal for a Link-based Entity Aware
+Metric.** Nafise Sadat Moosavi and Michael Strube. *Proceedings of the 54th Annual Meeting of the
+Association for Computational Linguistics*, Berlin, Germany, August 2016.
+([pdf](https://aclanthology.org/P16-1060.pdf))
 - **An Extension of BLANC to System Mentions.** Xiaoqiang Luo, Sameer Pradhan, Marta Recasens and
 Eduard Hovy. *Proceedings of the 52nd Annual Meeting of the Association for Computational
 Linguistics*, Baltimore, MD, June 2014. ([pdf](http://aclweb.org/anthology/P/P14/P14-2005.pdf))
 The reference implementation : <https://github.com/conll/reference-coreference-scorers>
 """
+import concurrent.futures
 import math
+import os
 import typing as ty
 
+from collections import Counter
 from statistics import mean, harmonic_mean
 
-import numpy as np
-
-from scipy.optimize import linear_sum_assignment
+# numpy and scipy are comparatively slow to import, so they are only imported in the functions that
+# need them, to keep the startup of short-lived processes fast.
+if ty.TYPE_CHECKING:
+    import numpy as np
 
 
 def trace(cluster: ty.Set, partition: ty.Iterable[ty.Set]) -> ty.Iterable[ty.Set]:
@@ -67,9 +75,106 @@ def remap_clusterings(
     return RemapClusteringsReturn(res, elts_map)
 
 
+class Contingency(ty.NamedTuple):
+    r"""
+    A sparse contingency table of two clusterings `$K$` and `$R$`: the sizes of their clusters and
+    the non-zero `$\#k_i∩r_j$` overlaps, indexed by `$(i, j)$`.
+    """
+
+    key_sizes: ty.List[int]
+    response_sizes: ty.List[int]
+    overlaps: ty.Dict[ty.Tuple[int, int], int]
+
+
+def contingency(key: ty.Sequence[ty.Set], response: ty.Sequence[ty.Set]) -> Contingency:
+    """Compute the contingency table of `#key` and `#response` in time linear in their sizes."""
+    response_of = {m: j for j, r in enumerate(response) for m in r}
+    overlaps: ty.Dict[ty.Tuple[int, int], int] = Counter()
+    for i, k in enumerate(key):
+        for m in k:
+            j = response_of.get(m)
+            if j is not None:
+                overlaps[(i, j)] += 1
+    return Contingency([len(k) for k in key], [len(r) for r in response], dict(overlaps))
+
+
+def extra_mentions_counts(table: Contingency) -> ty.List[int]:
+    """
+    Return the number of mentions of every response cluster that are not in the key from a
+    contingency table, i.e. the number of implicit key singletons it contains (see
+    `implicit_key_singletons`).
+    """
+    counts = list(table.response_sizes)
+    for (_, j), n in table.overlaps.items():
+        counts[j] -= n
+    return counts
+
+
+class WithoutSingletonsReturn(ty.NamedTuple):
+    key: ty.List[ty.Set]
+    response: ty.List[ty.Set]
+    table: Contingency
+
+
+def without_singletons(
+    key: ty.Sequence[ty.Set],
+    response: ty.Sequence[ty.Set],
+    table: ty.Optional[Contingency] = None,
+) -> WithoutSingletonsReturn:
+    """
+    Remove the singleton clusters of `#key` and `#response` and return the remaining clusters
+    along with their contingency table, derived from the contingency `#table` of the whole
+    clusterings in time linear in its number of non-zero cells.
+
+    The remaining clusters are the same objects as in the inputs, so scoring a document with and
+    without singletons only needs a single copy of its clusters and a single contingency table.
+    """
+    if table is None:
+        table = contingency(key, response)
+    key_index = {
+        i: new_i for new_i, i in enumerate(i for i, s in enumerate(table.key_sizes) if s > 1)
+    }
+    response_index = {
+        j: new_j for new_j, j in enumerate(j for j, s in enumerate(table.response_sizes) if s > 1)
+    }
+    overlaps = {
+        (key_index[i], response_index[j]): n
+        for (i, j), n in table.overlaps.items()
+        if i in key_index and j in response_index
+    }
+    return WithoutSingletonsReturn(
+        [key[i] for i in key_index],
+        [response[j] for j in response_index],
+        Contingency(
+            [table.key_sizes[i] for i in key_index],
+            [table.response_sizes[j] for j in response_index],
+            overlaps,
+        ),
+    )
+
+
+class DetailedScores(ty.NamedTuple):
+    r"""
+    `$(R, P, F₁)$` scores along with the contributions of every key (resp. response) cluster to the
+    numerator of `$R$` (resp. `$P$`), in the order of the input clusterings, and for CEAF the
+    optimal alignment as a list of `(key_index, response_index)` pairs.
+    """
+
+    R: float
+    P: float
+    F: float
+    key_contributions: ty.List[float]
+    response_contributions: ty.List[float]
+    alignment: ty.Optional[ty.List[ty.Tuple[int, int]]] = None
+
+
 def muc(
-    key: ty.Sequence[ty.Set], response: ty.Sequence[ty.Set]
-) -> ty.Tuple[float, float, float]:
+    key: ty.Sequence[ty.Set],
+    response: ty.Sequence[ty.Set],
+    details: bool = False,
+    implicit_singletons: bool = False,
+    table: ty.Optional[Contingency] = None,
+) -> ty.Union[ty.Tuple[float, float, float], DetailedScores]:
     r"""
     Compute the MUC `$(R, P, F₁)$` scores for a `#response` clustering given a `#key` clustering,
     that is
@@ -84,28 +189,61 @@ def muc(
     and `$F$` are defined to be `$0$`, following the reference implementation (since singleton
     clusters where not considered in Vilain et al. (1995).
 
+    If `#details` is true, return a `DetailedScores` where the contribution of a cluster `$x$` is
+    `$\#x-\#p(x, E)$`.
+
+    The partitions are not built explicitly: `$\#p(k_i, R)$` is the number of non-zero cells of the
+    row `$i$` of the contingency table plus the number of mentions of `$k_i$` that are not in
+    `$R$`, so this runs in time linear in the number of mentions.
+
+    Singleton key clusters contribute nothing to MUC, so `#implicit_singletons` (see
+    `implicit_key_singletons`) doesn't change the scores and is only accepted for consistency with
+    the other metrics.
+
     Note: This implementation is significantly different from the reference one (despite
     implementing the formulae from Pradahan et al. (2014) in that the reference use the ordering of
     mentions in documents to consistently assign a non-problematic spanning tree (viz. a chain) to
     each cluster, thus avoiding the issues that led Vilain et al. (1995) to define MUC by the
     formulae above.
+
+    `#table` is the contingency table of `#key` and `#response` (see `contingency`), if it has
+    already been computed.
     """
     # Edge case
     if all(len(k) == 1 for k in key) or all(len(r) == 1 for r in response):
+        if details:
+            return DetailedScores(0.0, 0.0, 0.0, [0.0] * len(key), [0.0] * len(response))
         return 0.0, 0.0, 0.0
-    R = sum(len(k) - sum(1 for _ in trace(k, response)) for k in key) / sum(
-        len(k) - 1 for k in key
-    )
-    P = sum(len(r) - sum(1 for _ in trace(r, key)) for r in response) / sum(
-        len(r) - 1 for r in response
-    )
+    if table is None:
+        table = contingency(key, response)
+    # `$\#x-\#p(x, E)$` is the number of mentions of `$x$` in `$E$` minus the number of clusters of
+    # `$E$` they are in
+    key_contributions = [0] * len(key)
+    response_contributions = [0] * len(response)
+    for (i, j), n in table.overlaps.items():
+        key_contributions[i] += n - 1
+        response_contributions[j] += n - 1
+    R = sum(key_contributions) / sum(len(k) - 1 for k in key)
+    P = sum(response_contributions) / sum(len(r) - 1 for r in response)
     F = harmonic_mean((R, P))
+    if details:
+        return DetailedScores(
+            R,
+            P,
+            F,
+            [float(c) for c in key_contributions],
+            [float(c) for c in response_contributions],
+        )
     return R, P, F
 
 
 def b_cubed(
-    key: ty.Sequence[ty.Set], response: ty.Sequence[ty.Set]
-) -> ty.Tuple[float, float, float]:
+    key: ty.Sequence[ty.Set],
+    response: ty.Sequence[ty.Set],
+    details: bool = False,
+    implicit_singletons: bool = False,
+    table: ty.Optional[Contingency] = None,
+) -> ty.Union[ty.Tuple[float, float, float], DetailedScores]:
     r"""
     Compute the B³ `$(R, P, F₁)$` scores for a `#response` clustering given a `#key` clustering,
     that is
@@ -114,19 +252,125 @@ def b_cubed(
     P &= \frac{∑_{r∈R}∑_{k∈K}\frac{(\#r∩k)²}{\#r}}{∑_{r∈R}\#r}\\
     F &= 2*\frac{PR}{P+R}
     ```
+
+    If `#details` is true, return a `DetailedScores` where the contribution of a key cluster `$k$`
+    is `$∑_{r∈R}\frac{(\#k∩r)²}{\#k}$` (and symmetrically for response clusters).
+
+    Only the non-zero overlaps of the contingency table contribute, so this runs in time linear in
+    the number of mentions.
+
+    With `#implicit_singletons` (see `implicit_key_singletons`), every one of the `$e_r$` response
+    mentions of `$r$` that are not in `#key` is a key singleton with a contribution of `$1$`, and
+    adds `$\frac{1}{\#r}$` to the contribution of `$r$`. The key contributions in the details
+    are those of the explicit key clusters only.
+
+    `#table` is the contingency table of `#key` and `#response` (see `contingency`), if it has
+    already been computed.
     """
-    if sum(len(k) for k in key) == 0:
+    if table is None:
+        table = contingency(key, response)
+    key_terms: ty.List[ty.List[float]] = [[] for _ in key]
+    response_terms: ty.List[ty.List[float]] = [[] for _ in response]
+    for (i, j), n in table.overlaps.items():
+        key_terms[i].append(n ** 2 / table.key_sizes[i])
+        response_terms[j].append(n ** 2 / table.response_sizes[j])
+    num_extra = 0
+    if implicit_singletons:
+        for j, e in enumerate(extra_mentions_counts(table)):
+            if e:
+                num_extra += e
+                response_terms[j].append(e / table.response_sizes[j])
+    key_contributions = [math.fsum(t) for t in key_terms]
+    response_contributions = [math.fsum(t) for t in response_terms]
+    key_mentions = sum(table.key_sizes) + num_extra
+    if key_mentions == 0:
         R = 0.0
     else:
-        R = math.fsum(
-            len(k.intersection(r)) ** 2 / len(k) for k in key for r in response
-        ) / sum(len(k) for k in key)
+        R = math.fsum([*key_contributions, float(num_extra)]) / key_mentions
     if sum(len(r) for r in response) == 0:
         P = 0.0
     else:
-        P = math.fsum(
-            len(r.intersection(k)) ** 2 / len(r) for r in response for k in key
-        ) / sum(len(r) for r in response)
+        P = math.fsum(response_contributions) / sum(len(r) for r in response)
+    F = harmonic_mean((R, P))
+    if details:
+        return DetailedScores(R, P, F, key_contributions, response_contributions)
+    return R, P, F
+
+
+def lea(
+    key: ty.Sequence[ty.Set],
+    response: ty.Sequence[ty.Set],
+    implicit_singletons: bool = False,
+    table: ty.Optional[Contingency] = None,
+) -> ty.Tuple[float, float, float]:
+    r"""
+    Compute the LEA `$(R, P, F₁)$` scores for a `#response` clustering given a `#key` clustering,
+    that is
+    ```math
+    R &= \frac{∑_{k∈K}\#k×\frac{∑_{r∈R}link(k∩r)}{link(k)}}{∑_{k∈K}\#k}\\
+    P &= \frac{∑_{r∈R}\#r×\frac{∑_{k∈K}link(r∩k)}{link(r)}}{∑_{r∈R}\#r}\\
+    F &= 2*\frac{PR}{P+R}
+    ```
+    with `$link(e)=\frac{\#e×(\#e-1)}{2}$` the number of coreference links in `$e$`.
+
+    Following Moosavi and Strube (2016), a singleton cluster has a single self-link, which is
+    resolved if its mention is also a singleton in the other clustering.
+
+    Rather than enumerating the links, this only uses the sizes of the clusters and of their
+    non-zero overlaps, so it runs in time linear in the number of mentions.
+
+    With `#implicit_singletons` (see `implicit_key_singletons`), the response mentions that are
+    not in `#key` are key singletons, whose self-link is resolved iff their response cluster is a
+    singleton too.
+
+    `#table` is the contingency table of `#key` and `#response` (see `contingency`), if it has
+    already been computed.
+    """
+    if table is None:
+        table = contingency(key, response)
+    # Resolved self-links of the implicit singletons, which are also those of the response
+    # singletons that are not in `key`, and number of implicit singletons
+    resolved_extra, num_extra = 0, 0
+    if implicit_singletons:
+        for s, e in zip(table.response_sizes, extra_mentions_counts(table)):
+            num_extra += e
+            if s == 1:
+                resolved_extra += e
+
+    def link(n: int) -> int:
+        return n * (n - 1) // 2
+
+    def lea_score(
+        sizes: ty.Sequence[int],
+        other_sizes: ty.Sequence[int],
+        overlaps: ty.Iterable[ty.Tuple[ty.Tuple[int, int], int]],
+        extra_mentions: int = 0,
+    ) -> float:
+        common_links = [0] * len(sizes)
+        for (i, j), n in overlaps:
+            if sizes[i] == 1:
+                common_links[i] = int(other_sizes[j] == 1)
+            else:
+                common_links[i] += link(n)
+        denominator = sum(sizes) + extra_mentions
+        if denominator == 0:
+            return 0.0
+        return (
+            math.fsum(
+                [
+                    *(s * c / (link(s) if s > 1 else 1) for s, c in zip(sizes, common_links)),
+                    float(resolved_extra),
+                ]
+            )
+            / denominator
+        )
+
+    R = lea_score(table.key_sizes, table.response_sizes, table.overlaps.items(), num_extra)
+    P = lea_score(
+        table.response_sizes,
+        table.key_sizes,
+        (((j, i), n) for (i, j), n in table.overlaps.items()),
+    )
     F = harmonic_mean((R, P))
     return R, P, F
 
@@ -135,7 +379,12 @@ def ceaf(
     key: ty.Sequence[ty.Set],
     response: ty.Sequence[ty.Set],
     score: ty.Callable[[ty.Set, ty.Set], float],
-) -> ty.Tuple[float, float, float]:
+    details: bool = False,
+    sparse: bool = False,
+    executor: ty.Optional[concurrent.futures.Executor] = None,
+    implicit_singletons: bool = False,
+    table: ty.Optional[Contingency] = None,
+) -> ty.Union[ty.Tuple[float, float, float], DetailedScores]:
     r"""
     Compute the CEAF `$(R, P, F₁)$` scores for a `#response` clustering given a `#key` clustering
     using the `#score` alignment score function, that is
@@ -146,41 +395,236 @@ def ceaf(
     ```
     Where `$C$` is `#score` and `$A$` is a one-to-one mapping from key clusters to response
     clusters that maximizes `$∑_{k∈K}C(k, A(k))$`.
+
+    If `#details` is true, return a `DetailedScores` with the alignment `$A$` found by the solver
+    and the similarity `$C(k, A(k))$` of every cluster with the cluster it is aligned to (`$0$` for
+    unaligned clusters) as its contribution.
+
+    If `#sparse` is true, the alignment is computed separately for every connected component of the
+    graph of overlapping clusters (see `overlap_components`), which gives the same optimum as long
+    as `#score` is `$0$` for disjoint clusters, but only needs matrices the size of the largest
+    component instead of `$\#K×\#R$`. In that case, the alignment only contains pairs of
+    clusters in the same component, and the assignment problems of the components are solved by
+    `#executor` if it is given, so they can be distributed across worker processes.
+
+    See `implicit_key_singletons` for `#implicit_singletons`. Since all the implicit singletons of
+    a response cluster `$r$` have the same similarity with it, at most one of them can be aligned
+    to `$r$` and they can't be aligned to any other cluster, they are represented by a single row
+    of the assignment problem for every such `$r$`. The details only include the explicit key
+    clusters.
+
+    `#table` is the contingency table of `#key` and `#response` (see `contingency`), if it has
+    already been computed, which is only used in sparse mode.
     """
-    if len(response) == 0 or len(key) == 0:
+    extra = implicit_key_singletons(key, response) if implicit_singletons else dict()
+    num_extra = sum(len(e) for e in extra.values())
+    if len(response) == 0 or len(key) + num_extra == 0:
+        if details:
+            return DetailedScores(0.0, 0.0, 0.0, [0.0] * len(key), [0.0] * len(response), [])
         return 0.0, 0.0, 0.0
     else:
-        cost_matrix = np.array([[-score(k, r) for r in response] for k in key])
-        # TODO: See https://github.com/allenai/allennlp/issues/2946 for ideas on speeding
-        # the next line up
-        row_ind, col_ind = linear_sum_assignment(cost_matrix)
-        total_score = -cost_matrix[row_ind, col_ind].sum()
-        R = total_score / math.fsum(score(k, k) for k in key)
+        import numpy as np
+        from scipy.optimize import linear_sum_assignment
+
+        # The implicit singletons of the response cluster `j` are the row `-j-1`
+        extra_scores = {j: score({m}, response[j]) for j, (m, *_) in extra.items()}
+
+        def similarity(i: int, j: int) -> float:
+            if i >= 0:
+                return score(key[i], response[j])
+            return extra_scores[j] if -i - 1 == j else 0.0
+
+        rows: ty.List[int] = []
+        cols: ty.List[int] = []
+        sims: ty.List[float] = []
+        if sparse:
+            components = []
+            in_component: ty.Set[int] = set()
+            for component_keys, component_responses in overlap_components(
+                key, response, table
+            ):
+                component_keys = component_keys + [
+                    -j - 1 for j in component_responses if j in extra_scores
+                ]
+                in_component.update(component_responses)
+                components.append((component_keys, component_responses))
+            components.extend(([-j - 1], [j]) for j in extra_scores if j not in in_component)
+            blocks = []
+            solved = []
+            for component_keys, component_responses in components:
+                # The many one-to-one components don't need a solver
+                if len(component_keys) == len(component_responses) == 1:
+                    ((i,), (j,)) = component_keys, component_responses
+                    rows.append(i)
+                    cols.append(j)
+                    sims.append(similarity(i, j))
+                else:
+                    solved.append((component_keys, component_responses))
+                    blocks.append(
+                        np.array(
+                            [[-similarity(i, j) for j in component_responses]
+                             for i in component_keys]
+                        )
+                    )
+            if executor is None:
+                solutions: ty.Iterable = map(solve_assignment, blocks)
+            else:
+                # Send the components in batches to limit the overhead
+                chunksize = max(1, len(blocks) // (16 * (os.cpu_count() or 1)))
+                solutions = executor.map(solve_assignment, blocks, chunksize=chunksize)
+            for (component_keys, component_responses), (block_rows, block_cols, block_sims) in zip(
+                solved, solutions
+            ):
+                rows.extend(component_keys[i] for i in block_rows)
+                cols.extend(component_responses[j] for j in block_cols)
+                sims.extend(block_sims)
+        else:
+            all_rows = [*range(len(key)), *(-j - 1 for j in extra_scores)]
+            cost_matrix = np.array(
+                [[-similarity(i, j) for j in range(len(response))] for i in all_rows]
+            )
+            # TODO: See https://github.com/allenai/allennlp/issues/2946 for ideas on speeding
+            # the next line up
+            row_ind, col_ind = linear_sum_assignment(cost_matrix)
+            rows = [all_rows[i] for i in row_ind.tolist()]
+            cols = col_ind.tolist()
+            sims = (-cost_matrix[row_ind, col_ind]).tolist()
+        total_score = np.array(sims, dtype=float).sum()
+        key_norm = math.fsum(score(k, k) for k in key)
+        if num_extra:
+            ((m, *_), *_) = extra.values()
+            key_norm += num_extra * score({m}, {m})
+        R = total_score / key_norm
         P = total_score / math.fsum(score(r, r) for r in response)
         F = harmonic_mean((R, P))
+        if details:
+            key_contributions = [0.0] * len(key)
+            response_contributions = [0.0] * len(response)
+            alignment = []
+            for i, j, c in zip(rows, cols, sims):
+                response_contributions[j] = c
+                if i >= 0:
+                    key_contributions[i] = c
+                    alignment.append((i, j))
+            return DetailedScores(
+                R, P, F, key_contributions, response_contributions, alignment,
+            )
         return R, P, F
 
 
-def ceaf_m(
+def implicit_key_singletons(
     key: ty.Sequence[ty.Set], response: ty.Sequence[ty.Set]
-) -> ty.Tuple[float, float, float]:
+) -> ty.Dict[int, ty.List[ty.Hashable]]:
+    """
+    Return the mentions of every cluster of `#response` that are not in `#key`, for the clusters
+    that have some.
+
+    The metrics of this module accept an `implicit_singletons` option which makes them count these
+    mentions as key singletons, giving the same scores as if `#key` had been padded with them (as
+    `scorch.main.add_extra_mentions` does) without having to build them. Their contributions are
+    computed in closed form from the numbers of such mentions in every response cluster, so
+    inputs with many spurious mentions cost little more than the rest of the clusterings.
+    """
+    key_mentions: ty.Set[ty.Hashable] = set().union(*key)
+    extra = dict()
+    for j, r in enumerate(response):
+        missing = [m for m in r if m not in key_mentions]
+        if missing:
+            extra[j] = missing
+    return extra
+
+
+def solve_assignment(
+    cost_matrix: "np.ndarray",
+) -> ty.Tuple[ty.List[int], ty.List[int], ty.List[float]]:
+    """
+    Return the rows, columns and similarities (the opposites of the costs) of an optimal
+    assignment for `#cost_matrix`.
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    row_ind, col_ind = linear_sum_assignment(cost_matrix)
+    return row_ind.tolist(), col_ind.tolist(), (-cost_matrix[row_ind, col_ind]).tolist()
+
+
+def overlap_components(
+    key: ty.Sequence[ty.Set],
+    response: ty.Sequence[ty.Set],
+    table: ty.Optional[Contingency] = None,
+) -> ty.List[ty.Tuple[ty.List[int], ty.List[int]]]:
+    """
+    Return the connected components of the bipartite graph whose nodes are the clusters of `#key`
+    and `#response` and whose edges link overlapping clusters, as `(key_indices,
+    response_indices)` pairs, omitting the isolated clusters.
+
+    `#table` is the contingency table of `#key` and `#response` (see `contingency`), if it has
+    already been computed.
+    """
+    if table is None:
+        table = contingency(key, response)
+    # Union-find over key clusters `i` and response clusters `len(key) + j`
+    parent = list(range(len(key) + len(response)))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j in table.overlaps:
+        a, b = find(i), find(len(key) + j)
+        if a != b:
+            parent[a] = b
+    components: ty.Dict[int, ty.Tuple[ty.List[int], ty.List[int]]] = dict()
+    for i in range(len(key)):
+        components.setdefault(find(i), ([], []))[0].append(i)
+    for j in range(len(response)):
+        components.setdefault(find(len(key) + j), ([], []))[1].append(j)
+    return [c for c in components.values() if c[0] and c[1]]
+
+
+def ceaf_m(
+    key: ty.Sequence[ty.Set],
+    response: ty.Sequence[ty.Set],
+    details: bool = False,
+    sparse: bool = False,
+    executor: ty.Optional[concurrent.futures.Executor] = None,
+    implicit_singletons: bool = False,
+    table: ty.Optional[Contingency] = None,
+) -> ty.Union[ty.Tuple[float, float, float], DetailedScores]:
     r"""
     Compute the CEAFₘ `$(R, P, F₁)$` scores for a `#response` clustering given a `#key` clustering,
     that is the CEAF score for the `$Φ_3$` score function
     ```math
     Φ_3: (k, r) ⟼ \#k∩r
     ```
+    See `ceaf` for `#details`, `#sparse`, `#executor`, `#implicit_singletons` and `#table`.
     """
 
     def Φ_3(k, r):
         return len(k.intersection(r))
 
-    return ceaf(key, response, Φ_3)
+    return ceaf(
+        key,
+        response,
+        Φ_3,
+        details=details,
+        sparse=sparse,
+        executor=executor,
+        implicit_singletons=implicit_singletons,
+        table=table,
+    )
 
 
 def ceaf_e(
-    key: ty.Sequence[ty.Set], response: ty.Sequence[ty.Set]
-) -> ty.Tuple[float, float, float]:
+    key: ty.Sequence[ty.Set],
+    response: ty.Sequence[ty.Set],
+    details: bool = False,
+    sparse: bool = False,
+    executor: ty.Optional[concurrent.futures.Executor] = None,
+    implicit_singletons: bool = False,
+    table: ty.Optional[Contingency] = None,
+) -> ty.Union[ty.Tuple[float, float, float], DetailedScores]:
     r"""
     Compute the CEAFₑ `$(R, P, F₁)$` scores for a `#response` clustering given a `#key`
     clustering, that is the CEAF score for the `$Φ₄$` score function (aka the Sørensen–Dice
@@ -188,6 +632,8 @@ def ceaf_e(
     ```math
     Φ₄: (k, r) ⟼ \frac{2×\#k∩r}{\#k+\#r}
     ```
+    See `ceaf` for `#details`, `#sparse`, `#executor`, `#implicit_singletons` and `#table`.
+
     Note: this use the original (Luo, 2005) definition as opposed to Pradhan et al. (2014)'s one
     which inlines the denominators.
     """
@@ -195,16 +641,36 @@ def ceaf_e(
     def Φ_4(k, r):
         return 2 * len(k.intersection(r)) / (len(k) + len(r))
 
-    return ceaf(key, response, Φ_4)
+    return ceaf(
+        key,
+        response,
+        Φ_4,
+        details=details,
+        sparse=sparse,
+        executor=executor,
+        implicit_singletons=implicit_singletons,
+        table=table,
+    )
 
 
 # COMBAK: Check the numeric stability
 def blanc(
-    key: ty.Sequence[ty.Set], response: ty.Sequence[ty.Set], fast=True,
+    key: ty.Sequence[ty.Set],
+    response: ty.Sequence[ty.Set],
+    fast=True,
+    sparse=False,
+    implicit_singletons: bool = False,
+    table: ty.Optional[Contingency] = None,
 ) -> ty.Tuple[float, float, float]:
     r"""
     Return the BLANC `$(R, P, F)$` scores for a `#response` clustering given a `#key` clustering.
 
+    If `#sparse` is true, the links are counted from the contingency table (see
+    `sparse_detailed_blanc`), otherwise with dense adjacency matrices if `#fast` is true (see
+    `fast_detailed_blanc`) or sets of links if it is false (see `detailed_blanc`).
+    All of them support `#implicit_singletons` (see `implicit_key_singletons`), and the sparse one
+    also uses the contingency `#table` of `#key` and `#response`, if it has already been computed.
+
     ## Notes
 
       - Mention identifiers have to be comparable
@@ -214,9 +680,16 @@ def blanc(
         (2014), BLANC should be `$\frac{0+F_n}{2}$` since `$C_k=∅$` and `$C_r≠∅$`, but according to
         Recasens and Hovy (2011), BLANC should be `$F_n$`.
     """
-    if fast:
-        C_score, N_score = fast_detailed_blanc(key, response)
+    if sparse:
+        C_score, N_score = sparse_detailed_blanc(key, response, implicit_singletons, table)
+    elif fast:
+        C_score, N_score = fast_detailed_blanc(key, response, implicit_singletons)
     else:
+        if implicit_singletons:
+            key = [
+                *key,
+                *({m} for e in implicit_key_singletons(key, response).values() for m in e),
+            ]
         C_score, N_score = detailed_blanc(key, response)
     if C_score is None:
         assert N_score is not None  # nosec:B101
@@ -224,6 +697,8 @@ def blanc(
     if N_score is None:
         assert C_score is not None  # nosec:B101
         return C_score
+    import numpy as np
+
     return ty.cast(
         ty.Tuple[float, float, float],
         tuple(np.mean((C_score, N_score), axis=0).tolist()),
@@ -315,11 +790,13 @@ def detailed_blanc(
 class AdjacencyReturn(ty.NamedTuple):
     """Represents a clustering of integers as an adjacency matrix and a presence mask"""
 
-    adjacency: np.ndarray
-    presence: np.ndarray
+    adjacency: "np.ndarray"
+    presence: "np.ndarray"
 
 
 def adjacency(clusters: ty.List[ty.List[int]], num_elts: int) -> AdjacencyReturn:
+    import numpy as np
+
     adjacency = np.zeros((num_elts, num_elts), dtype=np.bool)
     presence = np.zeros(num_elts, dtype=np.bool)
     # **Note** The nested loop makes the complexity of this `$∑|c|²$` but we are only doing memory
@@ -340,27 +817,44 @@ def adjacency(clusters: ty.List[ty.List[int]], num_elts: int) -> AdjacencyReturn
 
 
 def fast_detailed_blanc(
-    key: ty.Sequence[ty.Set], response: ty.Sequence[ty.Set]
+    key: ty.Sequence[ty.Set],
+    response: ty.Sequence[ty.Set],
+    implicit_singletons: bool = False,
 ) -> ty.Tuple[
     ty.Union[ty.Tuple[float, float, float], None],
     ty.Union[ty.Tuple[float, float, float], None],
 ]:
-    """Return BLANC `$(R, P, F)$` scores for coreference and non-coreference respectively."""
+    """
+    Return BLANC `$(R, P, F)$` scores for coreference and non-coreference respectively.
+
+    With `#implicit_singletons` (see `implicit_key_singletons`), the response mentions that are
+    not in `#key` are key singletons, which have no coreference links, so they are simply marked
+    as present in the key.
+    """
+    num_extra = (
+        sum(len(e) for e in implicit_key_singletons(key, response).values())
+        if implicit_singletons
+        else 0
+    )
 
     # Edge case : a single mention in both `key` and `response` clusters
     # in that case, `C_k`, `C_r`, `N_k` and `N_r` are all empty, so we need a separate examination
     # of the mentions to know if we are very good or very bad.
-    if len(key) == len(response) == 1 and len(key[0]) == len(response[0]) == 1:
-        if key[0] == response[0]:
+    if len(key) + num_extra == len(response) == 1 and len(response[0]) == 1:
+        if num_extra or key[0] == response[0]:
             return ((1.0, 1.0, 1.0), (1.0, 1.0, 1.0))
-        else:
+        elif len(key[0]) == 1:
             return ((0.0, 0.0, 0.0), (0.0, 0.0, 0.0))
 
+    import numpy as np
+
     (key, response), mentions_map = remap_clusterings([key, response])
     num_mentions = len(mentions_map)
 
     key_coref_links, key_presence = adjacency(key, num_mentions)
     response_coref_links, response_presence = adjacency(response, num_mentions)
+    if num_extra:
+        key_presence |= response_presence
 
     tp_c = np.logical_and(key_coref_links, response_coref_links).sum() // 2
     c_k = key_coref_links.sum() // 2
@@ -410,6 +904,92 @@ def fast_detailed_blanc(
     return ((R_c, P_c, F_c), (R_n, P_n, F_n))
 
 
+def sparse_detailed_blanc(
+    key: ty.Sequence[ty.Set],
+    response: ty.Sequence[ty.Set],
+    implicit_singletons: bool = False,
+    table: ty.Optional[Contingency] = None,
+) -> ty.Tuple[
+    ty.Union[ty.Tuple[float, float, float], None],
+    ty.Union[ty.Tuple[float, float, float], None],
+]:
+    r"""
+    Return BLANC `$(R, P, F)$` scores for coreference and non-coreference respectively, counting
+    the links from the contingency table `$n_{ij}=\#k_i∩r_j$` instead of enumerating them, which
+    takes linear time and memory. With `$l(n)=\frac{n(n-1)}{2}$` and `$a_i=∑_jn_{ij}$`,
+    `$b_j=∑_in_{ij}$` the number of mentions of `$k_i$` (resp. `$r_j$`) that are also in the other
+    clustering and `$N$` the number of such common mentions,
+    ```math
+    \#C_k∩C_r &= ∑_{i,j}l(n_{ij})\\
+    \#N_k∩N_r &= l(N) - ∑_il(a_i) - ∑_jl(b_j) + ∑_{i,j}l(n_{ij})
+    ```
+
+    With `#implicit_singletons` (see `implicit_key_singletons`), the response mentions that are
+    not in `#key` are common mentions in key singletons, which have no coreference links, so they
+    are simply added to `$N$` and to the `$b_j$`.
+
+    `#table` is the contingency table of `#key` and `#response` (see `contingency`), if it has
+    already been computed.
+    """
+    if table is None:
+        table = contingency(key, response)
+    extra = extra_mentions_counts(table) if implicit_singletons else [0] * len(response)
+    num_extra = sum(extra)
+    if len(key) + num_extra == len(response) == 1 and len(response[0]) == 1:
+        if num_extra or key[0] == response[0]:
+            return ((1.0, 1.0, 1.0), (1.0, 1.0, 1.0))
+        elif len(key[0]) == 1:
+            return ((0.0, 0.0, 0.0), (0.0, 0.0, 0.0))
+
+    def link(n: int) -> int:
+        return n * (n - 1) // 2
+
+    key_common: ty.Counter[int] = Counter()
+    response_common: ty.Counter[int] = Counter(
+        {j: e for j, e in enumerate(extra) if e}
+    )
+    for (i, j), n in table.overlaps.items():
+        key_common[i] += n
+        response_common[j] += n
+    common_links = sum(link(n) for n in table.overlaps.values())
+
+    tp_c = common_links
+    c_k = sum(link(n) for n in table.key_sizes)
+    c_r = sum(link(n) for n in table.response_sizes)
+    tp_n = (
+        link(sum(key_common.values()) + num_extra)
+        - sum(link(n) for n in key_common.values())
+        - sum(link(n) for n in response_common.values())
+        + common_links
+    )
+    n_k = link(sum(table.key_sizes) + num_extra) - c_k
+    n_r = link(sum(table.response_sizes)) - c_r
+
+    if not c_k and not c_r:
+        R_c, P_c, F_c = (1.0, 1.0, 1.0)
+    elif not c_k or not c_r:
+        R_c, P_c, F_c = (0.0, 0.0, 0.0)
+    else:
+        R_c, P_c = tp_c / c_k, tp_c / c_r
+        F_c = 2 * tp_c / (c_k + c_r)
+
+    if not n_k and not n_r:
+        R_n, P_n, F_n = (1.0, 1.0, 1.0)
+    elif not n_k or not n_r:
+        R_n, P_n, F_n = (0.0, 0.0, 0.0)
+    else:
+        R_n, P_n = tp_n / n_k, tp_n / n_r
+        F_n = 2 * tp_n / (n_k + n_r)
+
+    # Edge cases
+    if not c_k:
+        return (None, (R_n, P_n, F_n))
+    if not n_k:
+        return ((R_c, P_c, F_c), None)
+
+    return ((R_c, P_c, F_c), (R_n, P_n, F_n))
+
+
 def conll2012(key: ty.Sequence[ty.Set], response: ty.Sequence[ty.Set]) -> float:
     r"""
     Return the CoNLL-2012 scores for a `#response` clustering given a `#key` clustering, that is,
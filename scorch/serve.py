@@ -0,0 +1,327 @@
+r"""
+A persistent scoring server that keeps a gold corpus in memory.
+
+This avoids paying the interpreter startup and the parsing of the gold documents for every call
+to the scorer, which dominates the runtime when scoring many system outputs (e.g. during an
+hyperparameter search).
+
+The server speaks a minimal subset of HTTP/1.1, either on a localhost TCP port or on a Unix
+socket. The routes are
+
+- `GET /`: return `{"documents": [<gold document names>]}`
+- `POST /score`: score system outputs, the request body being either
+  - A single system document, in any of the input formats accepted by `scorch`, with a `"name"`
+    key matching a gold document. The response is the JSON record of its scores, as output by
+    `scorch --format json`.
+  - A batch `{"documents": [<system document>, …]}`, in which case the response is
+    `{"documents": [<document record>, …], "corpus": <corpus record>}`, the corpus scores being the
+    micro-average of the documents scores, as in directory mode.
+
+The requests are read by an asyncio front end and the scoring itself is done in a pool of worker
+processes that all have their own copy of the gold corpus, so concurrent requests are scored in
+parallel.
+
+## Example
+
+```bash
+scorch serve --port 8000 gold/
+curl -X POST --data @sys/doc.json http://localhost:8000/score
+```
+"""
+import asyncio
+import concurrent.futures
+import json
+import multiprocessing
+import pathlib
+import sys
+
+import typing as ty
+
+from scorch import main
+from scorch import spans
+
+
+GoldCorpus = ty.Dict[str, ty.List[ty.Set]]
+
+# Largest request body accepted by default, in bytes
+DEFAULT_MAX_BODY_SIZE = 64 << 20
+
+# The gold corpus of the current worker process, see `_init_worker`
+_gold: GoldCorpus = dict()
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+def _intern(mention: ty.Hashable) -> ty.Hashable:
+    if isinstance(mention, str):
+        return sys.intern(mention)
+    return mention
+
+
+def load_gold(gold_path: ty.Union[str, pathlib.Path]) -> GoldCorpus:
+    """
+    Load a gold corpus from a single document or a directory of documents, as a mapping from
+    document names to clusters.
+
+    Documents are named after the stem of their file, like in directory mode. String mention
+    identifiers are interned, which makes them cheaper to store and to compare with the system
+    mentions.
+    """
+    gold_path = pathlib.Path(gold_path)
+    if gold_path.is_dir():
+        files = sorted(p for p in gold_path.iterdir() if p.is_file())
+    else:
+        files = [gold_path]
+    corpus = dict()
+    for f in files:
+        with f.open() as in_stream:
+            obj = json.load(in_stream)
+        clusters = main.clusters_from_obj(obj)
+        corpus[f.stem] = [set(_intern(m) for m in c) for c in clusters]
+        # Also allow referring to documents by their inner name
+        if "name" in obj:
+            corpus.setdefault(obj["name"], corpus[f.stem])
+    return corpus
+
+
+def _init_worker(gold_path: ty.Union[str, pathlib.Path]):
+    global _gold
+    _gold = load_gold(gold_path)
+
+
+def score_document(
+    sys_obj: ty.Dict[str, ty.Any], add_sys_mentions: bool = True, match: str = "exact"
+) -> main.DocumentResults:
+    """
+    Score a system document against the gold document with the same name in the current gold
+    corpus, return a `(name, results, gold_size, sys_size)` tuple.
+    """
+    name = sys_obj.get("name")
+    try:
+        # The extra system mentions are implicit gold singletons, so the cached gold clusters are
+        # scored as they are, without a copy
+        gold_clusters = _gold[name]
+    except KeyError:
+        raise ValueError(f"No matching gold document for {name!r}")
+    return main.score_document_clusters(
+        name,
+        gold_clusters,
+        main.clusters_from_obj(sys_obj),
+        add_sys_mentions=add_sys_mentions,
+        match=match,
+    )
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ScoringServer:
+    """
+    An asyncio HTTP front end dispatching scoring requests to a worker pool.
+
+    Requests whose body is larger than `#max_body_size` bytes are rejected with a 413 status.
+    """
+
+    def __init__(
+        self,
+        gold_path: ty.Union[str, pathlib.Path],
+        workers: ty.Optional[int] = None,
+        add_sys_mentions: bool = True,
+        match: str = "exact",
+        max_body_size: int = DEFAULT_MAX_BODY_SIZE,
+    ):
+        if match not in spans.MATCHING_MODES:
+            raise ValueError(
+                f"Unsupported matching mode {match!r}, use one of {', '.join(spans.MATCHING_MODES)}"
+            )
+        self.add_sys_mentions = add_sys_mentions
+        self.match = match
+        self.max_body_size = max_body_size
+        self.documents = sorted(load_gold(gold_path))
+        # Workers are started on demand, possibly while connections are open, so they must not be
+        # forked, otherwise they would inherit the connections sockets and keep them open.
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(gold_path,),
+        )
+
+    def close(self):
+        self.executor.shutdown()
+
+    async def score(self, sys_obj: ty.Dict[str, ty.Any]) -> main.DocumentResults:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self.executor, score_document, sys_obj, self.add_sys_mentions, self.match
+            )
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise HTTPError(400, f"Invalid document: {e}")
+
+    async def respond(self, method: str, path: str, body: bytes) -> ty.Dict[str, ty.Any]:
+        if path == "/":
+            if method != "GET":
+                raise HTTPError(405, f"Unsupported method {method} for {path}")
+            return {"documents": self.documents}
+        if path != "/score":
+            raise HTTPError(404, f"Unknown route {path}")
+        if method != "POST":
+            raise HTTPError(405, f"Unsupported method {method} for {path}")
+        try:
+            obj = json.loads(body)
+        except ValueError as e:
+            raise HTTPError(400, f"Invalid JSON: {e}")
+        if not isinstance(obj, dict):
+            raise HTTPError(400, "Expected a JSON object")
+        if "documents" in obj:
+            if not (
+                isinstance(obj["documents"], list)
+                and all(isinstance(d, dict) for d in obj["documents"])
+            ):
+                raise HTTPError(400, "Expected a list of JSON objects as documents")
+            individual_results = await asyncio.gather(
+                *(self.score(d) for d in obj["documents"])
+            )
+            if not individual_results:
+                raise HTTPError(400, "Empty batch")
+            return {
+                "documents": [
+                    main.results_record(r, document=name) for name, r, *_ in individual_results
+                ],
+                "corpus": main.results_record(main.micro_average(individual_results)),
+            }
+        name, results, *_ = await self.score(obj)
+        return main.results_record(results, document=name)
+
+    def body_size(self, headers: ty.Dict[str, str]) -> int:
+        """Return the size of the body of a request from its headers, if it is acceptable."""
+        try:
+            size = int(headers.get("content-length", 0))
+        except ValueError:
+            size = -1
+        if size < 0:
+            raise HTTPError(400, f"Invalid Content-Length: {headers['content-length']!r}")
+        if size > self.max_body_size:
+            raise HTTPError(
+                413, f"Request body of {size} bytes, the maximum is {self.max_body_size}"
+            )
+        return size
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve the requests of a connection until it is closed (keep-alive is the default)."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = dict()
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                keep_alive = (
+                    headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                )
+                try:
+                    body = await reader.readexactly(self.body_size(headers))
+                except HTTPError as e:
+                    # The body is not read, so the rest of the connection can't be parsed
+                    await self.send(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                try:
+                    status, payload = 200, await self.respond(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:  # Don't let a bug kill the connection silently
+                    status, payload = 500, {"error": repr(e)}
+                await self.send(writer, status, payload, keep_alive=keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def send(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        payload: ty.Dict[str, ty.Any],
+        keep_alive: bool = True,
+    ):
+        content = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                "Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(content)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                "\r\n"
+            ).encode("latin-1")
+            + content
+        )
+        await writer.drain()
+
+    async def start(
+        self, port: ty.Optional[int] = None, socket_path: ty.Optional[str] = None,
+    ) -> asyncio.AbstractServer:
+        if socket_path is not None:
+            return await asyncio.start_unix_server(self.handle, path=socket_path)
+        return await asyncio.start_server(self.handle, host="127.0.0.1", port=port)
+
+
+async def _serve_forever(server: ScoringServer, port, socket_path):
+    s = await server.start(port=port, socket_path=socket_path)
+    address = socket_path if socket_path is not None else f"http://127.0.0.1:{port}"
+    print(f"Serving {len(server.documents)} gold documents on {address}", file=sys.stderr)
+    try:
+        await s.serve_forever()
+    finally:
+        s.close()
+
+
+def serve(
+    gold_path: ty.Union[str, pathlib.Path],
+    port: ty.Optional[int] = None,
+    socket_path: ty.Optional[str] = None,
+    workers: ty.Optional[int] = None,
+    add_sys_mentions: bool = True,
+    match: str = "exact",
+    max_body_size: int = DEFAULT_MAX_BODY_SIZE,
+):
+    """Run a scoring server until interrupted."""
+    server = ScoringServer(
+        gold_path,
+        workers=workers,
+        add_sys_mentions=add_sys_mentions,
+        match=match,
+        max_body_size=max_body_size,
+    )
+    try:
+        asyncio.run(_serve_forever(server, port, socket_path))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if socket_path is not None:
+            try:
+                pathlib.Path(socket_path).unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,240 @@
+r"""
+Span-aware mention matching.
+
+The mention identifiers produced by [`conll.py`](/scorch/conll.py) encode the position of the
+mentions as `"{block}.{start}-{end}"` token spans (both ends included). By default, scorch only
+compares mention identifiers for equality, which means that a system mention that is off by one
+token is a completely different mention. The functions here allow aligning system mentions to gold
+mentions with more relaxed criteria before scoring, namely
+
+- `exact`: the spans are the same (this is the same as comparing the identifiers)
+- `overlap`: the spans share at least one token
+- `containment`: one of the spans contains the other
+
+The alignment is one-to-one: every gold mention is matched with at most one system mention and
+vice versa. When several alignments are possible, exact matches are preferred, then the pairs with
+the largest overlap, then the pairs whose lengths are the closest. System mentions that are
+aligned to a gold mention are renamed to the identifier of that gold mention, the others are left
+as is.
+
+Spans can also be given as `[block, start, end]` lists in the JSON inputs, in which case they are
+packed in a single integer by `pack_span` when loading. This is much cheaper to hash and compare
+than strings and allows storing mentions in NumPy `int64` arrays. Packed spans are `PackedSpan`s, so
+that they are not mistaken for plain integer mention identifiers, which are opaque like the strings
+that are not spans: bare integers are only interpreted as packed spans when asked to with
+`packed=True`.
+
+The candidate pairs are found with an interval index over the gold spans of every block, so the
+cost of an alignment is `$O(n \log n)$` in the number of mentions (plus the number of candidate
+pairs, which is linear for realistic mention sets), instead of comparing all the pairs of spans.
+"""
+import bisect
+import re
+
+import typing as ty
+
+
+MATCHING_MODES = ("exact", "overlap", "containment")
+
+SPAN_RE = re.compile(r"(\d+)\.(\d+)-(\d+)")
+
+# Bit widths of the fields of packed spans, `block` being the most significant. The total is 63 so
+# that packed spans are non-negative `int64`s.
+BLOCK_BITS = 21
+START_BITS = 21
+END_BITS = 21
+
+
+class Span(ty.NamedTuple):
+    """A span of tokens `start` to `end` (both included) in block `block`."""
+
+    block: int
+    start: int
+    end: int
+
+
+class PackedSpan(int):
+    """
+    A span packed by `pack_span`. This is a plain integer for hashing and comparisons, the type only
+    tells packed spans apart from opaque integer mention identifiers.
+    """
+
+    __slots__ = ()
+
+
+def pack_span(block: int, start: int, end: int) -> PackedSpan:
+    """Pack a span in a single non-negative integer that fits in an `int64`."""
+    if not (
+        0 <= block < 1 << BLOCK_BITS and 0 <= start < 1 << START_BITS and 0 <= end < 1 << END_BITS
+    ):
+        raise ValueError(f"Span ({block}, {start}, {end}) can't be packed")
+    return PackedSpan((block << (START_BITS + END_BITS)) | (start << END_BITS) | end)
+
+
+def unpack_span(packed: int) -> Span:
+    """Unpack a span packed by `pack_span`."""
+    return Span(
+        packed >> (START_BITS + END_BITS),
+        (packed >> END_BITS) & ((1 << START_BITS) - 1),
+        packed & ((1 << END_BITS) - 1),
+    )
+
+
+def parse_span(mention: ty.Hashable, packed: bool = False) -> ty.Optional[Span]:
+    """
+    Return the span encoded in a mention identifier (either a `"block.start-end"` string or a
+    `PackedSpan`) or `None` if it doesn't encode one. If `#packed` is true, all the integer
+    identifiers are taken as packed spans, otherwise they are opaque unless they are `PackedSpan`s.
+    """
+    if isinstance(mention, str):
+        m = SPAN_RE.fullmatch(mention)
+        if m is not None:
+            return Span(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+    elif (
+        isinstance(mention, int)
+        and (packed or isinstance(mention, PackedSpan))
+        and 0 <= mention < 1 << (BLOCK_BITS + START_BITS + END_BITS)
+    ):
+        return unpack_span(mention)
+    return None
+
+
+class SpanIndex:
+    """
+    An index of spans that allows efficient retrieval of the spans that overlap a given span.
+
+    For every block, the spans are sorted by start and indexed by a binary tree whose nodes store
+    the largest end of the spans below them. The spans that overlap `$[s, e]$` are the ones whose
+    start is at most `$e$`, which is a prefix of the sorted spans found by bisection, and whose end
+    is at least `$s$`, so the subtrees whose largest end is smaller than `$s$` are skipped. A
+    query costs `$O((k+1)\log n)$` for `$k$` results, however long the spans of the block are.
+    """
+
+    def __init__(self, spans: ty.Iterable[ty.Tuple[Span, ty.Hashable]]):
+        blocks: ty.Dict[int, ty.List[ty.Tuple[int, int, ty.Hashable]]] = dict()
+        for span, mention in spans:
+            blocks.setdefault(span.block, []).append((span.start, span.end, mention))
+        self._starts: ty.Dict[int, ty.List[int]] = dict()
+        self._spans: ty.Dict[int, ty.List[ty.Tuple[int, int, ty.Hashable]]] = dict()
+        # Implicit complete binary trees of the largest ends: the children of node `$i$` are `$2i$`
+        # and `$2i+1$` and the leaves are at `$n+i$` for the `$i$`-th span, `$n$` being a power of 2
+        self._max_ends: ty.Dict[int, ty.List[int]] = dict()
+        for block, block_spans in blocks.items():
+            block_spans.sort(key=lambda s: (s[0], s[1]))
+            self._spans[block] = block_spans
+            self._starts[block] = [s for s, *_ in block_spans]
+            num_leaves = 1 << (len(block_spans) - 1).bit_length()
+            max_ends = [-1] * (2 * num_leaves)
+            max_ends[num_leaves : num_leaves + len(block_spans)] = [e for _, e, _ in block_spans]
+            for i in range(num_leaves - 1, 0, -1):
+                max_ends[i] = max(max_ends[2 * i], max_ends[2 * i + 1])
+            self._max_ends[block] = max_ends
+
+    def overlapping(self, span: Span) -> ty.Iterable[ty.Tuple[Span, ty.Hashable]]:
+        """Yield the `(span, mention)` pairs of the index that overlap `#span`."""
+        starts = self._starts.get(span.block)
+        if starts is None:
+            return
+        block_spans = self._spans[span.block]
+        max_ends = self._max_ends[span.block]
+        num_leaves = len(max_ends) // 2
+        hi = bisect.bisect_right(starts, span.end)
+        # Depth-first traversal of the subtrees that have leaves in `[0, hi)` and a large enough
+        # end, as `(node, first leaf)` pairs
+        stack = [(1, 0)]
+        while stack:
+            node, first = stack.pop()
+            if first >= hi or max_ends[node] < span.start:
+                continue
+            if node >= num_leaves:
+                start, end, mention = block_spans[first]
+                yield Span(span.block, start, end), mention
+                continue
+            half = num_leaves >> (node.bit_length())
+            stack.append((2 * node + 1, first + half))
+            stack.append((2 * node, first))
+
+
+def _matches(gold: Span, sys: Span, mode: str) -> bool:
+    if mode == "overlap":
+        return True
+    if mode == "containment":
+        return (sys.start <= gold.start and gold.end <= sys.end) or (
+            gold.start <= sys.start and sys.end <= gold.end
+        )
+    return gold == sys
+
+
+def align_mentions(
+    gold_mentions: ty.Iterable[ty.Hashable],
+    sys_mentions: ty.Iterable[ty.Hashable],
+    mode: str = "overlap",
+    packed: bool = False,
+) -> ty.Dict[ty.Hashable, ty.Hashable]:
+    """
+    Return a one-to-one `sys_mention → gold_mention` alignment according to `#mode`.
+
+    Mentions whose identifiers don't encode a span (see `parse_span`, which gets `#packed`) are
+    only aligned if their identifiers are equal.
+    """
+    if mode not in MATCHING_MODES:
+        raise ValueError(f"Unsupported matching mode: {mode!r}")
+    gold_set = set(gold_mentions)
+    alignment: ty.Dict[ty.Hashable, ty.Hashable] = dict()
+    sys_spans = []
+    for m in sys_mentions:
+        if m in gold_set:
+            alignment[m] = m
+        else:
+            span = parse_span(m, packed)
+            if span is not None:
+                sys_spans.append((span, m))
+    if mode == "exact" or not sys_spans:
+        return alignment
+
+    aligned_gold = set(alignment.values())
+    index = SpanIndex(
+        (span, m)
+        for m in gold_set
+        if m not in aligned_gold
+        for span in (parse_span(m, packed),)
+        if span is not None
+    )
+    candidates = []
+    for sys_span, sys_m in sys_spans:
+        sys_length = sys_span.end - sys_span.start
+        for gold_span, gold_m in index.overlapping(sys_span):
+            if not _matches(gold_span, sys_span, mode):
+                continue
+            overlap = min(gold_span.end, sys_span.end) - max(gold_span.start, sys_span.start)
+            length_diff = abs((gold_span.end - gold_span.start) - sys_length)
+            # Sort key: largest overlap first, then closest lengths, then positions for determinism
+            candidates.append((-overlap, length_diff, gold_span, sys_span, gold_m, sys_m))
+    candidates.sort(key=lambda c: c[:4])
+    for *_, gold_m, sys_m in candidates:
+        if sys_m in alignment or gold_m in aligned_gold:
+            continue
+        alignment[sys_m] = gold_m
+        aligned_gold.add(gold_m)
+    return alignment
+
+
+def align_clusters(
+    gold_clusters: ty.Sequence[ty.Set],
+    sys_clusters: ty.Sequence[ty.Set],
+    mode: str = "overlap",
+    packed: bool = False,
+) -> ty.List[ty.Set]:
+    """
+    Return `#sys_clusters` with the system mentions renamed after the gold mentions they are
+    aligned to according to `#mode` (see `align_mentions`).
+    """
+    if mode == "exact":
+        return list(sys_clusters)
+    alignment = align_mentions(
+        (m for c in gold_clusters for m in c),
+        (m for c in sys_clusters for m in c),
+        mode=mode,
+        packed=packed,
+    )
+    return [set(alignment.get(m, m) for m in c) for c in sys_clusters]
@@ -0,0 +1,324 @@
+#! /usr/bin/env python3
+r"""Generate synthetic gold and system coreference corpora for load testing.
+
+Gold entities have Zipfian sizes with a given proportion of singletons, like natural coreference
+annotations. The system entities are derived from them by controlled errors: entities that are
+merged or split, gold mentions that are missed and spurious system mentions. Every mention is a
+non-overlapping token span, so the same corpus can be written as JSON documents, JSONL bundles and
+CoNLL-2012 files, whose scores are the same.
+
+## Usage:
+  scorch-synth [options] <out-dir>
+
+## Arguments:
+  <out-dir>  output directory, where `gold/` and `sys/` (json), `gold.jsonl` and `sys.jsonl`
+             (jsonl) or `gold.conll` and `sys.conll` (conll) are written
+
+## Options:
+  --documents=<n>         Number of documents [default: 1]
+  --mentions=<n>          Number of gold mentions in every document [default: 1000]
+  --zipf=<s>              Exponent of the Zipf distribution of the sizes of the non-singleton
+                          gold entities [default: 2.0]
+  --max-entity-size=<n>   Largest size of a gold entity [default: 1000]
+  --singletons=<ratio>    Proportion of gold mentions that are singletons [default: 0.3]
+  --merge-rate=<p>        Probability for a gold entity to be merged with another one in the
+                          system output [default: 0.05]
+  --split-rate=<p>        Probability for a non-singleton gold entity to be split in two in the
+                          system output [default: 0.05]
+  --miss-rate=<p>         Probability for a gold mention to be missing from the system output
+                          [default: 0.05]
+  --extra-rate=<p>        Number of spurious system mentions, as a proportion of the number of
+                          gold mentions [default: 0.05]
+  --block-mentions=<n>    Number of mentions per block (≈sentence) [default: 8]
+  --format=<formats>      Comma-separated output formats: `json`, `jsonl` or `conll`
+                          [default: json]
+  --ids=<style>           (`json`, `jsonl`) How to write mention identifiers, see `conll --ids`
+                          [default: string]
+  --seed=<n>              Seed of the random generator [default: 0]
+  -h, --help              Show this screen.
+
+## Example:
+  `scorch-synth --documents 100 --mentions 10000 synth/`
+  `scorch-synth --mentions 5000000 --format jsonl,conll huge/`
+"""
+
+__version__ = "scorch-synth 0.0.0"
+
+import bisect
+import contextlib
+import itertools
+import json
+import pathlib
+import random
+import sys
+
+import typing as ty
+
+from scorch import conll
+
+FORMATS = ("json", "jsonl", "conll")
+
+# Every mention takes a slot of this many tokens in its block: up to `SLOT_SIZE-1` tokens for the
+# span and at least one token between two spans, so mentions never overlap
+SLOT_SIZE = 4
+
+
+class SyntheticDocument(ty.NamedTuple):
+    """
+    A synthetic document. Mentions are identified by their position, which determines their span
+    (see `span`), and entities are lists of positions.
+    """
+
+    name: str
+    gold: ty.List[ty.List[int]]
+    sys: ty.List[ty.List[int]]
+    num_positions: int
+
+
+def zipf_sizes(
+    total: int, exponent: float, max_size: int, rng: random.Random
+) -> ty.List[int]:
+    """
+    Draw sizes of at least 2 from a Zipf distribution `$P(k)∝k^{-s}$` truncated at `#max_size`,
+    until they add up to exactly `#total` (which can't be `$1$`): the last size is cut and if that
+    leaves a single mention it goes to another entity.
+    """
+    if total == 1:
+        raise ValueError("Can't split a single mention in entities of size at least 2")
+    max_size = max(2, min(max_size, total))
+    cum_weights = list(itertools.accumulate(k ** -exponent for k in range(2, max_size + 1)))
+    sizes: ty.List[int] = []
+    remaining = total
+    while remaining > 0:
+        size = 2 + bisect.bisect(cum_weights, rng.random() * cum_weights[-1])
+        size = min(size, max_size, remaining)
+        if size == 1:
+            sizes[rng.randrange(len(sizes))] += 1
+        else:
+            sizes.append(size)
+        remaining -= size
+    return sizes
+
+
+def synthesize_document(
+    name: str,
+    num_mentions: int,
+    rng: random.Random,
+    singleton_ratio: float = 0.3,
+    exponent: float = 2.0,
+    max_entity_size: int = 1000,
+    merge_rate: float = 0.05,
+    split_rate: float = 0.05,
+    miss_rate: float = 0.05,
+    extra_rate: float = 0.05,
+) -> SyntheticDocument:
+    r"""
+    Generate a document with `#num_mentions` gold mentions, of which a `#singleton_ratio`
+    proportion are singletons and the others are in entities with sizes drawn by `zipf_sizes`, and
+    derive a system output from it:
+
+    - Every gold entity is merged with another one with probability `#merge_rate`.
+    - Every non-singleton gold entity is split in two with probability `#split_rate`.
+    - Every gold mention is missing with probability `#miss_rate`.
+    - `$\text{extra_rate}×\text{num_mentions}$` spurious mentions are added, either as singletons
+      (in the same proportion as in the gold) or to a random system entity.
+
+    The positions of the gold and spurious mentions are shuffled, so that entities are spread
+    through the document.
+    """
+    num_singletons = round(num_mentions * singleton_ratio)
+    if num_mentions - num_singletons == 1:
+        num_singletons += 1
+    num_extra = round(num_mentions * extra_rate)
+    positions = list(range(num_mentions + num_extra))
+    rng.shuffle(positions)
+
+    gold = [[p] for p in positions[:num_singletons]]
+    start = num_singletons
+    for size in zipf_sizes(num_mentions - num_singletons, exponent, max_entity_size, rng):
+        gold.append(positions[start : start + size])
+        start += size
+
+    response: ty.List[ty.List[int]] = []
+    for entity in gold:
+        kept = [p for p in entity if rng.random() >= miss_rate]
+        if len(kept) > 1 and rng.random() < split_rate:
+            cut = rng.randrange(1, len(kept))
+            response.extend((kept[:cut], kept[cut:]))
+        elif kept:
+            response.append(kept)
+    rng.shuffle(response)
+    merged: ty.List[ty.List[int]] = []
+    entities = iter(response)
+    for entity in entities:
+        if rng.random() < merge_rate:
+            entity = entity + next(entities, [])
+        merged.append(entity)
+    for p in positions[num_mentions:]:
+        if not merged or rng.random() < singleton_ratio:
+            merged.append([p])
+        else:
+            merged[rng.randrange(len(merged))].append(p)
+
+    return SyntheticDocument(
+        name=name, gold=gold, sys=merged, num_positions=num_mentions + num_extra
+    )
+
+
+def span(position: int, block_mentions: int = 8) -> ty.Tuple[int, int, int]:
+    """Return the `(block, start, end)` token span of the mention at `#position`."""
+    block, slot = divmod(position, block_mentions)
+    start = SLOT_SIZE * slot
+    return block, start, start + position % (SLOT_SIZE - 1)
+
+
+def document_to_json(
+    document: SyntheticDocument,
+    side: str = "gold",
+    ids: str = "string",
+    block_mentions: int = 8,
+) -> ty.Dict[str, ty.Any]:
+    """Return the scorch JSON representation of the `#side` (`gold` or `sys`) of a document."""
+    obj: ty.Dict[str, ty.Any] = {"name": document.name, "type": "clusters"}
+    if ids == "packed":
+        obj["ids"] = ids
+    obj["clusters"] = {
+        str(i): [conll.mention_id(*span(p, block_mentions), ids=ids) for p in entity]
+        for i, entity in enumerate(getattr(document, side))
+    }
+    return obj
+
+
+def document_to_conll(
+    document: SyntheticDocument, side: str = "gold", block_mentions: int = 8,
+) -> ty.Iterable[str]:
+    """
+    Return the lines of the CoNLL-2012 representation of the `#side` (`gold` or `sys`) of a
+    document, with the coreference annotations in the last column and dummy words.
+    """
+    entity_of = [-1] * document.num_positions
+    for i, entity in enumerate(getattr(document, side)):
+        for p in entity:
+            entity_of[p] = i
+    num_blocks = -(-document.num_positions // block_mentions)
+    yield f"#begin document ({document.name});\n"
+    for block in range(num_blocks):
+        if block:
+            yield "\n"
+        annotations: ty.Dict[int, ty.List[str]] = dict()
+        first = block * block_mentions
+        for p in range(first, min(first + block_mentions, document.num_positions)):
+            e = entity_of[p]
+            if e < 0:
+                continue
+            _, start, end = span(p, block_mentions)
+            if start == end:
+                annotations.setdefault(start, []).append(f"({e})")
+            else:
+                annotations.setdefault(start, []).append(f"({e}")
+                annotations.setdefault(end, []).append(f"{e})")
+        for token in range(SLOT_SIZE * block_mentions):
+            coref = "|".join(annotations.get(token, ())) or "-"
+            yield f"{document.name}\t0\t{token}\t_\t{coref}\n"
+    yield "#end document\n"
+
+
+def generate(
+    out_dir: ty.Union[str, pathlib.Path],
+    num_documents: int = 1,
+    num_mentions: int = 1000,
+    formats: ty.Sequence[str] = ("json",),
+    ids: str = "string",
+    block_mentions: int = 8,
+    seed: int = 0,
+    **kwargs,
+) -> int:
+    """
+    Generate a corpus of `#num_documents` documents with `synthesize_document` (which gets the
+    other keyword arguments) and write it in `#out_dir` in all the `#formats`. Return the total
+    number of gold mentions.
+
+    Documents are written as soon as they are generated, so the memory use only depends on the size
+    of the largest document.
+    """
+    out_dir = pathlib.Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    width = len(str(num_documents - 1))
+    sides = ("gold", "sys")
+    if "json" in formats:
+        for side in sides:
+            (out_dir / side).mkdir(exist_ok=True)
+    with contextlib.ExitStack() as stack:
+        bundles = {
+            side: stack.enter_context((out_dir / f"{side}.jsonl").open("w"))
+            for side in sides
+            if "jsonl" in formats
+        }
+        conll_files = {
+            side: stack.enter_context((out_dir / f"{side}.conll").open("w"))
+            for side in sides
+            if "conll" in formats
+        }
+        for i in range(num_documents):
+            document = synthesize_document(f"doc{i:0{width}d}", num_mentions, rng, **kwargs)
+            for side in sides:
+                if "json" in formats or "jsonl" in formats:
+                    obj = document_to_json(
+                        document, side=side, ids=ids, block_mentions=block_mentions
+                    )
+                    if "json" in formats:
+                        with (out_dir / side / f"{document.name}.json").open("w") as out_stream:
+                            json.dump(obj, out_stream)
+                    if "jsonl" in formats:
+                        json.dump(obj, bundles[side])
+                        bundles[side].write("\n")
+                if "conll" in formats:
+                    conll_files[side].writelines(
+                        document_to_conll(document, side=side, block_mentions=block_mentions)
+                    )
+    return num_documents * num_mentions
+
+
+def main_entry_point(argv=None):
+    # Imported here so that importing this module stays cheap
+    from docopt import docopt
+
+    arguments = docopt(__doc__, version=__version__, argv=argv)
+    formats = arguments["--format"].split(",")
+    unsupported = [f for f in formats if f not in FORMATS]
+    if unsupported:
+        print(
+            f"Unsupported output format {unsupported[0]!r}, use one of {', '.join(FORMATS)}",
+            file=sys.stderr,
+        )
+        return 1
+    if arguments["--ids"] not in conll.ID_STYLES:
+        print(
+            f"Unsupported identifiers style {arguments['--ids']!r}, use one of"
+            f" {', '.join(conll.ID_STYLES)}",
+            file=sys.stderr,
+        )
+        return 1
+    num_mentions = generate(
+        arguments["<out-dir>"],
+        num_documents=int(arguments["--documents"]),
+        num_mentions=int(arguments["--mentions"]),
+        formats=formats,
+        ids=arguments["--ids"],
+        block_mentions=int(arguments["--block-mentions"]),
+        seed=int(arguments["--seed"]),
+        singleton_ratio=float(arguments["--singletons"]),
+        exponent=float(arguments["--zipf"]),
+        max_entity_size=int(arguments["--max-entity-size"]),
+        merge_rate=float(arguments["--merge-rate"]),
+        split_rate=float(arguments["--split-rate"]),
+        miss_rate=float(arguments["--miss-rate"]),
+        extra_rate=float(arguments["--extra-rate"]),
+    )
+    print(f"Generated {num_mentions} gold mentions in {arguments['<out-dir>']}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_entry_point())
@@ -1,7 +1,10 @@
 import pathlib
+import subprocess
+import sys
 import timeit
 import typing as ty
 
+from scorch import dispatch
 from scorch import scores
 from scorch import main as scorch
 
@@ -55,9 +58,35 @@ def test_blanc_speedup(clusters: Clustering, num_runs: int = 100, repeat: int =
     print(f"Speedup: ×{slow_runtime/fast_runtime}")
 
 
+def test_autotune(max_mentions: int = 8192):
+    print(f"Testing the dense/sparse crossovers: up to {max_mentions} mentions")
+    print(f"Found {dispatch.autotune(max_mentions=max_mentions, log=sys.stdout)}")
+
+
+def test_import_time(repeat: int = 5):
+    print(f"Testing startup time: best of {repeat}")
+    for module in ("scorch.main", "scorch.scores"):
+        runtimes = []
+        for _ in range(repeat):
+            # `-X importtime` reports cumulative import times in µs on stderr, the last line being
+            # the module we asked for
+            output = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stderr
+            runtimes.append(int(output.splitlines()[-1].split("|")[1]) / 1e6)
+        print(f"{module}\t{min(runtimes)} s")
+
+
 with open(tests_dir / "fixtures" / "clusters.json") as in_stream:
     clusters = scorch.clusters_from_json(in_stream)
 
 test_metrics(clusters)
 
 test_blanc_speedup(clusters)
+
+test_autotune()
+
+test_import_time()
@@ -0,0 +1,88 @@
+'''Unit tests for `approx.py`.'''
+import pathlib
+import random
+
+import hypothesis
+import pytest
+
+# `scores` imports scipy lazily, importing it here keeps that out of the hypothesis deadlines
+import scipy.optimize  # noqa: F401
+
+from scorch import approx, main  # noqa
+from tests.utils import clusterings
+
+
+def within(value, bounds):
+    return bounds[0] - 1e-9 <= value <= bounds[1] + 1e-9
+
+
+@hypothesis.settings(deadline=None)
+@hypothesis.given(key=clusterings(max_size=48), response=clusterings(max_size=48))
+def test_exact_when_enumerated(key, response):
+    '''With a budget larger than the populations, the sampled scores are exact.'''
+    estimates = approx.approximate_scores(key, response, samples=2000)
+    exact = main.score_clusters(key, response)
+    assert list(estimates) == list(main.METRICS)
+    for name, e in estimates.items():
+        if name.startswith('CEAF'):
+            assert all(within(x, b) for x, b in zip(exact[name], e[3:]))
+        else:
+            assert e[:3] == pytest.approx(exact[name])
+
+
+@hypothesis.settings(deadline=None)
+@hypothesis.given(key=clusterings(max_size=32), response=clusterings(max_size=48))
+def test_implicit_singletons(key, response):
+    '''Implicit key singletons give the same scores as explicit ones.'''
+    estimates = approx.approximate_scores(key, response, samples=2000, implicit_singletons=True)
+    exact = main.score_clusters(
+        main.add_extra_mentions([set(k) for k in key], response), response
+    )
+    for name, e in estimates.items():
+        # The greedy CEAF alignments may break ties differently, only the bounds are comparable
+        if name.startswith('CEAF'):
+            assert all(within(x, b) for x, b in zip(exact[name], e[3:])), name
+        else:
+            assert e[:3] == pytest.approx(exact[name]), name
+
+
+def test_sampled_implicit_singletons():
+    rng = random.Random(0)
+    key = [set() for _ in range(40)]
+    response = [set() for _ in range(60)]
+    for m in range(1000):
+        if rng.random() < 0.8:
+            key[rng.randrange(len(key))].add(m)
+        response[rng.randrange(len(response))].add(m)
+    key, response = [k for k in key if k], [r for r in response if r]
+    estimates = approx.approximate_scores(
+        key, response, samples=500, confidence=0.99, implicit_singletons=True
+    )
+    exact = main.score_clusters(key, response, implicit_singletons=True)
+    for name, e in estimates.items():
+        assert all(within(x, b) for x, b in zip(exact[name], e[3:])), name
+
+
+def test_sampled_bounds():
+    rng = random.Random(0)
+    key = [set() for _ in range(40)]
+    response = [set() for _ in range(60)]
+    for m in range(1000):
+        key[rng.randrange(len(key))].add(m)
+        if rng.random() < 0.9:
+            response[rng.randrange(len(response))].add(m)
+    key, response = [k for k in key if k], [r for r in response if r]
+    estimates = approx.approximate_scores(key, response, samples=500, confidence=0.99)
+    exact = main.score_clusters(key, response)
+    for name, e in estimates.items():
+        assert e.R_bounds[0] <= e.R <= e.R_bounds[1]
+        assert all(within(x, b) for x, b in zip(exact[name], e[3:])), name
+    assert estimates['B³'].R_bounds[0] < estimates['B³'].R_bounds[1]
+
+
+def test_process_files_approximate():
+    fixtures = pathlib.Path(__file__).parent / 'fixtures' / 'json' / 'single'
+    with (fixtures / 'gold.json').open() as gold_file, (fixtures / 'sys.json').open() as sys_file:
+        lines = list(main.process_files(gold_file, sys_file, approximate=True))
+    assert lines[0].startswith('MUC:\tR=')
+    assert lines[-1].startswith('CoNLL-2012 average score:')
@@ -1,9 +1,13 @@
 '''Unit tests for `conll.py`.'''
+import json
+import pathlib
+import re
+
 from collections import OrderedDict
 
 import pytest
 
-from scorch import conll  # noqa
+from scorch import conll, main, spans  # noqa
 
 
 @pytest.fixture()
@@ -118,6 +122,15 @@ def test_parse_document(document):
     assert entities == expected_entities
 
 
+def test_parse_document_columns(document):
+    # Add a system column whose only entity is the first mention of the first gold entity
+    sys_column = {0: '(0', 1: '0)'}
+    lines = [f'{l}\t{sys_column.get(i, "-")}' if l else l for i, l in enumerate(document)]
+    gold, sys = conll.parse_document_columns(lines, (-2, -1))
+    assert gold == conll.parse_document(document) == conll.parse_document(lines, column=-2)
+    assert sys == {'0': [(0, '0', '1')]}
+
+
 def test_parse_file(conll_file):
     expected_documents = [
         (
@@ -143,3 +156,75 @@ def test_parse_file(conll_file):
     ]
     documents = conll.parse_file(conll_file)
     assert list(documents) == expected_documents
+
+
+def test_convert_files(tmp_path):
+    datafiles = pathlib.Path(__file__).parent / 'fixtures' / 'conll' / 'datafiles'
+    conll_files = [datafiles / f'TC-{c}.key' for c in 'ABC']
+    conll.convert_files(conll_files, bundle_file=tmp_path / 'seq.jsonl')
+    conll.convert_files(conll_files, bundle_file=tmp_path / 'par.jsonl', jobs=2)
+    bundle = (tmp_path / 'seq.jsonl').read_text()
+    assert bundle == (tmp_path / 'par.jsonl').read_text()
+    documents = [json.loads(l) for l in bundle.splitlines()]
+    assert len(documents) == 3
+
+    # Copied since converting a single file in parallel writes its index next to it
+    single_file = tmp_path / 'TC-A.key'
+    single_file.write_bytes(conll_files[0].read_bytes())
+    (tmp_path / 'out').mkdir()
+    conll.convert_files([single_file], out_dir=tmp_path / 'out', jobs=2)
+    (out_file,) = (tmp_path / 'out').iterdir()
+    assert json.loads(out_file.read_text()) == documents[0]
+
+
+def test_convert_files_ids(tmp_path):
+    datafiles = pathlib.Path(__file__).parent / 'fixtures' / 'conll' / 'datafiles'
+    conll_files = [datafiles / 'TC-A.key']
+    for ids in conll.ID_STYLES:
+        conll.convert_files(conll_files, bundle_file=tmp_path / f'{ids}.jsonl', ids=ids)
+    string, lst, packed = (
+        json.loads((tmp_path / f'{ids}.jsonl').read_text()) for ids in conll.ID_STYLES
+    )
+    for c in string['clusters']:
+        assert [main.mention_id(m) for m in lst['clusters'][c]] == packed['clusters'][c]
+        assert [spans.parse_span(m) for m in string['clusters'][c]] == [
+            spans.unpack_span(m) for m in packed['clusters'][c]
+        ]
+    assert packed['ids'] == 'packed' and 'ids' not in string and 'ids' not in lst
+    assert sorted(spans.parse_span(m) for c in main.clusters_from_obj(packed) for m in c) == sorted(
+        spans.parse_span(m) for c in string['clusters'].values() for m in c
+    )
+
+
+@pytest.fixture()
+def conll_corpus(tmp_path):
+    datafiles = pathlib.Path(__file__).parent / 'fixtures' / 'conll' / 'datafiles'
+    corpus = tmp_path / 'corpus.conll'
+    corpus.write_text(
+        ''.join(
+            re.sub(r'\(.*\);.*', f'(doc{c});', (datafiles / f'TC-{c}.key').read_text(), count=1)
+            for c in 'ABC'
+        )
+    )
+    return corpus
+
+
+def test_index(conll_corpus):
+    index = conll.load_index(conll_corpus)
+    assert list(index) == ['docA', 'docB', 'docC']
+    assert conll.index_path(conll_corpus).exists()
+    assert conll.load_index(conll_corpus) == index
+    with conll_corpus.open() as in_stream:
+        documents = dict(conll.parse_file(l.strip() for l in in_stream))
+    for name in index:
+        assert conll.read_document(conll_corpus, name) == documents[name]
+    with pytest.raises(KeyError):
+        conll.read_document(conll_corpus, 'docD')
+    ranges = conll.split_index(index, 2)
+    assert [d for r in ranges for d, _ in conll.read_range(conll_corpus, *r)] == list(index)
+
+
+def test_convert_ranges(conll_corpus, tmp_path):
+    conll.convert_files([conll_corpus], bundle_file=tmp_path / 'seq.jsonl')
+    conll.convert_files([conll_corpus], bundle_file=tmp_path / 'par.jsonl', jobs=3)
+    assert (tmp_path / 'seq.jsonl').read_text() == (tmp_path / 'par.jsonl').read_text()
@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from scorch import dispatch
+from scorch import scores
+
+
+def test_parse_size():
+    assert dispatch.parse_size("1024") == 1024
+    assert dispatch.parse_size("512K") == 512 * 1024
+    assert dispatch.parse_size("1.5G") == 3 * 2 ** 29
+    assert dispatch.parse_size("2GiB") == dispatch.parse_size("2gb") == 2 ** 31
+    for spec in ("lots", "inf", "-infG", "nan", "1e400", "1e308T"):
+        with pytest.raises(ValueError, match="Invalid size"):
+            dispatch.parse_size(spec)
+
+
+def test_metric_options():
+    key = [{1, 2, 3}, {4, 5}]
+    response = [{1, 2}, {3, 4, 5}]
+    thresholds = {"BLANC": 5, "CEAF": 4}
+    options = dispatch.metric_options(key, response, thresholds=thresholds)
+    assert options == {
+        "CEAF_m": {"sparse": False},
+        "CEAF_e": {"sparse": False},
+        "BLANC": {"sparse": False},
+    }
+    # Dense BLANC needs 4×5² bytes and dense CEAF 16×2×2 bytes
+    options = dispatch.metric_options(key, response, max_memory=80, thresholds=thresholds)
+    assert options["BLANC"] == {"sparse": True} and options["CEAF_e"] == {"sparse": False}
+    options = dispatch.metric_options(key, response, thresholds={"BLANC": 4, "CEAF": 3})
+    assert all(o == {"sparse": True} for o in options.values())
+    # With implicit singletons, the dense CEAF has a row for the extra mentions of `{6, 7}`
+    response = [{1, 2}, {3, 4, 5}, {6, 7}]
+    options = dispatch.metric_options(key, response, thresholds={"BLANC": 7, "CEAF": 6})
+    assert options["CEAF_e"] == {"sparse": False} and options["BLANC"] == {"sparse": False}
+    options = dispatch.metric_options(
+        key, response, thresholds={"BLANC": 7, "CEAF": 6}, implicit_singletons=True
+    )
+    assert options["CEAF_e"] == {"sparse": True} and options["BLANC"] == {"sparse": False}
+
+
+def test_thresholds(tmp_path):
+    config_path = tmp_path / "autotune.json"
+    assert dispatch.load_thresholds(config_path) == dispatch.DEFAULT_THRESHOLDS
+    dispatch.save_thresholds({"BLANC": 0, "CEAF": 100}, config_path)
+    assert dispatch.load_thresholds(config_path) == {"BLANC": 0, "CEAF": 100}
+
+
+def test_autotune(monkeypatch):
+    # Simulated timings where the dense BLANC is faster up to 128 mentions and the dense CEAF up to
+    # 64 mentions, the real ones are benchmarked in `speedtest.py`
+    timings = []
+
+    def fake_metric(crossover):
+        def metric(key, response, sparse=False):
+            num_mentions = len(set().union(*key))
+            timings.append(1.0 if sparse else float(num_mentions > crossover) * 2)
+
+        return metric
+
+    def fake_time(fun):
+        fun()
+        return timings.pop()
+
+    monkeypatch.setattr(scores, "blanc", fake_metric(128))
+    monkeypatch.setattr(scores, "ceaf_e", fake_metric(64))
+    monkeypatch.setattr(dispatch, "_time", fake_time)
+    found = dispatch.autotune()
+
+    # The CEAF threshold is the largest similarity matrix of the documents where dense won
+    rng = random.Random(0)
+    sizes = []
+    for num_mentions in (32, 64):
+        key, response = dispatch._benchmark_clusterings(num_mentions, rng)
+        sizes.append(len(key) * len(response))
+    assert found == {"BLANC": 128, "CEAF": max(sizes)}
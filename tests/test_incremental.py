@@ -0,0 +1,200 @@
+'''Unit tests for `incremental.py`.'''
+import hypothesis
+import pytest
+from hypothesis import strategies as st
+
+# `incremental` imports scipy lazily, importing it here keeps that out of the hypothesis deadlines
+import scipy.optimize  # noqa: F401
+
+from scorch import incremental, main, scores  # noqa
+from tests.utils import clusterings
+
+
+def expected_scores(key, response):
+    return {
+        'MUC': scores.muc(key, response),
+        'B³': scores.b_cubed(key, response),
+        'CEAF_m': scores.ceaf_m(key, response),
+        'CEAF_e': scores.ceaf_e(key, response),
+        'BLANC': scores.blanc(key, response),
+        'LEA': scores.lea(key, response),
+    }
+
+
+def assert_scores_equal(actual, expected):
+    assert actual.keys() == expected.keys()
+    for metric, values in expected.items():
+        assert actual[metric] == pytest.approx(values), metric
+
+
+def test_merge_split():
+    key = [{'a', 'b', 'c'}, {'d', 'e', 'f', 'g'}]
+    response = [{'a', 'b'}, {'c', 'd'}, {'f', 'g', 'h', 'i'}]
+    scorer = incremental.IncrementalScorer(key, response)
+    assert_scores_equal(scorer.scores(), expected_scores(key, response))
+    merged = scorer.merge(1, 2)
+    assert_scores_equal(merged, expected_scores(key, [{'a', 'b'}, {'c', 'd', 'f', 'g', 'h', 'i'}]))
+    new_id, split = scorer.split(1, {'c'})
+    assert scorer.clusters[new_id] == {'c'}
+    assert_scores_equal(split, expected_scores(key, [{'a', 'b'}, {'c'}, {'d', 'f', 'g', 'h', 'i'}]))
+    with pytest.raises(ValueError):
+        scorer.merge(0, 0)
+    with pytest.raises(ValueError):
+        scorer.split(0, {'a', 'b'})
+
+
+@hypothesis.settings(deadline=None)
+@hypothesis.given(
+    key=clusterings(max_size=32),
+    response=clusterings(max_size=40),
+    edits=st.lists(st.tuples(st.booleans(), st.integers(0, 2 ** 16), st.integers(0, 2 ** 16))),
+)
+def test_consistency(key, response, edits):
+    scorer = incremental.IncrementalScorer(key, response)
+    for is_merge, x, y in edits:
+        ids = sorted(scorer.clusters)
+        if is_merge:
+            if len(ids) < 2:
+                continue
+            a = ids[x % len(ids)]
+            b = ids[(x + 1 + y % (len(ids) - 1)) % len(ids)]
+            actual = scorer.merge(a, b)
+        else:
+            a = ids[x % len(ids)]
+            cluster = sorted(scorer.clusters[a])
+            if len(cluster) < 2:
+                continue
+            part = cluster[: 1 + y % (len(cluster) - 1)]
+            _, actual = scorer.split(a, part)
+        assert_scores_equal(actual, expected_scores(key, list(scorer.clusters.values())))
+
+
+@hypothesis.settings(deadline=None)
+@hypothesis.given(
+    key=clusterings(max_size=24),
+    links=st.lists(
+        st.tuples(st.integers(0, 31), st.integers(0, 31), st.sampled_from([0.1, 0.5, 0.9]))
+    ),
+)
+def test_threshold_sweep(key, links):
+    mentions = range(16)
+    curve = list(incremental.threshold_sweep(key, mentions, links))
+    assert [t for t, _ in curve] == sorted(set(s for *_, s in links), reverse=True)
+    for threshold, actual in curve:
+        kept = [(s, t) for s, t, score in links if score >= threshold]
+        nodes = set(mentions).union(*((s, t) for s, t, _ in links))
+        response = main.clusters_from_graph(nodes, kept)
+        assert_scores_equal(actual, expected_scores(key, response))
+
+
+def test_add_mention():
+    scorer = incremental.IncrementalScorer([{'a', 'b'}], [{'a'}, {'c'}])
+    actual = scorer.add_mention('d', 1, 0)
+    assert_scores_equal(actual, expected_scores([{'a', 'b'}, {'d'}], [{'a', 'd'}, {'c'}]))
+    actual = scorer.add_mention('e', None, 5)
+    assert_scores_equal(actual, expected_scores([{'a', 'b'}, {'d'}], [{'a', 'd'}, {'c'}, {'e'}]))
+    new_id, _ = scorer.split(0, {'d'})
+    assert new_id == 6
+    with pytest.raises(ValueError):
+        scorer.add_mention('a', 0, None)
+    with pytest.raises(ValueError):
+        scorer.add_mention('f', 3, None)
+    with pytest.raises(ValueError):
+        scorer.add_mention('f')
+
+
+@hypothesis.settings(deadline=None)
+@hypothesis.given(
+    key=clusterings(max_size=32),
+    response=clusterings(max_size=40),
+    every=st.integers(1, 3),
+)
+def test_prefix_curve(key, response, every):
+    # Spread the mentions over a few blocks
+    def rename(clusters):
+        return [{f'{m % 7}.{m}-{m}' for m in c} for c in clusters]
+
+    key, response = rename(key), rename(response)
+    curve = list(incremental.prefix_curve(key, response, every=every))
+    blocks = sorted({int(m.split('.')[0]) for c in (*key, *response) for m in c})
+    if not blocks:
+        assert curve == []
+        return
+    expected_blocks = [
+        b for b in range(blocks[0], blocks[-1]) if b % every == every - 1
+    ] + [blocks[-1]]
+    assert [b for b, _ in curve] == expected_blocks
+    for block, actual in curve:
+        def prefix(clusters):
+            restricted = ({m for m in c if int(m.split('.')[0]) <= block} for c in clusters)
+            return [c for c in restricted if c]
+
+        assert_scores_equal(actual, expected_scores(prefix(key), prefix(response)))
+
+
+def with_extra_mentions(key, response):
+    return main.add_extra_mentions([set(k) for k in key], response)
+
+
+@hypothesis.settings(deadline=None)
+@hypothesis.given(
+    key=clusterings(max_size=24),
+    response=clusterings(max_size=32),
+    edits=st.lists(
+        st.tuples(st.integers(0, 2), st.integers(0, 2 ** 16), st.integers(0, 2 ** 16)),
+        max_size=16,
+    ),
+)
+def test_implicit_singletons(key, response, edits):
+    '''Implicit key singletons give the same scores as explicit ones through all the edits.'''
+    scorer = incremental.IncrementalScorer(key, response, implicit_singletons=True)
+    assert_scores_equal(
+        scorer.scores(), expected_scores(with_extra_mentions(key, response), response)
+    )
+    new_mentions = iter(range(100, 200))
+    for edit, x, y in edits:
+        ids = sorted(scorer.clusters)
+        if edit == 0:
+            if len(ids) < 2:
+                continue
+            a = ids[x % len(ids)]
+            b = ids[(x + 1 + y % (len(ids) - 1)) % len(ids)]
+            actual = scorer.merge(a, b)
+        elif edit == 1:
+            a = ids[x % len(ids)]
+            cluster = sorted(scorer.clusters[a])
+            if len(cluster) < 2:
+                continue
+            _, actual = scorer.split(a, cluster[: 1 + y % (len(cluster) - 1)])
+        else:
+            actual = scorer.add_mention(next(new_mentions), None, ids[x % len(ids)] + y % 2)
+        response = list(scorer.clusters.values())
+        assert_scores_equal(actual, expected_scores(with_extra_mentions(key, response), response))
+
+
+@hypothesis.settings(deadline=None)
+@hypothesis.given(
+    key=clusterings(max_size=16),
+    links=st.lists(
+        st.tuples(st.integers(0, 31), st.integers(0, 31), st.sampled_from([0.1, 0.5, 0.9])),
+        max_size=16,
+    ),
+)
+def test_threshold_sweep_implicit_singletons(key, links):
+    mentions = range(8)
+    nodes = set(mentions).union(*((s, t) for s, t, _ in links))
+    explicit = incremental.threshold_sweep(with_extra_mentions(key, [nodes]), mentions, links)
+    implicit = incremental.threshold_sweep(key, mentions, links, implicit_singletons=True)
+    for (threshold, expected), (implicit_threshold, actual) in zip(explicit, implicit):
+        assert threshold == implicit_threshold
+        assert_scores_equal(actual, expected)
+
+
+def test_prefix_curve_implicit_singletons():
+    key = [{'0.0-0', '1.0-0'}, {'2.0-0'}]
+    response = [{'0.0-0', '0.1-1'}, {'1.2-2', '2.0-0', '3.0-0'}]
+    explicit = list(incremental.prefix_curve(with_extra_mentions(key, response), response))
+    implicit = list(incremental.prefix_curve(key, response, implicit_singletons=True))
+    assert [b for b, _ in implicit] == [b for b, _ in explicit] == [0, 1, 2, 3]
+    for (_, actual), (_, expected) in zip(implicit, explicit):
+        assert_scores_equal(actual, expected)
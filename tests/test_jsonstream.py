@@ -0,0 +1,84 @@
+'''Unit tests for `jsonstream.py`.'''
+import io
+import json
+
+import hypothesis
+import pytest
+from hypothesis import strategies as st
+
+from scorch import jsonstream  # noqa
+
+json_values = st.recursive(
+    st.none() | st.booleans() | st.integers() | st.floats(allow_nan=False) | st.text(),
+    lambda children: st.lists(children, max_size=4)
+    | st.dictionaries(st.text(max_size=4), children, max_size=4),
+    max_leaves=8,
+)
+
+
+@hypothesis.given(
+    obj=st.dictionaries(st.sampled_from(["a", "b", "links", "ünï"]), json_values),
+    indent=st.sampled_from([None, 0, 2]),
+    chunk_size=st.integers(1, 16),
+)
+def test_iter_members(obj, indent, chunk_size):
+    '''Members must be the same as with `json.load`, whatever the chunk boundaries.'''
+    text = json.dumps(obj, indent=indent, ensure_ascii=False)
+    members = list(
+        jsonstream.iter_members(io.StringIO(text), arrays=("links",), chunk_size=chunk_size)
+    )
+    expected = []
+    for key, value in obj.items():
+        if key == "links" and isinstance(value, list):
+            expected.extend((key, v) for v in value)
+        else:
+            expected.append((key, value))
+    assert members == expected
+
+
+def test_iter_members_lazy():
+    '''Elements must be yielded before the whole input has been read.'''
+    text = '{"links": [[1, 2], [3, 4]' + ', [5, 6]' * 1000 + ']}'
+    in_stream = io.StringIO(text)
+    members = jsonstream.iter_members(in_stream, arrays=("links",), chunk_size=16)
+    assert next(members) == ("links", [1, 2])
+    assert in_stream.tell() < len(text) / 2
+
+
+@hypothesis.given(
+    obj=st.dictionaries(st.sampled_from(["a", "b", "links", "ünï"]), json_values),
+    chunk_size=st.integers(1, 16),
+)
+def test_iter_members_load_rest(obj, chunk_size):
+    '''After `load_rest` returns true, the remaining members are yielded whole.'''
+    text = json.dumps(obj, ensure_ascii=False)
+    members = list(
+        jsonstream.iter_members(
+            io.StringIO(text),
+            arrays=("links",),
+            chunk_size=chunk_size,
+            load_rest=lambda key, value: key == "a",
+        )
+    )
+    expected = []
+    keys = list(obj)
+    for i, (key, value) in enumerate(obj.items()):
+        if key == "links" and isinstance(value, list) and "a" not in keys[:i]:
+            expected.extend((key, v) for v in value)
+        else:
+            expected.append((key, value))
+    assert members == expected
+
+
+@pytest.mark.parametrize(
+    "text", ['', '[]', '{"a": 1', '{"a" 1}', '{"a": [1, 2}', '{1: 2}', '{"a": 1},', '{} 1'],
+)
+def test_iter_members_invalid(text):
+    with pytest.raises(ValueError):
+        list(jsonstream.iter_members(io.StringIO(text), arrays=("a",), chunk_size=2))
+    with pytest.raises(ValueError):
+        list(
+            jsonstream.iter_members(
+                io.StringIO(text), chunk_size=2, load_rest=lambda key, value: True
+            )
+        )
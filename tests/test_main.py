@@ -1,10 +1,16 @@
 '''Unit tests for `scorch.py`.'''
+import csv
+import io
+import json
 import pathlib
+import re
+import subprocess
+import sys
 import unittest
 
 import pytest
 
-from scorch import main  # noqa
+from scorch import conll, main  # noqa
 
 
 @pytest.fixture()
@@ -71,6 +77,32 @@ def test_greedy_clustering(links):
     case.assertCountEqual(clusters, expected_clusters)
 
 
+def test_clusters_from_json(gold_file, sys_file):
+    case = unittest.TestCase()
+    for in_stream in (gold_file, sys_file):
+        expected = main.clusters_from_obj(json.load(in_stream))
+        clusters = [sorted(c) for c in expected]
+        graph = {
+            "type": "graph",
+            "mentions": [m for c in clusters for m in c],
+            "links": [[s, t, 0.5] for c in clusters for s, t in zip(c, c[1:])],
+        }
+        # The links can come before the mentions
+        for doc in (
+            graph,
+            {k: graph[k] for k in sorted(graph)},
+            {"type": "clusters", "clusters": {str(i): c for i, c in enumerate(clusters)}},
+            # Non-graph documents are not streamed once their type is known
+            {
+                "type": "clusters",
+                "links": [[1]],
+                "clusters": {str(i): c for i, c in enumerate(clusters)},
+            },
+            {"clusters": {str(i): c for i, c in enumerate(clusters)}, "type": "clusters"},
+        ):
+            case.assertCountEqual(main.clusters_from_json(io.StringIO(json.dumps(doc))), expected)
+
+
 def test_process_files(gold_file, sys_file, out_file):
     expected_output = out_file
     output = ''.join(main.process_files(gold_file, sys_file))
@@ -81,3 +113,396 @@ def test_process_files(gold_file, sys_file, out_file):
 #     expected_output = out_file_multiple
 #     output = ''.join(main.process_dirs(gold_dir, sys_dir))
 #     assert output == expected_output
+
+
+def test_score_files(gold_file, sys_file, out_file):
+    results = main.score_files(gold_file, sys_file)
+    assert results.name is None
+    assert list(results.results) == list(main.METRICS)
+    R, P, F = results.results['MUC']
+    assert results.results['MUC'].F == F
+    assert f'MUC:\tR={R}\tP={P}\tF₁={F}' in out_file
+    assert results.conll2012 == main.conll_average(results.results)
+    assert results.gold_size > 0 and results.sys_size > 0
+
+
+def test_score_files_max_memory(gold_file, sys_file):
+    expected = main.score_files(gold_file, sys_file).results
+    gold_file.seek(0)
+    sys_file.seek(0)
+    results = main.score_files(gold_file, sys_file, max_memory=0).results
+    for name, scores in expected.items():
+        assert results[name] == pytest.approx(scores)
+
+
+def test_score_files_jobs(gold_file, sys_file):
+    expected = main.score_files(gold_file, sys_file).results
+    gold_file.seek(0)
+    sys_file.seek(0)
+    results = main.score_files(gold_file, sys_file, max_memory=0, jobs=2).results
+    assert list(results) == list(expected)
+    for name, scores in expected.items():
+        assert results[name] == pytest.approx(scores)
+
+
+def test_score_document_clusters():
+    gold = [{'a', 'b'}, {'c'}]
+    sys = [{'a', 'b', 'x'}, {'c', 'y'}, {'z'}]
+    results = main.score_document_clusters('doc', gold, sys)
+    # The gold clusters are not padded with the extra system mentions
+    assert gold == [{'a', 'b'}, {'c'}]
+    assert results.gold_size == results.sys_size == 6
+    expected = main.score_clusters([*gold, {'x'}, {'y'}, {'z'}], sys)
+    for name, scores in expected.items():
+        assert results.results[name] == pytest.approx(scores)
+
+
+def test_score_singleton_variants():
+    gold = [{'a', 'b'}, {'c'}, {'d', 'e', 'f'}, {'g'}]
+    sys = [{'a', 'b', 'c'}, {'d', 'e'}, {'f'}, {'h'}]
+    variants = main.score_singleton_variants('doc', gold, sys)
+    assert variants['include'] == main.score_document_clusters('doc', gold, sys)
+    without = main.score_document_clusters(
+        'doc', [c for c in gold if len(c) > 1], [c for c in sys if len(c) > 1]
+    )
+    assert variants['exclude'].gold_size == without.gold_size
+    assert variants['exclude'].sys_size == without.sys_size
+    for name, scores in without.results.items():
+        assert variants['exclude'].results[name] == pytest.approx(scores)
+
+
+def test_score_sweep():
+    gold = {'type': 'clusters', 'clusters': {'a': ['1', '2'], 'b': ['3'], 'c': ['4', '5', '6']}}
+    links = [['1', '2', 0.9], ['2', '3', 0.4], ['4', '5', 0.8], ['5', '6', 0.3], ['3', '8', 0.1]]
+    sys = {'type': 'graph', 'mentions': ['1', '2', '3', '4', '5', '6', '8'], 'links': links}
+    curve = list(
+        main.score_sweep(io.StringIO(json.dumps(gold)), io.StringIO(json.dumps(sys)))
+    )
+    assert [t for t, _ in curve] == [0.9, 0.8, 0.4, 0.3, 0.1]
+    for threshold, results in curve:
+        kept = {**sys, 'links': [l[:2] for l in links if l[2] >= threshold]}
+        expected = main.score_files(io.StringIO(json.dumps(gold)), io.StringIO(json.dumps(kept)))
+        for name, scores in expected.results.items():
+            assert results[name] == pytest.approx(scores)
+
+
+@pytest.mark.parametrize(
+    'options',
+    [['--singletons', 'exclude'], ['--jobs', '2'], ['--max-memory', '1G'], ['--shard', '1/2']],
+)
+@pytest.mark.parametrize('command', ['sweep', 'prefix'])
+def test_curve_unsupported_options(command, options, capsys):
+    fixtures = pathlib.Path(__file__).parent / 'fixtures'
+    assert main.main_entry_point([command, *options, str(fixtures), str(fixtures)]) == 1
+    assert f'{options[0]} is not supported by scorch {command}' in capsys.readouterr().err
+
+
+def test_score_prefix_curve():
+    gold = {
+        'type': 'clusters',
+        'clusters': {'a': ['0.1-1', '1.0-2', '3.4-4'], 'b': ['0.3-3'], 'c': ['2.1-1', '3.0-0']},
+    }
+    sys = {
+        'type': 'clusters',
+        'clusters': {'x': ['0.1-1', '0.3-3', '3.4-4'], 'y': ['1.0-2', '2.1-1', '2.5-6']},
+    }
+    curve = list(
+        main.score_prefix_curve(io.StringIO(json.dumps(gold)), io.StringIO(json.dumps(sys)))
+    )
+    assert [b for b, _ in curve] == [0, 1, 2, 3]
+    for block, results in curve:
+        expected = main.score_files(
+            *(
+                io.StringIO(
+                    json.dumps(
+                        {
+                            'type': 'clusters',
+                            'clusters': {
+                                e: [m for m in c if int(m.split('.')[0]) <= block]
+                                for e, c in doc['clusters'].items()
+                                if int(min(c).split('.')[0]) <= block
+                            },
+                        }
+                    )
+                )
+                for doc in (gold, sys)
+            )
+        )
+        for name, scores in expected.results.items():
+            assert results[name] == pytest.approx(scores)
+    lines = list(
+        main.process_prefix_curve(
+            io.StringIO(json.dumps(gold)), io.StringIO(json.dumps(sys)), every=2, output_format='csv'
+        )
+    )
+    assert lines[0] == f"{','.join(main.PREFIX_CSV_HEADER)}\n"
+    assert list(dict.fromkeys(l.split(',')[0] for l in lines[1:])) == ['1', '3']
+    with pytest.raises(ValueError):
+        list(
+            main.score_prefix_curve(
+                io.StringIO(json.dumps(gold)),
+                io.StringIO(json.dumps({'type': 'clusters', 'clusters': {'x': ['mention']}})),
+            )
+        )
+
+
+def test_score_cross_document(tmp_path, capsys):
+    documents = {
+        'gold': {
+            'A': {'e': ['1', '2'], 'f': ['3']},
+            'B': {'e': ['1'], 'g': ['2', '3']},
+        },
+        'sys': {
+            'A': {'x': ['1', '2', '3']},
+            'B': {'x': ['1'], 'y': ['2', '3']},
+        },
+    }
+    for side, side_documents in documents.items():
+        (tmp_path / side).mkdir()
+        for name, clusters in side_documents.items():
+            (tmp_path / side / f'{name}.json').write_text(
+                json.dumps({'type': 'clusters', 'clusters': clusters})
+            )
+    results = main.score_cross_document(tmp_path / 'gold', tmp_path / 'sys')
+    expected = main.score_clusters(
+        [{('A', '1'), ('A', '2')}, {('B', '1')}, {('A', '3')}, {('B', '2'), ('B', '3')}],
+        [{('A', '1'), ('A', '2'), ('A', '3')}, {('B', '1')}, {('B', '2'), ('B', '3')}],
+    )
+    assert results.gold_size == results.sys_size == 6
+    for name, scores in expected.items():
+        assert results.results[name] == pytest.approx(scores)
+
+    results = main.score_cross_document(tmp_path / 'gold', tmp_path / 'sys', global_entities=True)
+    expected = main.score_clusters(
+        [{('A', '1'), ('A', '2'), ('B', '1')}, {('A', '3')}, {('B', '2'), ('B', '3')}],
+        [{('A', '1'), ('A', '2'), ('A', '3'), ('B', '1')}, {('B', '2'), ('B', '3')}],
+    )
+    assert results.gold_size == results.sys_size == 6
+    for name, scores in expected.items():
+        assert results.results[name] == pytest.approx(scores)
+
+    for options in (
+        ['--group-by', '.'],
+        ['--cache', str(tmp_path / 'cache')],
+        ['--shard', '1/2'],
+        ['--watch'],
+        ['--per-document'],
+    ):
+        assert (
+            main.main_entry_point(
+                ['--cross-document', *options, str(tmp_path / 'gold'), str(tmp_path / 'sys')]
+            )
+            == 1
+        )
+        assert f'{options[0]} is not supported' in capsys.readouterr().err
+
+
+def test_score_columns(tmp_path):
+    datafiles = pathlib.Path(__file__).parent / 'fixtures' / 'conll' / 'datafiles'
+    key_lines = (datafiles / 'TC-A.key').read_text().splitlines()
+    responses = [(datafiles / f'TC-A-{i}.response').read_text().splitlines() for i in (2, 3)]
+    # A single file with the gold column followed by the two system columns
+    lines = [
+        '\t'.join((k, *(r[i].split()[-1] for r in responses)))
+        if k.strip() and not k.startswith('#') else k
+        for i, k in enumerate(key_lines)
+    ]
+    conll_file = tmp_path / 'TC-A.conll'
+    conll_file.write_text('\n'.join(lines) + '\n')
+    results = main.score_columns(conll_file, [-2, -1], gold_column=-3)
+    assert list(results) == [-2, -1]
+    with (datafiles / 'TC-A.key').open() as key_stream:
+        [(_, gold)] = conll.parse_file(l.strip() for l in key_stream)
+    for column, response in zip((-2, -1), responses):
+        [(name, sys)] = conll.parse_file(l.strip() for l in response)
+        gold_clusters, sys_clusters = main.prepare_clusters(
+            main.clusters_from_obj(conll.document_to_json(name, gold)),
+            main.clusters_from_obj(conll.document_to_json(name, sys)),
+        )
+        assert results[column].documents[0].results == main.score_clusters(
+            gold_clusters, sys_clusters
+        )
+    output = ''.join(main.process_columns(conll_file, [-2, -1], gold_column=-3))
+    assert '[column -2]\tMUC:' in output and '[column -1]\tMUC:' in output
+
+
+def test_score_corpus(gold_dir, sys_dir):
+    corpus = main.score_corpus(gold_dir, sys_dir, group_of=main.parse_group_by('TC-A'))
+    assert [d.name for d in corpus.documents] == ['TC-A', 'TC-B', 'TC-C']
+    assert corpus.corpus.gold_size == sum(d.gold_size for d in corpus.documents)
+    assert corpus.groups['TC-A'].results == corpus.documents[0].results
+    assert ''.join(main.process_dirs(gold_dir, sys_dir)) == ''.join(
+        main.format_results(corpus.corpus.results)
+    )
+
+
+def test_process_files_jsonl(gold_file, sys_file, out_file):
+    (line,) = main.process_files(gold_file, sys_file, output_format="jsonl")
+    record = json.loads(line)
+    assert record["document"] is None
+    assert list(record["scores"]) == list(main.METRICS)
+    expected_conll = float(out_file.splitlines()[-1].rsplit(" ", 1)[-1])
+    assert record["conll2012"] == pytest.approx(expected_conll)
+
+
+def test_process_dirs_per_document_jsonl(gold_dir, sys_dir):
+    lines = list(
+        main.process_dirs(gold_dir, sys_dir, output_format="jsonl", per_document=True)
+    )
+    records = [json.loads(l) for l in lines]
+    assert sorted(r["document"] for r in records[:-1]) == ["TC-A", "TC-B", "TC-C"]
+    assert records[-1]["document"] is None
+
+
+def test_process_dirs_csv(gold_dir, sys_dir):
+    text = "".join(main.process_dirs(gold_dir, sys_dir, output_format="csv"))
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert [r["metric"] for r in rows] == [*main.METRICS, "CoNLL-2012"]
+    assert all(r["document"] == "" for r in rows)
+    text_output = "".join(main.process_dirs(gold_dir, sys_dir))
+    assert text_output.splitlines()[0] == f"MUC:\tR={rows[0]['R']}\tP={rows[0]['P']}\tF₁={rows[0]['F']}"
+
+
+def test_process_dirs_group_by(gold_dir, sys_dir, tmp_path):
+    individual_results = list(main.score_dirs(gold_dir, sys_dir))
+    group_of = main.parse_group_by(r'TC-([AB])')
+    assert [group_of(name) for name, *_ in individual_results] == ['A', 'B', None]
+    obj = json.loads(
+        ''.join(main.process_dirs(gold_dir, sys_dir, output_format='json', group_of=group_of))
+    )
+    assert list(obj['groups']) == ['A', 'B']
+    assert obj['groups']['A'] == main.results_record(individual_results[0][1], group='A')
+    assert obj['corpus'] == main.results_record(main.micro_average(individual_results))
+
+    mapping = tmp_path / 'groups.tsv'
+    mapping.write_text('TC-A\tfirst\nTC-C\tfirst\n')
+    lines = list(main.process_dirs(gold_dir, sys_dir, group_of=main.parse_group_by(str(mapping))))
+    expected = main.micro_average([individual_results[0], individual_results[2]])
+    R, P, F = expected['MUC']
+    assert lines[0] == f'[first]\tMUC:\tR={R}\tP={P}\tF₁={F}\n'
+    assert lines[len(expected) + 1 :] == list(main.process_dirs(gold_dir, sys_dir))
+
+
+def test_lazy_imports():
+    """Importing `scorch.main` should not import the heavy dependencies, to keep startup fast."""
+    code = (
+        "import sys, scorch.main;"
+        "print(' '.join(m for m in ('numpy', 'scipy', 'tqdm', 'docopt') if m in sys.modules))"
+    )
+    loaded = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout.split()
+    assert loaded == []
+
+
+def test_process_dirs_cache(gold_dir, sys_dir, tmp_path, monkeypatch):
+    cache_dir = tmp_path / 'cache'
+    expected_output = ''.join(main.process_dirs(gold_dir, sys_dir))
+    output = ''.join(main.process_dirs(gold_dir, sys_dir, cache=main.ResultCache(cache_dir)))
+    assert output == expected_output
+    assert len(list(cache_dir.iterdir())) == 3
+
+    def fail(*args, **kwargs):
+        raise AssertionError('Cached documents should not be rescored')
+
+    monkeypatch.setattr(main, 'score_clusters', fail)
+    output = ''.join(main.process_dirs(gold_dir, sys_dir, cache=main.ResultCache(cache_dir)))
+    assert output == expected_output
+
+
+def test_watch_dirs(gold_dir, sys_dir, tmp_path):
+    watched_dir = tmp_path / 'sys'
+    watched_dir.mkdir()
+    (watched_dir / 'TC-A.json').write_bytes((sys_dir / 'TC-A.json').read_bytes())
+    updates = main.watch_dirs(
+        gold_dir, watched_dir, output_format='jsonl', per_document=True, interval=0.0
+    )
+    assert [json.loads(next(updates))['document'] for _ in range(2)] == ['TC-A', None]
+
+    for name in ('TC-B', 'TC-C'):
+        (watched_dir / f'{name}.json').write_bytes((sys_dir / f'{name}.json').read_bytes())
+    records = [json.loads(next(updates)) for _ in range(3)]
+    assert [r['document'] for r in records] == ['TC-B', 'TC-C', None]
+    (expected,) = main.process_dirs(gold_dir, sys_dir, output_format='jsonl')
+    assert records[-1]['conll2012'] == pytest.approx(json.loads(expected)['conll2012'])
+
+
+def test_shard_merge(gold_dir, sys_dir):
+    partials = []
+    for i in range(1, 4):
+        buffer = io.StringIO()
+        main.write_partial(main.score_dirs(gold_dir, sys_dir, shard=(i, 3)), buffer, shard=(i, 3))
+        buffer.seek(0)
+        partials.append(main.read_partial(buffer))
+    assert sorted(name for p in partials for name, *_ in p) == ['TC-A', 'TC-B', 'TC-C']
+    merged = ''.join(main.format_corpus(main.merge_partials(partials)))
+    assert merged == ''.join(main.process_dirs(gold_dir, sys_dir))
+    with pytest.raises(ValueError):
+        main.merge_partials([*partials, *partials])
+
+
+def test_shard_merge_entry_point(gold_dir, sys_dir, tmp_path):
+    parts = [str(tmp_path / f'part-{i}.json') for i in (1, 2)]
+    for i, part in enumerate(parts, start=1):
+        assert main.main_entry_point(['--shard', f'{i}/2', str(gold_dir), str(sys_dir), part]) is None
+    out_file = tmp_path / 'merged.txt'
+    assert main.main_entry_point(['merge', '--output', str(out_file), *parts]) is None
+    assert out_file.read_text() == ''.join(main.process_dirs(gold_dir, sys_dir))
+
+
+@pytest.mark.parametrize('spec', ['3/2', 'x', '0/2', '1/2/3'])
+def test_invalid_shard(gold_dir, sys_dir, spec, capsys):
+    assert main.main_entry_point(['--shard', spec, str(gold_dir), str(sys_dir)]) == 1
+    assert 'Invalid shard specification' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize(
+    'options', [['--shard', '1/2'], ['--cache', 'cache'], ['--watch'], ['--per-document']]
+)
+def test_single_file_unsupported_options(options, capsys):
+    fixture = pathlib.Path(__file__).parent / 'fixtures' / 'clusters.json'
+    assert main.main_entry_point([*options, str(fixture), str(fixture)]) == 1
+    assert f'{options[0]} is only supported for directories' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize(
+    'option, value',
+    [
+        ('--jobs', 'many'),
+        ('--jobs', '0'),
+        ('--samples', '1e3'),
+        ('--interval', 'nan'),
+        ('--interval', 'inf'),
+        ('--every', '-1'),
+        ('--port', 'http'),
+    ],
+)
+def test_invalid_numbers(option, value, capsys):
+    fixtures = pathlib.Path(__file__).parent / 'fixtures'
+    assert main.main_entry_point([option, value, str(fixtures), str(fixtures)]) == 1
+    assert f'Invalid {option} value' in capsys.readouterr().err
+
+
+def test_process_bundles(gold_dir, sys_dir, tmp_path):
+    for name, directory in (('gold', gold_dir), ('sys', sys_dir)):
+        with (tmp_path / f'{name}.jsonl').open('w') as out_stream:
+            for f in sorted(directory.iterdir()):
+                obj = json.loads(f.read_text())
+                obj['name'] = f.stem
+                out_stream.write(f'{json.dumps(obj)}\n')
+    output = ''.join(main.process_dirs(tmp_path / 'gold.jsonl', tmp_path / 'sys.jsonl'))
+    assert output == ''.join(main.process_dirs(gold_dir, sys_dir))
+
+
+def test_process_conll_gold(tmp_path):
+    datafiles = pathlib.Path(__file__).parent / 'fixtures' / 'conll' / 'datafiles'
+    for name, suffix in (('gold', '.key'), ('sys', '-1.response')):
+        (tmp_path / f'{name}.conll').write_text(
+            ''.join(
+                re.sub(r'\(.*\);.*', f'(doc{c});', (datafiles / f'TC-{c}{suffix}').read_text(), 1)
+                for c in 'ABC'
+            )
+        )
+        conll.convert_files([tmp_path / f'{name}.conll'], bundle_file=tmp_path / f'{name}.jsonl')
+    expected = list(main.process_dirs(tmp_path / 'gold.jsonl', tmp_path / 'sys.jsonl'))
+    assert list(main.process_dirs(tmp_path / 'gold.conll', tmp_path / 'sys.jsonl')) == expected
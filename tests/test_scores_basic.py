@@ -1,4 +1,6 @@
 '''Unit tests for `scores.py`.'''
+import concurrent.futures
+
 import pytest
 
 from scorch import scores  # noqa
@@ -48,6 +50,22 @@ def test_ceaf_m_basic(Key, Response):
     assert round(F, 2) == pytest.approx(0.53)
 
 
+def test_ceaf_m_details(Key, Response):
+    details = scores.ceaf_m(Key, Response, details=True)
+    assert details[:3] == scores.ceaf_m(Key, Response)
+    assert details.alignment == [(0, 0), (1, 2)]
+    assert details.key_contributions == [2.0, 2.0]
+    assert details.response_contributions == [2.0, 0.0, 2.0]
+
+
+def test_ceaf_executor(Key, Response):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        for metric in (scores.ceaf_m, scores.ceaf_e):
+            assert metric(Key, Response, sparse=True, executor=executor) == pytest.approx(
+                metric(Key, Response)
+            )
+
+
 def test_ceaf_e_basic(Key, Response):
     R, P, F = scores.ceaf_e(Key, Response)
     assert R == pytest.approx(0.65)
@@ -66,6 +84,14 @@ def test_blanc_basic(Key, Response):
     assert round(F, 2) == pytest.approx(0.37)
 
 
+def test_lea_basic(Key, Response):
+    # Example from Moosavi and Strube (2016)
+    R, P, F = scores.lea(Key, Response)
+    assert R == pytest.approx((3 * 1 / 3 + 4 * 1 / 6) / 7)
+    assert P == pytest.approx((2 * 1 + 2 * 0 + 4 * 1 / 6) / 8)
+    assert round(F, 2) == pytest.approx(0.28)
+
+
 def test_conll2012_basic(Key, Response):
     score = scores.conll2012(Key, Response)
     assert round(score, 2) == pytest.approx(0.46)
@@ -1,15 +1,19 @@
+import math
 import typing as ty
 
 import hypothesis
 import pytest
 
+# `scores` imports scipy lazily, importing it here keeps that out of the hypothesis deadlines
+import scipy.optimize  # noqa: F401
+
 from scorch import scores  # noqa
 from tests.utils import clusterings
 
 
 @hypothesis.given(clusters=clusterings(max_size=256))
 @pytest.mark.parametrize(
-    "metric", [scores.b_cubed, scores.ceaf_m, scores.ceaf_e, scores.blanc]
+    "metric", [scores.b_cubed, scores.ceaf_m, scores.ceaf_e, scores.blanc, scores.lea]
 )
 def test_perfect(metric, clusters: ty.Sequence[ty.Set[int]]):
     """Test that all the scores are `1.0` for a perfect system output."""
@@ -31,3 +35,79 @@ def test_blanc_consistency(key, response):
     fast_blanc = scores.fast_detailed_blanc(key, response)
     slow_blanc = scores.detailed_blanc(key, response)
     assert fast_blanc == slow_blanc
+    assert scores.sparse_detailed_blanc(key, response) == slow_blanc
+
+
+@hypothesis.given(key=clusterings(max_size=128), response=clusterings(max_size=128))
+@pytest.mark.parametrize("metric", [scores.ceaf_m, scores.ceaf_e])
+def test_sparse_ceaf_consistency(metric, key, response):
+    assert metric(key, response, sparse=True) == pytest.approx(metric(key, response))
+
+
+def naive_lea(key, response):
+    """LEA by explicit enumeration of the links, see Moosavi and Strube (2016)."""
+
+    def links(c):
+        c = sorted(c)
+        return {(e, f) for i, e in enumerate(c) for f in c[i + 1 :]} if len(c) > 1 else {(c[0],)}
+
+    def score(clusters, other):
+        other_links = set().union(*(links(c) for c in other))
+        num = sum(len(c) * len(links(c) & other_links) / len(links(c)) for c in clusters)
+        return num / sum(len(c) for c in clusters)
+
+    R, P = score(key, response), score(response, key)
+    return R, P, (2 * R * P / (R + P) if R + P else 0.0)
+
+
+@hypothesis.given(key=clusterings(max_size=64), response=clusterings(max_size=64))
+def test_lea_consistency(key, response):
+    assert scores.lea(key, response) == pytest.approx(naive_lea(key, response))
+
+
+@hypothesis.given(key=clusterings(max_size=64), response=clusterings(max_size=64))
+@pytest.mark.parametrize("metric", [scores.muc, scores.b_cubed, scores.ceaf_m, scores.ceaf_e])
+def test_details_consistency(metric, key, response):
+    """Test that the detailed scores agree with the plain ones."""
+    R, P, F, key_contributions, response_contributions, alignment = metric(
+        key, response, details=True
+    )
+    assert (R, P, F) == pytest.approx(metric(key, response))
+    assert len(key_contributions) == len(key)
+    assert len(response_contributions) == len(response)
+    if alignment is not None:
+        assert all(key_contributions[i] == response_contributions[j] for i, j in alignment)
+        assert math.fsum(key_contributions) == pytest.approx(math.fsum(response_contributions))
+
+
+@hypothesis.given(key=clusterings(max_size=64), response=clusterings(max_size=64))
+@pytest.mark.parametrize(
+    "metric, kwargs",
+    [
+        (scores.muc, {}),
+        (scores.b_cubed, {}),
+        (scores.lea, {}),
+        (scores.blanc, {}),
+        (scores.blanc, {"sparse": True}),
+        (scores.blanc, {"fast": False}),
+        (scores.ceaf_m, {}),
+        (scores.ceaf_m, {"sparse": True}),
+        (scores.ceaf_e, {}),
+        (scores.ceaf_e, {"sparse": True}),
+    ],
+)
+def test_implicit_singletons(metric, kwargs, key, response):
+    """Test that implicit singletons give the same scores as padding the key with them."""
+    key_mentions = set().union(*key)
+    padded_key = [*key, *({m} for r in response for m in r if m not in key_mentions)]
+    assert metric(key, response, implicit_singletons=True, **kwargs) == pytest.approx(
+        metric(padded_key, response, **kwargs)
+    )
+
+
+@hypothesis.given(key=clusterings(max_size=64), response=clusterings(max_size=64))
+def test_without_singletons(key, response):
+    filtered_key, filtered_response, table = scores.without_singletons(key, response)
+    assert filtered_key == [k for k in key if len(k) > 1]
+    assert filtered_response == [r for r in response if len(r) > 1]
+    assert table == scores.contingency(filtered_key, filtered_response)
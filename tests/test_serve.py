@@ -0,0 +1,141 @@
+'''Unit tests for `serve.py`.'''
+import asyncio
+import json
+import pathlib
+
+import pytest
+
+from scorch import main  # noqa
+from scorch import serve  # noqa
+
+
+fixtures_dir = pathlib.Path(__file__).resolve().parent / 'fixtures' / 'json' / 'multiple'
+
+
+async def request(socket_path, method, path, payload=None):
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+    writer.write(
+        f'{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode()
+        + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b'\r\n\r\n')
+    status = int(head.split()[1])
+    return status, json.loads(content)
+
+
+def run_requests(tmp_path, requests):
+    socket_path = str(tmp_path / 'scorch.sock')
+    server = serve.ScoringServer(fixtures_dir / 'gold', workers=1)
+
+    async def run():
+        s = await server.start(socket_path=socket_path)
+        try:
+            return [await request(socket_path, *r) for r in requests]
+        finally:
+            s.close()
+
+    try:
+        return asyncio.run(run())
+    finally:
+        server.close()
+
+
+def load_sys(name):
+    with (fixtures_dir / 'sys' / f'{name}.json').open() as in_stream:
+        obj = json.load(in_stream)
+    obj['name'] = name
+    return obj
+
+
+def test_serve(tmp_path):
+    (
+        (index_status, index),
+        (single_status, single),
+        (batch_status, batch),
+        (error_status, _),
+    ) = run_requests(
+        tmp_path,
+        [
+            ('GET', '/'),
+            ('POST', '/score', load_sys('TC-A')),
+            ('POST', '/score', {'documents': [load_sys(n) for n in ('TC-A', 'TC-B', 'TC-C')]}),
+            ('POST', '/score', {'name': 'nope', 'type': 'clusters', 'clusters': {}}),
+        ],
+    )
+    assert index_status == single_status == batch_status == 200
+    assert error_status == 400
+    assert {'TC-A', 'TC-B', 'TC-C'} <= set(index['documents'])
+
+    with (fixtures_dir / 'gold' / 'TC-A.json').open() as gold_stream, (
+        fixtures_dir / 'sys' / 'TC-A.json'
+    ).open() as sys_stream:
+        (line,) = main.process_files(gold_stream, sys_stream, output_format='json')
+    expected = json.loads(line)
+    assert single['scores'] == expected['scores']
+
+    (expected_corpus,) = main.process_dirs(
+        fixtures_dir / 'gold', fixtures_dir / 'sys', output_format='json'
+    )
+    assert batch['corpus']['conll2012'] == pytest.approx(
+        json.loads(expected_corpus)['corpus']['conll2012']
+    )
+    assert [d['document'] for d in batch['documents']] == ['TC-A', 'TC-B', 'TC-C']
+
+
+def test_serve_invalid_documents(tmp_path):
+    responses = run_requests(
+        tmp_path,
+        [
+            ('POST', '/score', {'documents': 5}),
+            ('POST', '/score', {'documents': {'a': 1}}),
+            ('POST', '/score', {'documents': ['x']}),
+            ('POST', '/score', {'name': 'TC-A', 'type': 'clusters', 'clusters': [['1']]}),
+        ],
+    )
+    assert [status for status, _ in responses] == [400, 400, 400, 400]
+    assert all('error' in payload for _, payload in responses)
+
+
+def test_serve_invalid_requests(tmp_path):
+    socket_path = str(tmp_path / 'scorch.sock')
+    server = serve.ScoringServer(fixtures_dir / 'gold', workers=1, max_body_size=16)
+
+    async def raw_request(content_length, body=b''):
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        writer.write(
+            f'POST /score HTTP/1.1\r\nContent-Length: {content_length}\r\n'
+            'Connection: close\r\n\r\n'.encode()
+            + body
+        )
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        head, _, content = response.partition(b'\r\n\r\n')
+        return int(head.split()[1]), json.loads(content)
+
+    async def run():
+        s = await server.start(socket_path=socket_path)
+        try:
+            return [
+                await raw_request(*r)
+                for r in (('abc',), ('-1',), ('1000', b'{}'), ('2', b'{}'))
+            ]
+        finally:
+            s.close()
+
+    try:
+        responses = asyncio.run(run())
+    finally:
+        server.close()
+    assert [status for status, _ in responses] == [400, 400, 413, 400]
+    assert all('error' in payload for _, payload in responses)
+
+
+def test_serve_invalid_match():
+    with pytest.raises(ValueError):
+        serve.ScoringServer(fixtures_dir / 'gold', workers=1, match='nope')
+    assert main.main_entry_point(['serve', '--match', 'nope', str(fixtures_dir / 'gold')]) == 1
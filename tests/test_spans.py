@@ -0,0 +1,104 @@
+'''Unit tests for `spans.py`.'''
+import hypothesis
+from hypothesis import strategies as st
+
+from scorch import spans  # noqa
+
+
+def test_parse_span():
+    assert spans.parse_span('1.2-5') == spans.Span(1, 2, 5)
+    assert spans.parse_span('mention') is None
+    assert spans.parse_span(spans.pack_span(1, 2, 5)) == spans.Span(1, 2, 5)
+    assert spans.parse_span(-3) is None
+    assert spans.parse_span(3) is None
+    assert spans.parse_span(3, packed=True) == spans.unpack_span(3)
+
+
+@hypothesis.given(
+    span=st.tuples(
+        st.integers(0, 2 ** spans.BLOCK_BITS - 1),
+        st.integers(0, 2 ** spans.START_BITS - 1),
+        st.integers(0, 2 ** spans.END_BITS - 1),
+    )
+)
+def test_pack_span(span):
+    packed = spans.pack_span(*span)
+    assert 0 <= packed < 2 ** 63
+    assert spans.unpack_span(packed) == span
+
+
+@hypothesis.given(
+    index_spans=st.lists(
+        st.tuples(st.integers(0, 2), st.integers(0, 20), st.integers(0, 5)), max_size=64
+    ),
+    query=st.tuples(st.integers(0, 2), st.integers(0, 20), st.integers(0, 5)),
+)
+def test_span_index(index_spans, query):
+    index_spans = [spans.Span(b, s, s + l) for b, s, l in index_spans]
+    query = spans.Span(query[0], query[1], query[1] + query[2])
+    index = spans.SpanIndex((s, i) for i, s in enumerate(index_spans))
+    expected = sorted(
+        i
+        for i, s in enumerate(index_spans)
+        if s.block == query.block and s.start <= query.end and query.start <= s.end
+    )
+    assert sorted(i for _, i in index.overlapping(query)) == expected
+
+
+def test_span_index_long_span():
+    '''A span that covers the whole block must not make the queries visit every span.'''
+    index_spans = [spans.Span(0, 0, 10 ** 6)] + [spans.Span(0, 2 * i, 2 * i) for i in range(4096)]
+    index = spans.SpanIndex((s, i) for i, s in enumerate(index_spans))
+    visited = []
+    block_spans = index._spans[0]
+    index._spans[0] = _RecordingList(block_spans, visited)
+    assert sorted(i for _, i in index.overlapping(spans.Span(0, 4000, 4000))) == [0, 2001]
+    assert len(visited) == 2
+
+
+class _RecordingList(list):
+    def __init__(self, items, visited):
+        super().__init__(items)
+        self.visited = visited
+
+    def __getitem__(self, i):
+        self.visited.append(i)
+        return super().__getitem__(i)
+
+
+def test_align_mentions():
+    gold = ['0.0-1', '0.3-6', '1.0-0', '1.2-3']
+    sys = ['0.0-1', '0.3-5', '0.4-6', '1.1-3', 'other']
+    assert spans.align_mentions(gold, sys, mode='exact') == {'0.0-1': '0.0-1'}
+    assert spans.align_mentions(gold, sys, mode='containment') == {
+        '0.0-1': '0.0-1',
+        '0.3-5': '0.3-6',
+        '1.1-3': '1.2-3',
+    }
+    assert spans.align_mentions(gold, sys, mode='overlap') == {
+        '0.0-1': '0.0-1',
+        '0.3-5': '0.3-6',
+        '1.1-3': '1.2-3',
+    }
+
+
+def test_align_clusters():
+    gold = [{'0.0-1', '0.3-6'}, {'1.2-3'}]
+    sys = [{'0.0-1', '0.3-5'}, {'1.1-3', '2.0-0'}]
+    assert spans.align_clusters(gold, sys, mode='overlap') == [
+        {'0.0-1', '0.3-6'},
+        {'1.2-3', '2.0-0'},
+    ]
+    assert spans.align_clusters(gold, sys, mode='exact') == sys
+
+
+def test_align_mentions_plain_ints():
+    '''Plain integer identifiers are opaque: they only match when they are equal.'''
+    assert spans.align_mentions([1, 2, 3], [7, 8, 9], mode='overlap') == {}
+    assert spans.align_mentions([1, 2, 3], [3, 8, 9], mode='containment') == {3: 3}
+    gold = [spans.pack_span(0, 2, 5)]
+    sys = [spans.pack_span(0, 3, 5)]
+    assert spans.align_mentions(gold, sys, mode='overlap') == {sys[0]: gold[0]}
+    assert spans.align_mentions(
+        [int(m) for m in gold], [int(m) for m in sys], mode='overlap', packed=True
+    ) == {sys[0]: gold[0]}
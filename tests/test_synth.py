@@ -0,0 +1,85 @@
+'''Unit tests for `synth.py`.'''
+import json
+import random
+
+import hypothesis
+import pytest
+from hypothesis import strategies as st
+
+from scorch import conll, main, synth  # noqa
+
+
+@hypothesis.given(
+    total=st.integers(0, 1000).filter(lambda n: n != 1),
+    exponent=st.floats(0.5, 4),
+    max_size=st.integers(2, 100),
+)
+def test_zipf_sizes(total, exponent, max_size):
+    sizes = synth.zipf_sizes(total, exponent, max_size, random.Random(0))
+    assert sum(sizes) == total
+    assert all(s >= 2 for s in sizes)
+    # Only the size that absorbs the leftover mention can exceed `max_size`
+    assert sum(s > max_size for s in sizes) <= 1
+
+
+@hypothesis.given(
+    num_mentions=st.integers(0, 500),
+    singleton_ratio=st.floats(0, 1),
+    rates=st.tuples(*(st.floats(0, 1) for _ in range(4))),
+)
+def test_synthesize_document(num_mentions, singleton_ratio, rates):
+    merge_rate, split_rate, miss_rate, extra_rate = rates
+    document = synth.synthesize_document(
+        "test",
+        num_mentions,
+        random.Random(0),
+        singleton_ratio=singleton_ratio,
+        merge_rate=merge_rate,
+        split_rate=split_rate,
+        miss_rate=miss_rate,
+        extra_rate=extra_rate,
+    )
+    gold = [m for e in document.gold for m in e]
+    assert sorted(gold) == sorted(set(gold)) and len(gold) == num_mentions
+    assert sum(len(e) == 1 for e in document.gold) >= round(num_mentions * singleton_ratio)
+    response = [m for e in document.sys for m in e]
+    assert len(response) == len(set(response)) and all(document.sys)
+    assert set(gold).union(response) <= set(range(document.num_positions))
+    assert len(set(response) - set(gold)) == round(num_mentions * extra_rate)
+
+
+def test_synthesize_document_no_errors():
+    document = synth.synthesize_document(
+        "test", 1000, random.Random(0), merge_rate=0, split_rate=0, miss_rate=0, extra_rate=0,
+    )
+    assert sorted(document.sys) == sorted(document.gold)
+    assert sum(len(e) == 1 for e in document.gold) == 300
+    assert max(len(e) for e in document.gold) > 10
+
+
+@pytest.mark.parametrize("ids", conll.ID_STYLES)
+def test_generate(tmp_path, ids):
+    '''All the formats must describe the same corpus.'''
+    synth.generate(
+        tmp_path, num_documents=3, num_mentions=200, formats=synth.FORMATS, ids=ids, seed=1
+    )
+    for side in ("gold", "sys"):
+        with (tmp_path / f"{side}.jsonl").open() as in_stream:
+            bundle = [json.loads(l) for l in in_stream]
+        assert [d["name"] for d in bundle] == ["doc0", "doc1", "doc2"]
+        with (tmp_path / f"{side}.conll").open() as in_stream:
+            parsed = list(conll.parse_file(l.strip() for l in in_stream))
+        for obj, (name, entities) in zip(bundle, parsed):
+            assert name == obj["name"]
+            with (tmp_path / side / f"{name}.json").open() as in_stream:
+                assert json.load(in_stream) == obj
+            assert sorted(map(sorted, main.clusters_from_obj(obj))) == sorted(
+                map(sorted, main.clusters_from_obj(conll.document_to_json(name, entities, ids)))
+            )
+
+
+def test_main_entry_point(tmp_path):
+    assert synth.main_entry_point(["--format", "jsonl", "--mentions", "100", str(tmp_path)]) == 0
+    results = main.score_corpus(tmp_path / "gold.jsonl", tmp_path / "sys.jsonl")
+    assert 0 < results.corpus.results["MUC"].F < 1
+    assert synth.main_entry_point(["--format", "xml", str(tmp_path)]) == 1